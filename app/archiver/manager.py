@@ -121,6 +121,13 @@ def archive_messages(archive_date: Optional[str] = None) -> Dict[str, any]:
                 'exists': True
             }
 
+        # Apply pending channel deletions first, so they don't reach the archive
+        try:
+            from app.meshcore.tombstones import compact_msgs_file
+            compact_msgs_file(force=True)
+        except Exception as e:
+            logger.warning(f"Compaction before archiving failed: {e}")
+
         # Copy the file
         shutil.copy2(source_file, dest_file)
 
@@ -129,6 +136,13 @@ def archive_messages(archive_date: Optional[str] = None) -> Dict[str, any]:
 
         logger.info(f"Archived messages to {dest_file} ({file_size} bytes)")
 
+        # Have the search index pick up the new archive in the background
+        try:
+            from app.meshcore.search_index import search_index
+            search_index.request_refresh()
+        except Exception as e:
+            logger.warning(f"Failed to schedule search indexing of archive {archive_date}: {e}")
+
         return {
             'success': True,
             'message': f'Successfully archived messages for {archive_date}',
@@ -183,13 +197,10 @@ def list_archives() -> List[Dict]:
                 stats = archive_file.stat()
                 file_size = stats.st_size
 
-                # Count messages (read file)
-                message_count = _count_messages_in_file(archive_file)
-
                 archives.append({
                     'date': date_part,
                     'file_size': file_size,
-                    'message_count': message_count,
+                    'message_count': 0,
                     'file_path': str(archive_file)
                 })
 
@@ -197,6 +208,12 @@ def list_archives() -> List[Dict]:
                 logger.warning(f"Error processing archive file {archive_file}: {e}")
                 continue
 
+        # Count messages (read files) - one archive per scan worker job
+        from app.meshcore.workers import scan_pool
+        counts = scan_pool.map(_count_messages_in_file, [(Path(a['file_path']),) for a in archives])
+        for archive, message_count in zip(archives, counts):
+            archive['message_count'] = message_count
+
         # Sort by date, newest first
         archives.sort(key=lambda x: x['date'], reverse=True)
 
@@ -219,21 +236,19 @@ def _count_messages_in_file(file_path: Path) -> int:
         Number of messages
     """
     import json
+    from app.meshcore import decoder
+    from app.meshcore.scan import LineScanner
 
     count = 0
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    data = json.loads(line)
-                    # Only count Public channel messages
-                    if data.get('channel_idx', 0) == 0 and data.get('type') in ['CHAN', 'SENT_CHAN']:
-                        count += 1
-                except json.JSONDecodeError:
-                    continue
+        for _, line in LineScanner(file_path, tokens=decoder.CHANNEL_TOKENS):
+            try:
+                data = decoder.loads(line)
+                # Only count Public channel messages
+                if data.get('channel_idx', 0) == 0 and data.get('type') in ['CHAN', 'SENT_CHAN']:
+                    count += 1
+            except json.JSONDecodeError:
+                continue
     except Exception as e:
         logger.warning(f"Error counting messages in {file_path}: {e}")
 
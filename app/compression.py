@@ -0,0 +1,283 @@
+"""
+Response compression negotiated by Accept-Encoding
+
+API responses (message pages, contact lists) are compressed on the fly with
+brotli when the client accepts it and the `brotli` package is installed,
+otherwise with gzip. Responses smaller than MC_COMPRESSION_MIN_SIZE bytes
+are sent as they are.
+
+Static files are served from pre-compressed variants (`file.br`,
+`file.gz`) next to the original, written at image build time with:
+
+    python -m app.compression [static_dir]
+
+Bytes sent versus uncompressed size are counted per endpoint for
+/api/metrics.
+"""
+
+import gzip
+import logging
+import os
+import sys
+import threading
+from typing import Dict, Optional
+
+from flask import Flask, Response, request
+from werkzeug.security import safe_join
+from werkzeug.wsgi import wrap_file
+
+from app.config import config
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Compression settings for responses compressed per request (speed over ratio)
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Build-time settings for static variants (ratio over speed)
+STATIC_GZIP_LEVEL = 9
+STATIC_BROTLI_QUALITY = 11
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/javascript',
+    'text/javascript',
+    'text/css',
+    'text/html',
+    'text/plain',
+    'image/svg+xml',
+}
+
+# Static files worth pre-compressing (fonts and images already are compressed)
+STATIC_EXTENSIONS = ('.js', '.css', '.json', '.svg', '.html', '.txt', '.map')
+
+# Variant suffix per encoding, in order of preference
+STATIC_VARIANTS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def available_encodings() -> tuple:
+    """Encodings this process can produce, in order of preference."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(encodings: tuple) -> Optional[str]:
+    """
+    Pick the encoding for the current request from Accept-Encoding.
+
+    Args:
+        encodings: Candidate encodings, in order of preference on equal quality
+
+    Returns:
+        Encoding name, or None to send the response uncompressed
+    """
+    best, best_quality = None, 0
+    for encoding in encodings:
+        quality = request.accept_encodings.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CompressionStats:
+    """Thread-safe per-endpoint counters of bytes sent versus uncompressed."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, Dict[str, int]] = {}
+
+    def record(self, endpoint: str, original: int, sent: int):
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, {
+                'responses': 0, 'compressed': 0, 'bytes_original': 0, 'bytes_sent': 0
+            })
+            stats['responses'] += 1
+            stats['compressed'] += sent < original
+            stats['bytes_original'] += original
+            stats['bytes_sent'] += sent
+
+    def stats(self) -> Dict:
+        with self._lock:
+            endpoints = {
+                endpoint: {**stats, 'bytes_saved': stats['bytes_original'] - stats['bytes_sent']}
+                for endpoint, stats in sorted(self._endpoints.items())
+            }
+        return {
+            'encodings': list(available_encodings()),
+            'min_size': config.MC_COMPRESSION_MIN_SIZE,
+            'bytes_saved': sum(stats['bytes_saved'] for stats in endpoints.values()),
+            'endpoints': endpoints,
+        }
+
+
+# Global compression counters
+compression_stats = CompressionStats()
+
+
+def _add_vary(response: Response):
+    if 'accept-encoding' not in (value.lower() for value in response.vary):
+        response.vary.add('Accept-Encoding')
+
+
+def _weaken_etag(response: Response):
+    """The compressed body differs byte-wise, so a strong ETag no longer applies."""
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+
+def _serve_static_variant(app: Flask, response: Response) -> Response:
+    """Swap a static file response for its pre-compressed variant, if one is usable."""
+    filename = request.view_args.get('filename') if request.view_args else None
+    path = safe_join(app.static_folder, filename) if filename else None
+    if path is None or not os.path.isfile(path):
+        return response
+
+    encodings = tuple(encoding for encoding, _ in STATIC_VARIANTS)
+    variants = {encoding: path + suffix for encoding, suffix in STATIC_VARIANTS}
+    source_mtime = os.path.getmtime(path)
+    # Variants older than the file are stale (file edited after the build)
+    usable = tuple(encoding for encoding in encodings
+                   if os.path.isfile(variants[encoding]) and os.path.getmtime(variants[encoding]) >= source_mtime)
+
+    encoding = negotiate_encoding(usable) if usable else None
+    original_size = response.content_length or os.path.getsize(path)
+    if encoding is None:
+        compression_stats.record(request.path, original_size, original_size)
+        return response
+
+    variant = variants[encoding]
+    response.close()
+    response.response = wrap_file(request.environ, open(variant, 'rb'))
+    response.content_length = os.path.getsize(variant)
+    response.headers['Content-Encoding'] = encoding
+    _weaken_etag(response)
+    compression_stats.record(request.path, original_size, response.content_length)
+    return response
+
+
+def _compress_response(response: Response) -> Response:
+    """Compress a buffered API/page response in place."""
+    if response.direct_passthrough or response.is_streamed:
+        return response
+    if 'no-transform' in response.headers.get('Cache-Control', ''):
+        return response
+
+    endpoint = request.url_rule.rule if request.url_rule else request.path
+    data = response.get_data()
+    if len(data) < config.MC_COMPRESSION_MIN_SIZE:
+        compression_stats.record(endpoint, len(data), len(data))
+        return response
+
+    encoding = negotiate_encoding(available_encodings())
+    if encoding is None:
+        compression_stats.record(endpoint, len(data), len(data))
+        return response
+
+    compressed = compress(data, encoding)
+    if len(compressed) >= len(data):
+        compression_stats.record(endpoint, len(data), len(data))
+        return response
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    _weaken_etag(response)
+    compression_stats.record(endpoint, len(data), len(compressed))
+    return response
+
+
+def init_compression(app: Flask):
+    """Register the response compression hook on the app."""
+
+    @app.after_request
+    def compress_response(response: Response) -> Response:
+        if response.status_code == 304:
+            _add_vary(response)
+            return response
+        if response.status_code != 200 or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+        if 'Content-Encoding' in response.headers:
+            return response
+
+        # The representation now depends on Accept-Encoding, whether or not
+        # this particular response gets compressed
+        _add_vary(response)
+
+        if request.method != 'GET' or 'Range' in request.headers:
+            return response
+
+        try:
+            if request.endpoint == 'static':
+                return _serve_static_variant(app, response)
+            return _compress_response(response)
+        except Exception as e:
+            logger.error(f"Response compression failed for {request.path}: {e}")
+            return response
+
+    logger.info(f"Response compression enabled: {', '.join(available_encodings())} "
+                f"(min size {config.MC_COMPRESSION_MIN_SIZE} bytes)")
+
+
+def precompress_static(static_dir: str) -> Dict[str, int]:
+    """
+    Write .gz (and .br, if brotli is installed) variants of the static files.
+
+    Only files of STATIC_EXTENSIONS at least MC_COMPRESSION_MIN_SIZE bytes
+    get variants, and only variants smaller than the file are kept.
+
+    Args:
+        static_dir: Static folder to walk
+
+    Returns:
+        Dict with the number of files compressed and bytes before/after
+        (of the smallest variant per file)
+    """
+    totals = {'files': 0, 'bytes_original': 0, 'bytes_compressed': 0}
+    for root, _, files in os.walk(static_dir):
+        for name in sorted(files):
+            if not name.endswith(STATIC_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            if len(data) < config.MC_COMPRESSION_MIN_SIZE:
+                continue
+
+            variants = {'.gz': gzip.compress(data, compresslevel=STATIC_GZIP_LEVEL, mtime=0)}
+            if brotli is not None:
+                variants['.br'] = brotli.compress(data, quality=STATIC_BROTLI_QUALITY)
+
+            smallest = len(data)
+            for suffix, compressed in variants.items():
+                if len(compressed) >= len(data):
+                    continue
+                temp_path = path + suffix + '.tmp'
+                with open(temp_path, 'wb') as f:
+                    f.write(compressed)
+                os.replace(temp_path, path + suffix)
+                smallest = min(smallest, len(compressed))
+
+            if smallest < len(data):
+                totals['files'] += 1
+                totals['bytes_original'] += len(data)
+                totals['bytes_compressed'] += smallest
+    return totals
+
+
+if __name__ == '__main__':
+    static_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), 'static')
+    if brotli is None:
+        print("brotli not installed - writing gzip variants only")
+    result = precompress_static(static_dir)
+    print(f"Pre-compressed {result['files']} static files: "
+          f"{result['bytes_original']:,} -> {result['bytes_compressed']:,} bytes")
@@ -26,6 +26,23 @@ class Config:
     MC_ARCHIVE_ENABLED = os.getenv('MC_ARCHIVE_ENABLED', 'true').lower() == 'true'
     MC_ARCHIVE_RETENTION_DAYS = int(os.getenv('MC_ARCHIVE_RETENTION_DAYS', '7'))
 
+    # Message storage engine for live queries: 'memory' (default) or 'sqlite'
+    # The .msgs file always remains the source of truth
+    MC_STORAGE_ENGINE = os.getenv('MC_STORAGE_ENGINE', 'memory').lower()
+
+    # Memory cap of the parser result cache in MB (0 disables it)
+    MC_PARSER_CACHE_MB = int(os.getenv('MC_PARSER_CACHE_MB', '32'))
+
+    # Scan .msgs/archive files through mmap (false = buffered reads)
+    MC_SCAN_MMAP = os.getenv('MC_SCAN_MMAP', 'true').lower() == 'true'
+
+    # Worker processes for large scans (0 = scan in the web process);
+    # capped at the CPU count minus one
+    MC_SCAN_WORKERS = int(os.getenv('MC_SCAN_WORKERS', '2'))
+
+    # Responses smaller than this many bytes are sent uncompressed
+    MC_COMPRESSION_MIN_SIZE = int(os.getenv('MC_COMPRESSION_MIN_SIZE', '1024'))
+
     # Flask server configuration
     FLASK_HOST = os.getenv('FLASK_HOST', '0.0.0.0')
     FLASK_PORT = int(os.getenv('FLASK_PORT', '5000'))
@@ -37,6 +37,20 @@ def _get_adverts_path() -> Path:
     return Path(config.MC_CONFIG_DIR) / f"{device_name}.adverts.jsonl"
 
 
+def get_adverts_version() -> tuple:
+    """
+    Version of the advert log: (inode, size), or (None, 0) if it does not exist.
+
+    Changes whenever the bridge logs an advert - the only way new pending
+    contacts appear.
+    """
+    try:
+        st = _get_adverts_path().stat()
+        return st.st_ino, st.st_size
+    except FileNotFoundError:
+        return None, 0
+
+
 def load_cache() -> dict:
     """Load cache from disk into memory. Returns copy of cache dict."""
     global _cache, _cache_loaded
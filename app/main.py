@@ -13,9 +13,13 @@ from flask_socketio import SocketIO, emit
 from app.config import config, runtime_config
 from app.routes.views import views_bp
 from app.routes.api import api_bp
+from app.compression import init_compression
 from app.version import VERSION_STRING, GIT_BRANCH
 from app.archiver.manager import schedule_daily_archiving
-from app.meshcore.cli import fetch_device_name_from_bridge
+from app.meshcore.tombstones import start_compaction_worker
+from app.meshcore.cli import fetch_device_name_from_bridge, start_bridge_health_monitor
+from app.meshcore.echoes import echo_snapshot
+from app.meshcore.search_index import search_index
 from app.contacts_cache import load_cache, scan_new_adverts, initialize_from_device
 
 # Commands that require longer timeout (in seconds)
@@ -78,6 +82,9 @@ def create_app():
     app.register_blueprint(views_bp)
     app.register_blueprint(api_bp)
 
+    # Compress API responses and serve pre-compressed static files
+    init_compression(app)
+
     # Initialize SocketIO with the app
     # Using 'threading' mode for better compatibility with regular HTTP requests
     # (gevent mode requires monkey-patching and slows down non-WebSocket requests)
@@ -90,6 +97,18 @@ def create_app():
     else:
         logger.info("Archive scheduler disabled")
 
+    # Apply channel deletions to the .msgs file while it is idle
+    start_compaction_worker()
+
+    # Keep a bridge health snapshot for /api/status
+    start_bridge_health_monitor()
+
+    # Keep a local copy of the bridge's echo data for message pages
+    echo_snapshot.start()
+
+    # Index live and archived messages for search in the background
+    search_index.start()
+
     # Fetch device name from bridge in background thread (with retry)
     def init_device_name():
         device_name, source = fetch_device_name_from_bridge()
@@ -5,6 +5,7 @@ MeshCore CLI wrapper - executes meshcli commands via HTTP bridge
 import logging
 import re
 import json
+import threading
 import time
 import requests
 from pathlib import Path
@@ -17,6 +18,14 @@ logger = logging.getLogger(__name__)
 DEFAULT_TIMEOUT = 12  # Reduced from 30s - bridge has 10s + 2s buffer
 RECV_TIMEOUT = 60  # recv can take longer
 
+# Bridge /health is polled in the background so /api/status never waits on it
+BRIDGE_HEALTH_INTERVAL = 10
+BRIDGE_HEALTH_TIMEOUT = 3
+
+_bridge_health_lock = threading.Lock()
+_bridge_health: Dict = {'reachable': False, 'status': None, 'checked_at': None}
+_bridge_health_monitor_started = False
+
 
 class MeshCLIError(Exception):
     """Custom exception for meshcli command failures"""
@@ -229,6 +238,51 @@ def check_connection() -> bool:
     return success
 
 
+def _poll_bridge_health() -> Dict:
+    """Fetch the bridge /health endpoint (does not send anything to the device)."""
+    bridge_health_url = config.MC_BRIDGE_URL.replace('/cli', '/health')
+    snapshot = {'reachable': False, 'status': None, 'checked_at': time.time()}
+    try:
+        response = requests.get(bridge_health_url, timeout=BRIDGE_HEALTH_TIMEOUT)
+        snapshot['reachable'] = response.status_code == 200
+        if snapshot['reachable']:
+            snapshot['status'] = response.json().get('status')
+    except Exception as e:
+        logger.debug(f"Bridge health check failed: {e}")
+    return snapshot
+
+
+def get_bridge_health() -> Dict:
+    """
+    Get the latest bridge health snapshot taken by the monitor thread.
+
+    Returns:
+        Dict with reachable, status ('healthy' when the meshcli session is
+        running) and checked_at (None if no check has completed yet)
+    """
+    with _bridge_health_lock:
+        return dict(_bridge_health)
+
+
+def _bridge_health_monitor():
+    global _bridge_health
+    while True:
+        snapshot = _poll_bridge_health()
+        with _bridge_health_lock:
+            _bridge_health = snapshot
+        time.sleep(BRIDGE_HEALTH_INTERVAL)
+
+
+def start_bridge_health_monitor():
+    """Start the background thread keeping the bridge health snapshot current."""
+    global _bridge_health_monitor_started
+    if _bridge_health_monitor_started:
+        return
+    _bridge_health_monitor_started = True
+    threading.Thread(target=_bridge_health_monitor, daemon=True, name='bridge-health').start()
+    logger.info("Bridge health monitor started")
+
+
 def get_channels() -> Tuple[bool, List[Dict]]:
     """
     Get list of configured channels.
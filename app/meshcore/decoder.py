@@ -0,0 +1,82 @@
+"""
+JSON Lines decoding helpers for .msgs readers
+
+Readers typically want only a few message types out of a file dominated by
+others (channel views skip PRIV/ADVERT lines, DM views skip CHAN lines).
+`has_type` checks the raw line for the quoted type value before anything is
+decoded, and `loads` uses the fastest JSON decoder available:
+orjson, then msgspec, then the standard library.
+"""
+
+import json
+import logging
+from typing import Any, Iterable, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_MESSAGE_TYPES = ('CHAN', 'SENT_CHAN')
+DM_MESSAGE_TYPES = ('PRIV', 'SENT_MSG')
+
+try:
+    import orjson
+
+    DECODER_NAME = 'orjson'
+    _fast_loads = orjson.loads
+    _FAST_ERRORS: Tuple = (orjson.JSONDecodeError,)
+except ImportError:
+    try:
+        import msgspec
+
+        DECODER_NAME = 'msgspec'
+        _fast_loads = msgspec.json.Decoder().decode
+        _FAST_ERRORS = (msgspec.DecodeError,)
+    except ImportError:
+        DECODER_NAME = 'json'
+        _fast_loads = None
+        _FAST_ERRORS = ()
+
+
+def loads(raw: Union[bytes, str]) -> Any:
+    """
+    Decode one JSON line with the fastest available decoder.
+
+    Falls back to the standard library for input the fast decoders reject
+    but `json` accepts (e.g. NaN written by Python's json.dumps), so results
+    never differ from json.loads.
+
+    Raises:
+        json.JSONDecodeError: if the line is not valid JSON
+    """
+    if _fast_loads is not None:
+        try:
+            return _fast_loads(raw)
+        except _FAST_ERRORS:
+            pass
+    return json.loads(raw)
+
+
+def type_tokens(types: Iterable[str]) -> Tuple[bytes, ...]:
+    """Build the byte tokens `has_type` looks for, e.g. ('CHAN',) -> (b'"CHAN"',)."""
+    return tuple(f'"{t}"'.encode('utf-8') for t in types)
+
+
+CHANNEL_TOKENS = type_tokens(CHANNEL_MESSAGE_TYPES)
+DM_TOKENS = type_tokens(DM_MESSAGE_TYPES)
+
+
+def has_type(raw: bytes, tokens: Tuple[bytes, ...]) -> bool:
+    """
+    Cheap pre-filter: can this raw line be one of the wanted message types?
+
+    Looks for the quoted type value anywhere in the line. There are no false
+    negatives ('"CHAN"' never occurs inside '"SENT_CHAN"', and quotes inside
+    message text are escaped), only rare false positives, which the caller
+    rejects after decoding as before.
+    """
+    for token in tokens:
+        if token in raw:
+            return True
+    return False
+
+
+logger.debug(f"Using {DECODER_NAME} for .msgs decoding")
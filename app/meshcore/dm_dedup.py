@@ -0,0 +1,260 @@
+"""
+Persistent DM deduplication index ({device_name}.msgs.dedup)
+
+The same direct message is sometimes logged twice in the .msgs file. A DM
+line is a duplicate if its dedup_key is among the last DEDUP_WINDOW keys
+seen in its conversation. `DedupWindows` holds those rolling windows in
+bounded memory; the in-memory store and exports use it directly.
+
+`DMDedupIndex` judges each DM line of the .msgs file once, as it is
+appended, and persists the offsets of duplicate lines together with the
+windows and the consumed offset. After a restart only new lines are
+examined, and readers scanning the file skip duplicates by offset instead
+of collecting every key of the scan. Both storage engines apply it: the
+SQLite index skips the duplicate offsets when ingesting DMs.
+
+The file is rewritten at most every DEDUP_SAVE_INTERVAL seconds and at
+exit, not for every judged DM; after a crash the lines judged since the
+last save are simply judged again from the saved state.
+
+dedup_key is a blake2b digest (see records.DirectMessage.dedup_key), so
+every process - and every restart - agrees on message identity.
+"""
+
+import atexit
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from app.config import runtime_config
+from app.meshcore import decoder
+from app.meshcore.parser import _parse_priv_record, _parse_sent_record
+from app.meshcore.records import DirectMessage
+from app.meshcore.scan import LineScanner
+
+logger = logging.getLogger(__name__)
+
+# Recent dedup keys remembered per conversation
+DEDUP_WINDOW = 64
+
+# Conversations tracked at once (least recently active ones are forgotten)
+DEDUP_MAX_CONVERSATIONS = 1024
+
+# Bump when the key format or the file layout changes - the index is rebuilt
+INDEX_VERSION = 1
+
+# Minimum seconds between rewrites of the persisted index
+DEDUP_SAVE_INTERVAL = 60
+
+
+def _get_index_path(msgs_file: Path) -> Path:
+    return msgs_file.with_name(msgs_file.name + '.dedup')
+
+
+class DedupWindows:
+    """Rolling windows of recent dedup keys, one per conversation."""
+
+    def __init__(self, window: int = DEDUP_WINDOW, max_conversations: int = DEDUP_MAX_CONVERSATIONS):
+        self._window = window
+        self._max_conversations = max_conversations
+        # conversation_id -> insertion-ordered dict of keys, least recently active first
+        self._windows: OrderedDict = OrderedDict()
+
+    def is_duplicate(self, conversation_id: str, dedup_key: str) -> bool:
+        """
+        Check a message against its conversation's window.
+
+        Returns:
+            True if the key was seen recently; otherwise the key is remembered
+            and False is returned
+        """
+        window = self._windows.get(conversation_id)
+        if window is None:
+            window = self._windows[conversation_id] = {}
+            if len(self._windows) > self._max_conversations:
+                self._windows.popitem(last=False)
+        else:
+            self._windows.move_to_end(conversation_id)
+
+        if dedup_key in window:
+            return True
+        window[dedup_key] = None
+        if len(window) > self._window:
+            del window[next(iter(window))]
+        return False
+
+    def to_json(self) -> Dict[str, List[str]]:
+        return {conversation_id: list(window) for conversation_id, window in self._windows.items()}
+
+    @classmethod
+    def from_json(cls, data: Dict[str, List[str]]) -> 'DedupWindows':
+        windows = cls()
+        for conversation_id, keys in data.items():
+            windows._windows[conversation_id] = dict.fromkeys(keys[-windows._window:])
+        return windows
+
+
+def _dm_record(data: Dict) -> Optional[DirectMessage]:
+    """DirectMessage of a decoded PRIV / SENT_MSG line (None for anything else)."""
+    msg_type = data.get('type')
+    if msg_type == 'PRIV':
+        return _parse_priv_record(data)
+    if msg_type == 'SENT_MSG':
+        return _parse_sent_record(data)
+    return None
+
+
+class DMDedupIndex:
+    """Incrementally maintained, persisted set of duplicate DM line offsets."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._msgs_file: Optional[Path] = None
+        self._saved_at: Optional[float] = None
+        self._reset()
+        atexit.register(self.flush)
+
+    def _reset(self, inode: Optional[int] = None):
+        self._inode = inode
+        self._offset = 0
+        self._windows = DedupWindows()
+        self._duplicates: FrozenSet[int] = frozenset()
+        self._dirty = False
+
+    # -------------------------------------------------------------------------
+    # Persistence
+    # -------------------------------------------------------------------------
+
+    def _load(self, msgs_file: Path):
+        self._reset()
+        index_path = _get_index_path(msgs_file)
+        if not index_path.exists():
+            return
+
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != INDEX_VERSION or data.get('window') != DEDUP_WINDOW:
+                raise ValueError("index format changed")
+            self._inode = data['inode']
+            self._offset = data['offset']
+            self._windows = DedupWindows.from_json(data['windows'])
+            self._duplicates = frozenset(data['duplicates'])
+            logger.debug(f"Loaded DM dedup index {index_path}: {len(self._duplicates)} duplicates")
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable DM dedup index {index_path}: {e}")
+            self._reset()
+
+    def _save(self, msgs_file: Path):
+        index_path = _get_index_path(msgs_file)
+        try:
+            temp_file = index_path.with_suffix('.dedup.tmp')
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'version': INDEX_VERSION,
+                    'window': DEDUP_WINDOW,
+                    'inode': self._inode,
+                    'offset': self._offset,
+                    'duplicates': sorted(self._duplicates),
+                    'windows': self._windows.to_json(),
+                }, f, ensure_ascii=False)
+            temp_file.replace(index_path)
+            self._dirty = False
+        except Exception as e:
+            logger.warning(f"Failed to save DM dedup index {index_path}: {e}")
+        self._saved_at = time.monotonic()
+
+    def flush(self):
+        """Persist judgements not saved yet (called at exit)."""
+        with self._lock:
+            if self._dirty and self._msgs_file is not None:
+                self._save(self._msgs_file)
+
+    # -------------------------------------------------------------------------
+    # Maintenance
+    # -------------------------------------------------------------------------
+
+    def update(self) -> bool:
+        """
+        Judge the DM lines appended to the .msgs file since the last update.
+
+        Returns:
+            True if the messages file exists, False otherwise
+        """
+        msgs_file = runtime_config.get_msgs_file_path()
+
+        with self._lock:
+            try:
+                st = os.stat(msgs_file)
+            except FileNotFoundError:
+                return False
+
+            if msgs_file != self._msgs_file:
+                if self._dirty and self._msgs_file is not None:
+                    self._save(self._msgs_file)
+                self._msgs_file = msgs_file
+                self._load(msgs_file)
+
+            if self._inode != st.st_ino or st.st_size < self._offset:
+                if self._inode is not None:
+                    logger.info(f"Messages file replaced or truncated, rebuilding DM dedup index: {msgs_file}")
+                self._reset(st.st_ino)
+
+            if st.st_size > self._offset:
+                self._scan(msgs_file)
+
+            return True
+
+    def _scan(self, msgs_file: Path):
+        duplicates = set()
+        judged = 0
+
+        scanner = LineScanner(msgs_file, start=self._offset, tokens=decoder.DM_TOKENS)
+        try:
+            for line_offset, line in scanner:
+                try:
+                    record = _dm_record(decoder.loads(line))
+                except (json.JSONDecodeError, AttributeError):
+                    continue
+                if not record:
+                    continue
+                judged += 1
+                if self._windows.is_duplicate(record.conversation_id, record.dedup_key):
+                    duplicates.add(line_offset)
+        except Exception as e:
+            logger.error(f"Error updating DM dedup index: {e}")
+
+        self._offset = scanner.end_offset
+        if duplicates:
+            self._duplicates = self._duplicates | duplicates
+
+        # Lines without DMs are cheap to rescan after a restart - only
+        # persist when the windows changed, and not more often than
+        # DEDUP_SAVE_INTERVAL (the first scan after start is saved at once)
+        if judged:
+            self._dirty = True
+        if self._dirty and (self._saved_at is None or time.monotonic() - self._saved_at >= DEDUP_SAVE_INTERVAL):
+            self._save(msgs_file)
+
+    # -------------------------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------------------------
+
+    def snapshot(self) -> Tuple[int, FrozenSet[int]]:
+        """
+        Get the consumed offset and the duplicate line offsets before it.
+
+        Readers should stop at the returned offset: later lines have not
+        been judged yet.
+        """
+        with self._lock:
+            return self._offset, self._duplicates
+
+
+# Global DM dedup index instance
+dm_dedup_index = DMDedupIndex()
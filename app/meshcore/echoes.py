@@ -0,0 +1,168 @@
+"""
+Local snapshot of the bridge's echo data ("Heard X repeats" and paths)
+
+Live message pages merge echo data into every message. Instead of fetching
+the bridge's complete /echo_counts on each request, a background thread
+keeps a local copy: it asks for the entries changed since the last version
+it saw (`since_version`) and applies the diff, falling back to a full copy
+when the bridge restarted (new epoch), cannot serve the diff, or predates
+versioning. Requests only read the snapshot, so merging echo data adds no
+bridge round-trip to a message page.
+
+Sent echo entries are indexed by (channel_idx, timestamp bucket) and
+incoming paths by pkt_payload; each sync that changes anything builds new
+indexes and swaps them in, so readers never see a half-applied diff.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from app.config import config
+from app.meshcore import decoder
+
+logger = logging.getLogger(__name__)
+
+# Seconds between echo syncs with the bridge
+ECHO_SYNC_INTERVAL = 2
+ECHO_SYNC_TIMEOUT = 2
+
+# Own messages match sent echo entries within this many seconds
+ECHO_MATCH_WINDOW = 5
+
+
+def index_echo_counts(echo_counts: List[Dict]) -> Dict:
+    """
+    Index sent echo entries by (channel_idx, timestamp bucket).
+
+    Buckets are ECHO_MATCH_WINDOW seconds wide, so every entry within the
+    window of a timestamp is in its bucket or one of the two neighbours.
+    Entries keep their position in the list, which decides between several
+    matches.
+    """
+    index = {}
+    for position, ec in enumerate(echo_counts):
+        bucket = int(ec['timestamp'] // ECHO_MATCH_WINDOW)
+        index.setdefault((ec.get('channel_idx'), bucket), []).append((position, ec))
+    return index
+
+
+def find_echo_count(index: Dict, channel_idx, timestamp) -> Optional[Dict]:
+    """First echo entry (in list order) of the channel sent within the match window, or None."""
+    bucket = int(timestamp // ECHO_MATCH_WINDOW)
+    best = None
+    for key in ((channel_idx, bucket - 1), (channel_idx, bucket), (channel_idx, bucket + 1)):
+        for position, ec in index.get(key, ()):
+            if abs(timestamp - ec['timestamp']) < ECHO_MATCH_WINDOW and (best is None or position < best[0]):
+                best = (position, ec)
+    return best[1] if best else None
+
+
+class EchoSnapshot:
+    """Incrementally synced copy of the bridge's echo data."""
+
+    def __init__(self):
+        self._lock = threading.Lock()  # Serializes syncs; readers only swap-read _indexes
+        self._epoch: Optional[str] = None
+        self._version: Optional[int] = None
+        self._sent: Dict[str, Dict] = {}
+        self._incoming: Dict[str, Dict] = {}
+        self._indexes: Optional[Tuple[Dict, Dict]] = None
+        self._synced_at: Optional[float] = None
+        self._sync_started = False
+
+    def sync(self) -> bool:
+        """
+        Bring the snapshot up to date with the bridge.
+
+        Returns:
+            True if the bridge answered, False otherwise
+        """
+        with self._lock:
+            params = {}
+            if self._epoch is not None and self._version is not None:
+                params = {'since_version': self._version, 'epoch': self._epoch}
+
+            try:
+                response = requests.get(config.MC_BRIDGE_URL.replace('/cli', '/echo_counts'),
+                                        params=params, timeout=ECHO_SYNC_TIMEOUT)
+                if not response.ok:
+                    return False
+                data = decoder.loads(response.content)
+            except Exception as e:
+                logger.debug(f"Echo sync failed (non-critical): {e}")
+                return False
+
+            self._synced_at = time.time()
+
+            # Bridges without versioning always send everything
+            full = data.get('full', True)
+            version = data.get('version')
+            if not full and version == self._version:
+                return True
+
+            sent = {} if full else dict(self._sent)
+            incoming = {} if full else dict(self._incoming)
+            for pkt_payload in data.get('removed', []):
+                sent.pop(pkt_payload, None)
+                incoming.pop(pkt_payload, None)
+            for ec in data.get('echo_counts', []):
+                sent[ec['pkt_payload']] = ec
+            for ip in data.get('incoming_paths', []):
+                incoming[ip['pkt_payload']] = ip
+
+            self._sent = sent
+            self._incoming = incoming
+            self._epoch = data.get('epoch')
+            self._version = version
+            self._indexes = (index_echo_counts(list(sent.values())), incoming)
+
+            if full:
+                logger.debug(f"Echo snapshot loaded: {len(sent)} sent, {len(incoming)} incoming (version {version})")
+            return True
+
+    def get(self) -> Optional[Tuple[Dict, Dict]]:
+        """
+        Get the indexed echo data.
+
+        Syncs inline only if the snapshot was never loaded (e.g. the sync
+        thread is not running yet).
+
+        Returns:
+            Tuple of (sent echo index for find_echo_count, incoming paths by
+            pkt_payload), or None if no echo data is available
+        """
+        indexes = self._indexes
+        if indexes is None and not self._sync_started:
+            self.sync()
+            indexes = self._indexes
+        return indexes
+
+    def status(self) -> Dict:
+        return {
+            'epoch': self._epoch,
+            'version': self._version,
+            'synced_at': self._synced_at,
+            'sent': len(self._sent),
+            'incoming': len(self._incoming),
+        }
+
+    def _sync_loop(self):
+        while True:
+            self.sync()
+            time.sleep(ECHO_SYNC_INTERVAL)
+
+    def start(self):
+        """Start the background thread keeping the snapshot current."""
+        if self._sync_started:
+            return
+        self._sync_started = True
+        threading.Thread(target=self._sync_loop, daemon=True, name='echo-sync').start()
+        logger.info("Echo snapshot sync started")
+
+
+# Global echo snapshot instance
+echo_snapshot = EchoSnapshot()
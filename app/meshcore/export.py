@@ -0,0 +1,224 @@
+"""
+Streaming export of channel and DM history (NDJSON / CSV)
+
+Rows are read straight from the .msgs file (or one archive file) and
+serialized as they are produced, so an export never holds more than one
+output chunk in memory no matter how much history it covers. With a
+from_date on the live file, the sidecar offset index is used to seek past
+older lines instead of decoding them.
+"""
+
+import csv
+import io
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from app.config import runtime_config
+from app.meshcore import decoder
+from app.meshcore.dm_dedup import DedupWindows
+from app.meshcore.parser import (
+    TAIL_READ_SLACK_SECONDS,
+    _parse_priv_record,
+    _parse_sent_record,
+    parse_channel_record,
+)
+from app.meshcore.records import ChannelMessage, DirectMessage, format_datetime
+from app.meshcore.scan import LineScanner
+
+logger = logging.getLogger(__name__)
+
+# Output is flushed to the client in chunks of about this many bytes
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+CHANNEL_CSV_FIELDS = ['timestamp', 'datetime', 'channel_idx', 'sender', 'content', 'is_own',
+                      'snr', 'path_len', 'sender_timestamp', 'txt_type']
+
+DM_CSV_FIELDS = ['timestamp', 'datetime', 'conversation_id', 'direction', 'sender', 'recipient',
+                 'content', 'snr', 'path_len', 'pubkey_prefix', 'txt_type']
+
+
+def _iter_raw_lines(file_path: Path, tokens, from_ts: Optional[float],
+                    to_ts: Optional[float], live: bool) -> Iterator[Dict]:
+    """
+    Yield decoded lines of the given types within [from_ts, to_ts), in file order.
+
+    Stops once lines are newer than to_ts (plus TAIL_READ_SLACK_SECONDS),
+    and for the live file starts at the offset index position of from_ts.
+    """
+    start_offset = 0
+    if live and from_ts is not None:
+        from app.meshcore.msgs_index import msgs_offset_index
+        if msgs_offset_index.update():
+            start_offset = msgs_offset_index.offset_for_timestamp(from_ts)
+
+    for _, line in LineScanner(file_path, start=start_offset, tokens=tokens):
+        try:
+            data = decoder.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if not isinstance(data, dict):
+            continue
+
+        timestamp = data.get('timestamp', 0)
+        if to_ts is not None and timestamp >= to_ts + TAIL_READ_SLACK_SECONDS:
+            break
+        if from_ts is not None and timestamp < from_ts:
+            continue
+        if to_ts is not None and timestamp >= to_ts:
+            continue
+        yield data
+
+
+def iter_channel_export(file_path: Path, channel_idx: Optional[int] = None,
+                        from_ts: Optional[float] = None, to_ts: Optional[float] = None,
+                        live: bool = True) -> Iterator[ChannelMessage]:
+    """
+    Yield channel messages of a .msgs/archive file in file order.
+
+    Args:
+        file_path: File to export from
+        channel_idx: Filter by channel (None = all channels)
+        from_ts, to_ts: Timestamp window [from_ts, to_ts) (None = unbounded)
+        live: file_path is the live .msgs file (tombstones apply, offset index usable)
+    """
+    allowed_channels = [channel_idx] if channel_idx is not None else None
+
+    tombstones = {}
+    if live:
+        from app.meshcore.tombstones import tombstone_log
+        tombstones = tombstone_log.get()
+
+    for data in _iter_raw_lines(file_path, decoder.CHANNEL_TOKENS, from_ts, to_ts, live):
+        record = parse_channel_record(data, allowed_channels=allowed_channels)
+        if not record:
+            continue
+        cutoff = tombstones.get(record.channel_idx)
+        if cutoff is not None and record.timestamp <= cutoff:
+            continue
+        yield record
+
+
+def _load_pubkey_to_name(file_path: Path, live: bool) -> Dict[str, str]:
+    """pubkey_prefix -> most recent name of the PRIV messages in a file."""
+    if live:
+        from app.meshcore.msgs_index import msgs_offset_index
+        if msgs_offset_index.update():
+            return msgs_offset_index.get_pubkey_to_name()
+
+    pubkey_to_name = {}
+    for data in _iter_raw_lines(file_path, decoder.type_tokens(('PRIV',)), None, None, live=False):
+        if data.get('type') == 'PRIV':
+            record = _parse_priv_record(data)
+            if record and record.pubkey_prefix:
+                pubkey_to_name[record.pubkey_prefix] = record.sender
+    return pubkey_to_name
+
+
+def _conversation_matches(msg_conversation_id: str, conversation_id: str,
+                          pubkey_to_name: Dict[str, str]) -> bool:
+    """Same conversation matching as read_dm_messages (pk_ and name_ ids are linked by name)."""
+    if msg_conversation_id == conversation_id:
+        return True
+    if conversation_id.startswith('pk_'):
+        name = pubkey_to_name.get(conversation_id[3:])
+        return bool(name) and msg_conversation_id == f"name_{name}"
+    if conversation_id.startswith('name_'):
+        name = conversation_id[5:]
+        return any(n == name and msg_conversation_id == f"pk_{pk}"
+                   for pk, n in pubkey_to_name.items())
+    return False
+
+
+def iter_dm_export(file_path: Path, conversation_id: Optional[str] = None,
+                   from_ts: Optional[float] = None, to_ts: Optional[float] = None,
+                   live: bool = True) -> Iterator[DirectMessage]:
+    """
+    Yield direct messages (PRIV and SENT_MSG) of a .msgs/archive file in file order.
+
+    Args:
+        file_path: File to export from
+        conversation_id: Filter by conversation (None = all conversations)
+        from_ts, to_ts: Timestamp window [from_ts, to_ts) (None = unbounded)
+        live: file_path is the live .msgs file (offset index usable)
+    """
+    pubkey_to_name = _load_pubkey_to_name(file_path, live) if conversation_id else {}
+    # Bounded per-conversation windows keep DM exports in constant memory
+    dedup = DedupWindows()
+
+    for data in _iter_raw_lines(file_path, decoder.DM_TOKENS, from_ts, to_ts, live):
+        msg_type = data.get('type')
+        if msg_type == 'PRIV':
+            record = _parse_priv_record(data)
+        elif msg_type == 'SENT_MSG':
+            record = _parse_sent_record(data)
+        else:
+            continue
+        if not record:
+            continue
+
+        if dedup.is_duplicate(record.conversation_id, record.dedup_key):
+            continue
+
+        if conversation_id and not _conversation_matches(record.conversation_id, conversation_id,
+                                                         pubkey_to_name):
+            continue
+        yield record
+
+
+def _csv_row(record, fields: List[str]) -> List:
+    row = []
+    for field in fields:
+        if field == 'datetime':
+            row.append(format_datetime(record.timestamp))
+        elif field == 'direction':
+            row.append(record.direction)
+        else:
+            value = getattr(record, field, None)
+            row.append('' if value is None else value)
+    return row
+
+
+def stream_ndjson(records: Iterable) -> Iterator[str]:
+    """Serialize records as JSON Lines (the same objects the API returns), in chunks."""
+    chunk = []
+    size = 0
+    for record in records:
+        line = json.dumps(record.to_dict(), ensure_ascii=False) + '\n'
+        chunk.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        yield ''.join(chunk)
+
+
+def stream_csv(records: Iterable, fields: List[str]) -> Iterator[str]:
+    """Serialize records as CSV with a header row, in chunks."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for record in records:
+        writer.writerow(_csv_row(record, fields))
+        if buffer.tell() >= EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def get_export_source(archive_date: Optional[str] = None):
+    """
+    Resolve the file to export from.
+
+    Returns:
+        Tuple of (file path, is_live_file)
+    """
+    if archive_date:
+        from app.archiver.manager import get_archive_path
+        return get_archive_path(archive_date), False
+    return runtime_config.get_msgs_file_path(), True
@@ -0,0 +1,253 @@
+"""
+Sidecar offset index for the .msgs file ({device_name}.msgs.idx)
+
+Stores sparse (timestamp, byte offset) samples - one every SAMPLE_EVERY
+lines - so readers with a days= window can bisect to the first interesting
+offset and start parsing there instead of decoding years of history.
+
+Each sample records the maximum timestamp of all lines *before* its offset,
+which keeps the sample timestamps monotonic even though .msgs lines are only
+approximately time-ordered: every line before a sample whose timestamp is
+below the cutoff is guaranteed to be older than the cutoff.
+
+The index is maintained incrementally (only bytes appended since the last
+update are scanned), persisted atomically next to the .msgs file, and
+rebuilt when the .msgs inode changes or its size goes backwards.
+
+It also keeps the pubkey_prefix -> name mapping of PRIV messages, so DM
+readers that skip old lines still resolve conversations exactly as a full
+scan would.
+
+File layout:
+    MAGIC | uint32 header length | JSON header | samples as <dQ pairs
+"""
+
+import json
+import logging
+import os
+import re
+import struct
+from bisect import bisect_left
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Optional
+
+from app.config import runtime_config
+from app.meshcore import decoder
+from app.meshcore.parser import _parse_priv_record
+from app.meshcore.scan import LineScanner
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'MCIDX1\n'
+SAMPLE_FORMAT = '<dQ'
+SAMPLE_SIZE = struct.calcsize(SAMPLE_FORMAT)
+
+# One sample per this many lines (~16 bytes per sample)
+SAMPLE_EVERY = 1000
+
+# Top-level "timestamp" key only - "sender_timestamp" is preceded by '_', not '"'
+_TIMESTAMP_RE = re.compile(rb'"timestamp":\s*(-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)')
+
+
+def _get_index_path(msgs_file: Path) -> Path:
+    return msgs_file.with_name(msgs_file.name + '.idx')
+
+
+def _extract_timestamp(raw: bytes) -> Optional[float]:
+    """Get the top-level timestamp of a raw .msgs line without a full JSON decode."""
+    match = _TIMESTAMP_RE.search(raw)
+    if match:
+        return float(match.group(1))
+    try:
+        return float(decoder.loads(raw).get('timestamp', 0))
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+class MsgsOffsetIndex:
+    """Incrementally maintained, persisted timestamp -> offset index for the .msgs file."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._msgs_file: Optional[Path] = None
+        self._reset()
+
+    def _reset(self, inode: Optional[int] = None):
+        self._inode = inode
+        self._indexed_size = 0
+        self._running_max = float('-inf')
+        self._lines_since_sample = 0
+        self._sample_ts: List[float] = []
+        self._sample_offsets: List[int] = []
+        self._pubkey_to_name: Dict[str, str] = {}
+
+    def invalidate(self):
+        """Forget the in-memory state; the next update reloads or rebuilds it."""
+        with self._lock:
+            self._msgs_file = None
+            self._reset()
+
+    # -------------------------------------------------------------------------
+    # Persistence
+    # -------------------------------------------------------------------------
+
+    def _load(self, msgs_file: Path):
+        self._reset()
+        index_path = _get_index_path(msgs_file)
+        if not index_path.exists():
+            return
+
+        try:
+            raw = index_path.read_bytes()
+            if not raw.startswith(MAGIC):
+                raise ValueError("bad magic")
+            pos = len(MAGIC)
+            (header_len,) = struct.unpack_from('<I', raw, pos)
+            pos += 4
+            header = json.loads(raw[pos:pos + header_len])
+            pos += header_len
+
+            if header.get('sample_every') != SAMPLE_EVERY:
+                raise ValueError("sampling interval changed")
+
+            sample_count = (len(raw) - pos) // SAMPLE_SIZE
+            for ts, offset in struct.iter_unpack(SAMPLE_FORMAT, raw[pos:pos + sample_count * SAMPLE_SIZE]):
+                self._sample_ts.append(ts)
+                self._sample_offsets.append(offset)
+
+            self._inode = header['inode']
+            self._indexed_size = header['indexed_size']
+            self._running_max = header['running_max'] if header['running_max'] is not None else float('-inf')
+            self._lines_since_sample = header['lines_since_sample']
+            self._pubkey_to_name = header.get('pubkey_to_name', {})
+            logger.debug(f"Loaded offset index {index_path}: {sample_count} samples, {self._indexed_size} bytes")
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable offset index {index_path}: {e}")
+            self._reset()
+
+    def _save(self, msgs_file: Path):
+        index_path = _get_index_path(msgs_file)
+        header = json.dumps({
+            'inode': self._inode,
+            'indexed_size': self._indexed_size,
+            'running_max': self._running_max if self._running_max != float('-inf') else None,
+            'lines_since_sample': self._lines_since_sample,
+            'sample_every': SAMPLE_EVERY,
+            'pubkey_to_name': self._pubkey_to_name,
+        }, ensure_ascii=False).encode('utf-8')
+
+        try:
+            temp_file = index_path.with_suffix('.idx.tmp')
+            with open(temp_file, 'wb') as f:
+                f.write(MAGIC)
+                f.write(struct.pack('<I', len(header)))
+                f.write(header)
+                for sample in zip(self._sample_ts, self._sample_offsets):
+                    f.write(struct.pack(SAMPLE_FORMAT, *sample))
+            temp_file.replace(index_path)
+        except Exception as e:
+            logger.warning(f"Failed to save offset index {index_path}: {e}")
+
+    # -------------------------------------------------------------------------
+    # Maintenance
+    # -------------------------------------------------------------------------
+
+    def update(self) -> bool:
+        """
+        Bring the index up to date with the .msgs file.
+
+        Returns:
+            True if the messages file exists, False otherwise
+        """
+        msgs_file = runtime_config.get_msgs_file_path()
+
+        with self._lock:
+            try:
+                st = os.stat(msgs_file)
+            except FileNotFoundError:
+                return False
+
+            if msgs_file != self._msgs_file:
+                self._msgs_file = msgs_file
+                self._load(msgs_file)
+
+            if self._inode != st.st_ino or st.st_size < self._indexed_size:
+                if self._inode is not None:
+                    logger.info(f"Messages file replaced or truncated, rebuilding offset index: {msgs_file}")
+                self._reset(st.st_ino)
+
+            if st.st_size > self._indexed_size:
+                self._scan(msgs_file)
+
+            return True
+
+    def _scan(self, msgs_file: Path):
+        """Sample timestamps of lines appended since the last update."""
+        offset = self._indexed_size
+        samples_before = len(self._sample_offsets)
+        names_changed = False
+
+        scanner = LineScanner(msgs_file, start=offset)
+        try:
+            for line_offset, raw in scanner:
+                if self._lines_since_sample >= SAMPLE_EVERY:
+                    self._sample_ts.append(self._running_max)
+                    self._sample_offsets.append(line_offset)
+                    self._lines_since_sample = 0
+
+                if not raw.strip():
+                    continue
+                self._lines_since_sample += 1
+
+                timestamp = _extract_timestamp(raw)
+                if timestamp is not None and timestamp > self._running_max:
+                    self._running_max = timestamp
+
+                if b'"PRIV"' in raw:
+                    try:
+                        record = _parse_priv_record(decoder.loads(raw))
+                    except (json.JSONDecodeError, AttributeError):
+                        record = None
+                    if record and record.pubkey_prefix:
+                        if self._pubkey_to_name.get(record.pubkey_prefix) != record.sender:
+                            self._pubkey_to_name[record.pubkey_prefix] = record.sender
+                            names_changed = True
+        except Exception as e:
+            logger.error(f"Error updating offset index: {e}")
+
+        self._indexed_size = scanner.end_offset
+
+        # Persist only when something a reader relies on changed - the few
+        # lines after the last sample are cheap to rescan after a restart
+        if len(self._sample_offsets) != samples_before or names_changed:
+            self._save(msgs_file)
+
+    # -------------------------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------------------------
+
+    def offset_for_timestamp(self, cutoff_timestamp: float, margin_samples: int = 0) -> int:
+        """
+        Get a byte offset before which every line is older than `cutoff_timestamp`.
+
+        Args:
+            cutoff_timestamp: Oldest timestamp the caller is interested in
+            margin_samples: Step back this many extra samples (e.g. so that
+                            duplicates straddling the cutoff are still seen)
+
+        Returns:
+            Byte offset to start reading from (0 = beginning of file)
+        """
+        with self._lock:
+            pos = bisect_left(self._sample_ts, cutoff_timestamp) - 1 - margin_samples
+            return self._sample_offsets[pos] if pos >= 0 else 0
+
+    def get_pubkey_to_name(self) -> Dict[str, str]:
+        """Map pubkey_prefix -> most recent PRIV sender name in the indexed part of the file."""
+        with self._lock:
+            return dict(self._pubkey_to_name)
+
+
+# Global offset index instance
+msgs_offset_index = MsgsOffsetIndex()
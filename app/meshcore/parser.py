@@ -3,27 +3,34 @@ Message parser - reads and parses .msgs file (JSON Lines format)
 Supports channel messages (CHAN, SENT_CHAN) and direct messages (PRIV, SENT_MSG)
 """
 
+import base64
+import heapq
 import json
 import logging
+import os
 import time
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import Iterator, List, Dict, Optional, Tuple
 from datetime import datetime, timedelta
 from app.config import config, runtime_config
+from app.meshcore import decoder
+from app.meshcore.records import ChannelMessage, DirectMessage
+from app.meshcore.result_cache import result_cache
+from app.meshcore.scan import LineScanner
 
 logger = logging.getLogger(__name__)
 
 
-def parse_message(line: Dict, allowed_channels: Optional[List[int]] = None) -> Optional[Dict]:
+def parse_channel_record(line: Dict, allowed_channels: Optional[List[int]] = None) -> Optional[ChannelMessage]:
     """
-    Parse a single message line from .msgs file.
+    Parse a single message line from .msgs file into a compact record.
 
     Args:
         line: Raw JSON object from .msgs file
         allowed_channels: List of channel indices to include (None = all channels)
 
     Returns:
-        Parsed message dict or None if not a valid chat message
+        ChannelMessage or None if not a valid chat message
     """
     msg_type = line.get('type')
     channel_idx = line.get('channel_idx', 0)
@@ -36,7 +43,6 @@ def parse_message(line: Dict, allowed_channels: Optional[List[int]] = None) -> O
     if msg_type not in ['CHAN', 'SENT_CHAN']:
         return None
 
-    timestamp = line.get('timestamp', 0)
     raw_text = line.get('text', '')
     text = raw_text.strip()
 
@@ -50,31 +56,71 @@ def parse_message(line: Dict, allowed_channels: Optional[List[int]] = None) -> O
     if is_own:
         # For sent messages, use 'sender' field (meshcore-cli 1.3.12+)
         sender = line.get('sender', runtime_config.get_device_name())
-        content = text
-    else:
+    elif ':' in text:
         # For received messages, extract sender from "SenderName: message" format
-        if ':' in text:
-            sender, content = text.split(':', 1)
-            sender = sender.strip()
-            content = content.strip()
-        else:
-            # Fallback if format is unexpected
-            sender = "Unknown"
-            content = text
+        sender = text.split(':', 1)[0].strip()
+    else:
+        # Fallback if format is unexpected
+        sender = "Unknown"
+
+    return ChannelMessage(
+        sender=sender,
+        raw_text=raw_text,
+        timestamp=line.get('timestamp', 0),
+        is_own=is_own,
+        snr=line.get('SNR'),
+        path_len=line.get('path_len'),
+        channel_idx=channel_idx,
+        sender_timestamp=line.get('sender_timestamp'),
+        txt_type=line.get('txt_type', 0)
+    )
+
+
+def parse_message(line: Dict, allowed_channels: Optional[List[int]] = None) -> Optional[Dict]:
+    """
+    Parse a single message line from .msgs file.
+
+    Args:
+        line: Raw JSON object from .msgs file
+        allowed_channels: List of channel indices to include (None = all channels)
+
+    Returns:
+        Parsed message dict or None if not a valid chat message
+    """
+    record = parse_channel_record(line, allowed_channels)
+    return record.to_dict() if record else None
+
+
+def _live_sources(**_) -> List[Path]:
+    """Source files of results read from the live .msgs file (for result_cache)."""
+    return [runtime_config.get_msgs_file_path()]
+
+
+def _archive_sources(archive_date: str, **_) -> List[Path]:
+    """Source files of results read from an archive (for result_cache)."""
+    from app.archiver.manager import get_archive_path
+    return [get_archive_path(archive_date)]
 
-    return {
-        'sender': sender,
-        'content': content,
-        'timestamp': timestamp,
-        'datetime': datetime.fromtimestamp(timestamp).isoformat() if timestamp > 0 else None,
-        'is_own': is_own,
-        'snr': line.get('SNR'),
-        'path_len': line.get('path_len'),
-        'channel_idx': channel_idx,
-        'sender_timestamp': line.get('sender_timestamp'),
-        'txt_type': line.get('txt_type', 0),
-        'raw_text': raw_text
-    }
+
+def _get_message_backend():
+    """
+    Return the storage engine answering live .msgs queries, brought up to date.
+
+    Uses the SQLite index when MC_STORAGE_ENGINE=sqlite, otherwise (or if the
+    database cannot be used) the in-memory message store.
+
+    Returns:
+        Tuple of (backend, file_exists)
+    """
+    if config.MC_STORAGE_ENGINE == 'sqlite':
+        from app.meshcore.sqlite_index import sqlite_index
+        try:
+            return sqlite_index, sqlite_index.refresh()
+        except Exception as e:
+            logger.error(f"SQLite message index unavailable, using in-memory store: {e}")
+
+    from app.meshcore.store import message_store
+    return message_store, message_store.refresh()
 
 
 def read_messages(limit: Optional[int] = None, offset: int = 0, archive_date: Optional[str] = None, days: Optional[int] = None, channel_idx: Optional[int] = None) -> List[Dict]:
@@ -95,59 +141,201 @@ def read_messages(limit: Optional[int] = None, offset: int = 0, archive_date: Op
     if archive_date:
         return read_archive_messages(archive_date, limit, offset, channel_idx)
 
-    msgs_file = runtime_config.get_msgs_file_path()
+    return _read_live_messages(limit=limit, offset=offset, days=days, channel_idx=channel_idx)
 
-    if not msgs_file.exists():
-        logger.warning(f"Messages file not found: {msgs_file}")
+
+@result_cache.memoize(_live_sources)
+def _read_live_messages(limit: Optional[int], offset: int, days: Optional[int],
+                        channel_idx: Optional[int]) -> List[Dict]:
+    """read_messages for the live .msgs file (cached until the file changes)."""
+    # Live messages are served from an incrementally maintained index,
+    # which only parses lines appended since the previous call
+    backend, exists = _get_message_backend()
+    if not exists:
+        logger.warning(f"Messages file not found: {runtime_config.get_msgs_file_path()}")
         return []
 
-    # Determine allowed channels
-    allowed_channels = [channel_idx] if channel_idx is not None else None
+    messages = backend.get_messages(
+        channel_idx=channel_idx,
+        days=days,
+        offset=offset,
+        limit=limit
+    )
 
-    messages = []
+    logger.info(f"Loaded {len(messages)} messages from {runtime_config.get_msgs_file_path()}")
+    return messages
 
-    try:
-        with open(msgs_file, 'r', encoding='utf-8') as f:
-            for line_num, line in enumerate(f, 1):
-                line = line.strip()
-                if not line:
-                    continue
 
-                try:
-                    data = json.loads(line)
-                    parsed = parse_message(data, allowed_channels=allowed_channels)
-                    if parsed:
-                        messages.append(parsed)
-                except json.JSONDecodeError as e:
-                    logger.warning(f"Invalid JSON at line {line_num}: {e}")
-                    continue
-                except Exception as e:
-                    logger.error(f"Error parsing line {line_num}: {e}")
-                    continue
+def read_messages_page(limit: int, channel_idx: Optional[int] = None, archive_date: Optional[str] = None,
+                       days: Optional[int] = None, before: Optional[str] = None,
+                       after: Optional[str] = None) -> Dict:
+    """
+    Read one page of messages next to an opaque cursor.
+
+    Args:
+        limit: Page size
+        channel_idx: Filter messages by channel (None = all channels)
+        archive_date: Read from the archive for this date (YYYY-MM-DD)
+        days: Only messages from the last N days (live messages only)
+        before: Cursor - return the newest messages older than it
+        after: Cursor - return the oldest messages newer than it
+               (without either, the newest page - same as read_messages(limit=...))
+
+    Returns:
+        {'messages': [...oldest first], 'has_more': bool (more messages in
+         the paging direction), 'cursors': {'before': cursor of the first
+         message, 'after': cursor of the last message}}
+
+    Raises:
+        ValueError: if a cursor is malformed
+    """
+    before_key = decode_cursor(before) if before else None
+    after_key = decode_cursor(after) if after else None
+
+    if archive_date:
+        from app.archiver.manager import get_archive_path
+        archive_file = get_archive_path(archive_date)
+        if not archive_file.exists():
+            logger.warning(f"Archive file not found: {archive_file}")
+            page = {'messages': [], 'first': None, 'last': None, 'has_more': False}
+        else:
+            page = read_file_page(archive_file, limit, channel_idx=channel_idx,
+                                  before=before_key, after=after_key)
+    else:
+        backend, exists = _get_message_backend()
+        if not exists:
+            logger.warning(f"Messages file not found: {runtime_config.get_msgs_file_path()}")
+            page = {'messages': [], 'first': None, 'last': None, 'has_more': False}
+        else:
+            page = backend.get_page(channel_idx=channel_idx, limit=limit, days=days,
+                                    before=before_key, after=after_key)
+
+    return {
+        'messages': page['messages'],
+        'has_more': page['has_more'],
+        'cursors': {
+            'before': encode_cursor(page['first']) if page['first'] else None,
+            'after': encode_cursor(page['last']) if page['last'] else None
+        }
+    }
+
+
+def encode_delta_cursor(inode: int, offset: int) -> str:
+    """Opaque delta-sync cursor: a byte offset in a particular .msgs file."""
+    return base64.urlsafe_b64encode(f"{inode}:{offset}".encode('ascii')).decode('ascii').rstrip('=')
+
 
+def decode_delta_cursor(cursor: str) -> Tuple[int, int]:
+    """
+    Decode a cursor produced by encode_delta_cursor.
+
+    Raises:
+        ValueError: if the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('ascii')
+        inode, offset = raw.split(':')
+        return int(inode), int(offset)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def _complete_lines_end(f, size: int) -> int:
+    """Offset just past the last complete line of an open file of `size` bytes."""
+    position = size
+    while position > 0:
+        start = max(0, position - TAIL_READ_CHUNK_SIZE)
+        f.seek(start)
+        newline = f.read(position - start).rfind(b'\n')
+        if newline >= 0:
+            return start + newline + 1
+        position = start
+    return 0
+
+
+def get_delta_cursor() -> Optional[str]:
+    """
+    Delta-sync cursor pointing at the end of the live .msgs file.
+
+    Returns:
+        Cursor string, or None if the file does not exist
+    """
+    try:
+        with open(runtime_config.get_msgs_file_path(), 'rb') as f:
+            st = os.fstat(f.fileno())
+            return encode_delta_cursor(st.st_ino, _complete_lines_end(f, st.st_size))
     except FileNotFoundError:
-        logger.error(f"Messages file not found: {msgs_file}")
-        return []
-    except Exception as e:
-        logger.error(f"Error reading messages file: {e}")
-        return []
+        return None
 
-    # Sort by timestamp (oldest first)
-    messages.sort(key=lambda m: m['timestamp'])
 
-    # Filter by days if specified
-    if days is not None and days > 0:
-        messages = filter_messages_by_days(messages, days)
+def read_messages_delta(since: Optional[str] = None, limit: int = 500) -> Dict:
+    """
+    Read the channel messages appended to the live .msgs file after a cursor.
 
-    # Apply offset and limit
-    if offset > 0:
-        messages = messages[:-offset] if offset < len(messages) else []
+    The cursor is a byte offset in the file, so only the appended bytes are
+    read. It is tied to the file's inode: after compaction or a device name
+    change the old offset is meaningless and the caller is told to reload.
 
-    if limit is not None and limit > 0:
-        messages = messages[-limit:]
+    Args:
+        since: Cursor from a previous call or from get_delta_cursor()
+               (None = no messages, just the cursor for the current end)
+        limit: Maximum number of messages to return
 
-    logger.info(f"Loaded {len(messages)} messages from {msgs_file}")
-    return messages
+    Returns:
+        {'messages': [...in file order], 'cursor': next cursor,
+         'has_more': bool (more appended messages past `limit`),
+         'reset': bool (cursor no longer valid - reload the full view)}
+
+    Raises:
+        ValueError: if the cursor is malformed
+    """
+    from app.meshcore.tombstones import tombstone_log, is_deleted
+
+    since_key = decode_delta_cursor(since) if since else None
+    messages = []
+    has_more = False
+
+    try:
+        with open(runtime_config.get_msgs_file_path(), 'rb') as f:
+            st = os.fstat(f.fileno())
+            if since_key is None or since_key[0] != st.st_ino or since_key[1] > st.st_size:
+                return {
+                    'messages': [],
+                    'cursor': encode_delta_cursor(st.st_ino, _complete_lines_end(f, st.st_size)),
+                    'has_more': False,
+                    'reset': since_key is not None
+                }
+
+            tombstones = tombstone_log.get()
+            offset = since_key[1]
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b'\n'):
+                    break  # Line still being written
+                offset += len(raw)
+                if not decoder.has_type(raw, decoder.CHANNEL_TOKENS):
+                    continue
+                try:
+                    data = decoder.loads(raw)
+                except json.JSONDecodeError:
+                    continue
+                record = parse_channel_record(data)
+                if not record or is_deleted(tombstones, record.channel_idx, record.timestamp):
+                    continue
+                messages.append(record.to_dict())
+                if len(messages) >= limit:
+                    has_more = offset < os.fstat(f.fileno()).st_size
+                    break
+    except FileNotFoundError:
+        logger.warning(f"Messages file not found: {runtime_config.get_msgs_file_path()}")
+        return {'messages': [], 'cursor': None, 'has_more': False, 'reset': since_key is not None}
+
+    return {
+        'messages': messages,
+        'cursor': encode_delta_cursor(st.st_ino, offset),
+        'has_more': has_more,
+        'reset': False
+    }
 
 
 def get_latest_message() -> Optional[Dict]:
@@ -157,8 +345,8 @@ def get_latest_message() -> Optional[Dict]:
     Returns:
         Latest message dict or None if no messages
     """
-    messages = read_messages(limit=1)
-    return messages[0] if messages else None
+    backend, _ = _get_message_backend()
+    return backend.latest()
 
 
 def count_messages() -> int:
@@ -168,9 +356,40 @@ def count_messages() -> int:
     Returns:
         Message count
     """
-    return len(read_messages())
+    backend, _ = _get_message_backend()
+    return backend.count()
+
+
+def get_message_status() -> Dict:
+    """
+    Get the counters maintained by the storage engine, without parsing the file.
+
+    Returns:
+        Dict with message_count, latest_message_timestamp and file_offset
+    """
+    backend, _ = _get_message_backend()
+    return backend.status()
+
+
+def get_channel_update_stats(last_seen: Dict[int, float], days: Optional[int] = 7) -> Dict[int, Dict]:
+    """
+    Compute per-channel update statistics for the unread/refresh checks.
+
+    Args:
+        last_seen: {channel_idx: timestamp} of the last message seen per channel
+        days: Only consider messages from the last N days (None = all)
+
+    Returns:
+        {channel_idx: {'latest_timestamp': ts, 'unread_count': n}} for channels
+        with at least one message in the window
+    """
+    backend, exists = _get_message_backend()
+    if not exists:
+        return {}
+    return backend.channel_stats(last_seen, days=days)
 
 
+@result_cache.memoize(_archive_sources)
 def read_archive_messages(archive_date: str, limit: Optional[int] = None, offset: int = 0, channel_idx: Optional[int] = None) -> List[Dict]:
     """
     Read messages from an archive file.
@@ -192,29 +411,30 @@ def read_archive_messages(archive_date: str, limit: Optional[int] = None, offset
         logger.warning(f"Archive file not found: {archive_file}")
         return []
 
+    # Paged views only need the newest rows - read the file backwards
+    if limit is not None and limit > 0:
+        messages = read_tail_messages(archive_file, limit=limit, offset=offset, channel_idx=channel_idx)
+        logger.info(f"Loaded {len(messages)} messages from archive {archive_date} (tail read)")
+        return messages
+
     # Determine allowed channels
     allowed_channels = [channel_idx] if channel_idx is not None else None
 
-    messages = []
+    records = []
 
     try:
-        with open(archive_file, 'r', encoding='utf-8') as f:
-            for line_num, line in enumerate(f, 1):
-                line = line.strip()
-                if not line:
-                    continue
-
-                try:
-                    data = json.loads(line)
-                    parsed = parse_message(data, allowed_channels=allowed_channels)
-                    if parsed:
-                        messages.append(parsed)
-                except json.JSONDecodeError as e:
-                    logger.warning(f"Invalid JSON at line {line_num} in archive: {e}")
-                    continue
-                except Exception as e:
-                    logger.error(f"Error parsing line {line_num} in archive: {e}")
-                    continue
+        for line_offset, line in LineScanner(archive_file, tokens=decoder.CHANNEL_TOKENS):
+            try:
+                data = decoder.loads(line)
+                record = parse_channel_record(data, allowed_channels=allowed_channels)
+                if record:
+                    records.append(record)
+            except json.JSONDecodeError as e:
+                logger.warning(f"Invalid JSON at offset {line_offset} in archive: {e}")
+                continue
+            except Exception as e:
+                logger.error(f"Error parsing line at offset {line_offset} in archive: {e}")
+                continue
 
     except FileNotFoundError:
         logger.error(f"Archive file not found: {archive_file}")
@@ -224,17 +444,461 @@ def read_archive_messages(archive_date: str, limit: Optional[int] = None, offset
         return []
 
     # Sort by timestamp (oldest first)
-    messages.sort(key=lambda m: m['timestamp'])
+    records.sort(key=lambda r: r.timestamp)
+
+    # Apply offset
+    if offset > 0:
+        records = records[:-offset] if offset < len(records) else []
+
+    messages = [r.to_dict() for r in records]
+    logger.info(f"Loaded {len(messages)} messages from archive {archive_date}")
+    return messages
+
+
+# Lines in .msgs files are appended in arrival order, so timestamps are
+# "almost" sorted. Reverse readers keep scanning this many seconds past the
+# point where they could stop, to pick up slightly out-of-order lines.
+TAIL_READ_SLACK_SECONDS = 60
+
+# Block size for reading files backwards
+TAIL_READ_CHUNK_SIZE = 64 * 1024
+
+
+def iter_lines_reverse(file_path: Path, chunk_size: int = TAIL_READ_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Yield non-empty raw lines of a file from the last one to the first.
+
+    The file is read from EOF backwards in fixed-size blocks, so consumers
+    that stop early only pay for the bytes they actually looked at.
+
+    Args:
+        file_path: Path to a JSON Lines file
+        chunk_size: Number of bytes read per seek
+
+    Yields:
+        Raw line bytes (without the trailing newline), newest first
+    """
+    for _, line in iter_lines_reverse_with_offsets(file_path, chunk_size=chunk_size):
+        yield line
+
+
+def iter_lines_reverse_with_offsets(file_path: Path, end: Optional[int] = None,
+                                    chunk_size: int = TAIL_READ_CHUNK_SIZE) -> Iterator[Tuple[int, bytes]]:
+    """
+    Like iter_lines_reverse, but start at byte `end` and yield line offsets too.
+
+    Args:
+        file_path: Path to a JSON Lines file
+        end: Only lines starting before this offset (a line start; None = EOF)
+        chunk_size: Number of bytes read per seek
+
+    Yields:
+        (offset of the line start, raw line bytes), newest first
+    """
+    with open(file_path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell() if end is None else min(end, f.tell())
+        remainder = b''
+
+        while position > 0:
+            read_size = min(chunk_size, position)
+            position -= read_size
+            f.seek(position)
+            block = f.read(read_size) + remainder
+
+            lines = block.split(b'\n')
+            # First piece may be the tail of a line that starts in an earlier block
+            remainder = lines[0]
+            line_end = position + len(block)
+            for line in reversed(lines[1:]):
+                line_start = line_end - len(line)
+                if line.strip():
+                    yield line_start, line
+                line_end = line_start - 1
+
+        if remainder.strip():
+            yield 0, remainder
+
+
+def _iter_lines_forward(file_path: Path, start: int) -> Iterator[Tuple[int, bytes]]:
+    """Yield (offset, raw line) of complete, non-empty lines from byte `start` on."""
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        offset = start
+        for raw in f:
+            if not raw.endswith(b'\n'):
+                break
+            line_start = offset
+            offset += len(raw)
+            if raw.strip():
+                yield line_start, raw.strip()
+
+
+def encode_cursor(key: Tuple) -> str:
+    """Opaque pagination cursor for a (timestamp, file_offset) message key."""
+    timestamp, file_offset = key
+    return base64.urlsafe_b64encode(f"{timestamp!r}:{file_offset}".encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Raises:
+        ValueError: if the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('ascii')
+        timestamp, file_offset = raw.split(':')
+        return float(timestamp), int(file_offset)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def read_file_page(file_path: Path, limit: int, channel_idx: Optional[int] = None,
+                   before: Optional[Tuple] = None, after: Optional[Tuple] = None) -> Dict:
+    """
+    Read one page of channel messages from a .msgs/archive file next to a cursor key.
+
+    The cursor's file offset is a line start, so the file is read from there:
+    backwards for older pages, forwards for newer ones. Lines are only roughly
+    in timestamp order, so a look-around of TAIL_READ_SLACK_SECONDS is read in
+    the other direction as well. The cost is proportional to the page size,
+    not to the cursor's distance from either end of the file.
+
+    Args:
+        file_path: Path to the file to read
+        limit: Page size
+        channel_idx: Filter messages by channel (None = all channels)
+        before: (timestamp, file_offset) - newest messages older than this
+        after: (timestamp, file_offset) - oldest messages newer than this
+               (without either, the newest page)
+
+    Returns:
+        Same shape as MessageStore.get_page
+    """
+    allowed_channels = [channel_idx] if channel_idx is not None else None
+
+    # Work in "distance from the page" space: keys are negated for newer
+    # pages, so both directions keep the `needed` largest keys below the cursor
+    if after is not None:
+        sign, cursor = -1, after
+        primary = _iter_lines_forward(file_path, int(after[1]))
+        secondary = iter_lines_reverse_with_offsets(file_path, end=int(after[1]))
+    else:
+        sign, cursor = 1, before
+        primary = iter_lines_reverse_with_offsets(file_path, end=int(before[1]) if before else None)
+        secondary = _iter_lines_forward(file_path, int(before[1])) if before else iter(())
+
+    cursor_key = (sign * cursor[0], sign * cursor[1]) if cursor else None
+    needed = limit + 1  # one extra tells whether there is another page
+    page: List[Tuple] = []  # min-heap of (signed key, record)
+
+    def consider(offset: int, raw: bytes) -> Optional[float]:
+        """Parse a line, keep it if it belongs on the page; return its signed timestamp."""
+        if not decoder.has_type(raw, decoder.CHANNEL_TOKENS):
+            return None
+        try:
+            data = decoder.loads(raw)
+        except json.JSONDecodeError:
+            return None
+        timestamp = sign * data.get('timestamp', 0)
+        record = parse_channel_record(data, allowed_channels=allowed_channels)
+        if record:
+            record.file_offset = offset
+            key = (sign * record.timestamp, sign * offset)
+            if cursor_key is None or key < cursor_key:
+                if len(page) < needed:
+                    heapq.heappush(page, (key, record))
+                elif key > page[0][0]:
+                    heapq.heapreplace(page, (key, record))
+        return timestamp
+
+    try:
+        # Look-around: lines on the far side of the cursor that still sort before it
+        for offset, raw in secondary:
+            timestamp = consider(offset, raw)
+            if timestamp is not None and timestamp > cursor_key[0] + TAIL_READ_SLACK_SECONDS:
+                break
+
+        for offset, raw in primary:
+            timestamp = consider(offset, raw)
+            if timestamp is not None and len(page) >= needed and \
+                    timestamp < page[0][0][0] - TAIL_READ_SLACK_SECONDS:
+                break
+    except FileNotFoundError:
+        logger.error(f"File not found: {file_path}")
+    except Exception as e:
+        logger.error(f"Error reading page from {file_path}: {e}")
+
+    entries = sorted(page, key=lambda e: e[0])
+    has_more = len(entries) > limit
+    if sign < 0:
+        entries = entries[::-1][:limit]
+    else:
+        entries = entries[-limit:]
+    records = [record for _, record in entries]
+
+    return {
+        'messages': [r.to_dict() for r in records],
+        'first': records[0].key if records else None,
+        'last': records[-1].key if records else None,
+        'has_more': has_more
+    }
+
+
+def _day_bounds(day: datetime) -> Tuple[float, float]:
+    """Start and end timestamps (local time) of a calendar day."""
+    start = datetime(day.year, day.month, day.day)
+    return start.timestamp(), (start + timedelta(days=1)).timestamp()
+
+
+def _iter_archive_day(file_path: Path, day_start: float, day_end: float,
+                      channel_idx: Optional[int] = None,
+                      before: Optional[Tuple] = None) -> Iterator[ChannelMessage]:
+    """
+    Yield the channel messages of one day from an archive file, newest first.
+
+    The file is read backwards from the end and reading stops once lines are
+    older than the day (plus TAIL_READ_SLACK_SECONDS). Slightly out-of-order
+    lines are put back in order with a small heap, which only holds messages
+    that a line still to be read could outrank.
+
+    Args:
+        file_path: Archive file
+        day_start, day_end: Timestamp window of the day [start, end)
+        channel_idx: Filter messages by channel (None = all channels)
+        before: (timestamp, file_offset) - only messages older than this key
+    """
+    allowed_channels = [channel_idx] if channel_idx is not None else None
+    pending: List[Tuple] = []  # min-heap of ((-timestamp, -offset), record)
+
+    for offset, raw in iter_lines_reverse_with_offsets(file_path):
+        if not decoder.has_type(raw, decoder.CHANNEL_TOKENS):
+            continue
+        try:
+            data = decoder.loads(raw)
+        except json.JSONDecodeError:
+            continue
+
+        timestamp = data.get('timestamp', 0)
+        if timestamp < day_start - TAIL_READ_SLACK_SECONDS:
+            break
+
+        record = parse_channel_record(data, allowed_channels=allowed_channels)
+        if record and day_start <= record.timestamp < day_end:
+            record.file_offset = offset
+            if before is None or record.key < before:
+                heapq.heappush(pending, ((-record.timestamp, -offset), record))
+
+        # Lines further back are at most TAIL_READ_SLACK_SECONDS newer than this one
+        while pending and -pending[0][0][0] > timestamp + TAIL_READ_SLACK_SECONDS:
+            yield heapq.heappop(pending)[1]
+
+    while pending:
+        yield heapq.heappop(pending)[1]
+
+
+def iter_archive_range(from_date: str, to_date: str, channel_idx: Optional[int] = None,
+                       before: Optional[Tuple] = None) -> Iterator[ChannelMessage]:
+    """
+    Yield channel messages of a range of archive days, newest first.
+
+    Archives are cumulative copies of the .msgs file, so each one contributes
+    only the messages of its own day. The per-day streams are k-way merged
+    with a heap; a day's file is opened only once the merge gets down to that
+    day, so a consumer that stops early never touches older archives.
+
+    Args:
+        from_date: First day (YYYY-MM-DD)
+        to_date: Last day (YYYY-MM-DD), inclusive
+        channel_idx: Filter messages by channel (None = all channels)
+        before: (timestamp, file_offset) - only messages older than this key
+
+    Raises:
+        ValueError: if a date is malformed or from_date is after to_date
+    """
+    from app.archiver.manager import get_archive_path
+
+    first_day = datetime.strptime(from_date, '%Y-%m-%d')
+    last_day = datetime.strptime(to_date, '%Y-%m-%d')
+    if first_day > last_day:
+        raise ValueError(f"from_date {from_date} is after to_date {to_date}")
+
+    # Sources newest day first: (upper timestamp bound, archive path, day window)
+    sources = []
+    day = last_day
+    while day >= first_day:
+        day_start, day_end = _day_bounds(day)
+        if before is None or before[0] >= day_start:
+            archive_file = get_archive_path(day.strftime('%Y-%m-%d'))
+            if archive_file.exists():
+                upper = day_end if before is None else min(day_end, before[0] + 1)
+                sources.append((upper, archive_file, day_start, day_end))
+        day -= timedelta(days=1)
+
+    heap: List[Tuple] = []  # ((-timestamp, -offset, source), record, iterator)
+    next_source = 0
+
+    while True:
+        # Open the next day only when it may hold something newer than the heap top
+        while next_source < len(sources) and (not heap or -heap[0][0][0] < sources[next_source][0]):
+            _, archive_file, day_start, day_end = sources[next_source]
+            iterator = _iter_archive_day(archive_file, day_start, day_end,
+                                         channel_idx=channel_idx, before=before)
+            record = next(iterator, None)
+            if record is not None:
+                heapq.heappush(heap, ((-record.timestamp, -record.file_offset, next_source),
+                                      record, iterator))
+            next_source += 1
+
+        if not heap:
+            return
+
+        (_, _, source), record, iterator = heapq.heappop(heap)
+        yield record
+
+        following = next(iterator, None)
+        if following is not None:
+            heapq.heappush(heap, ((-following.timestamp, -following.file_offset, source),
+                                  following, iterator))
+
+
+def read_archive_range(from_date: str, to_date: str, channel_idx: Optional[int] = None,
+                       limit: int = 100, before: Optional[str] = None) -> Dict:
+    """
+    Read the newest page of channel messages across a range of archive days.
+
+    Args:
+        from_date: First day (YYYY-MM-DD)
+        to_date: Last day (YYYY-MM-DD), inclusive
+        channel_idx: Filter messages by channel (None = all channels)
+        limit: Page size
+        before: Cursor from a previous page - continue with older messages
+
+    Returns:
+        {'messages': [...oldest first], 'has_more': bool,
+         'cursors': {'before': cursor for the next (older) page}}
+
+    Raises:
+        ValueError: if a date or the cursor is malformed
+    """
+    before_key = decode_cursor(before) if before else None
+
+    records = []
+    has_more = False
+    for record in iter_archive_range(from_date, to_date, channel_idx=channel_idx, before=before_key):
+        if len(records) == limit:
+            has_more = True
+            break
+        records.append(record)
+
+    records.reverse()
+    return {
+        'messages': [r.to_dict() for r in records],
+        'has_more': has_more,
+        'cursors': {
+            'before': encode_cursor(records[0].key) if records else None
+        }
+    }
+
+
+def read_tail_messages(file_path: Path, limit: Optional[int] = None, offset: int = 0,
+                       channel_idx: Optional[int] = None, days: Optional[int] = None) -> List[Dict]:
+    """
+    Read the newest channel messages of a .msgs/archive file by scanning it backwards.
+
+    Stops as soon as `offset + limit` matching messages have been collected
+    (plus TAIL_READ_SLACK_SECONDS of look-behind) or the `days` cutoff has
+    been crossed, so the cost is proportional to the page size rather than
+    to the age of the file.
+
+    Args:
+        file_path: Path to the file to read
+        limit: Maximum number of messages to return (None = no limit)
+        offset: Number of messages to skip from the end
+        channel_idx: Filter messages by channel (None = all channels)
+        days: Only include messages from the last N days (None = no filter)
+
+    Returns:
+        List of parsed message dictionaries, sorted by timestamp (oldest first)
+    """
+    allowed_channels = [channel_idx] if channel_idx is not None else None
+
+    cutoff_timestamp = None
+    if days is not None and days > 0:
+        cutoff_timestamp = (datetime.now() - timedelta(days=days)).timestamp()
+
+    needed = offset + limit if limit is not None and limit > 0 else None
+
+    # Min-heap of the `needed` newest messages seen so far: (timestamp, -line_no, record)
+    newest: List[Tuple] = []
+    collected: List[ChannelMessage] = []
+
+    try:
+        for line_no, raw in enumerate(iter_lines_reverse(file_path)):
+            if not decoder.has_type(raw, decoder.CHANNEL_TOKENS):
+                continue
+
+            try:
+                data = decoder.loads(raw)
+            except json.JSONDecodeError as e:
+                logger.warning(f"Invalid JSON in {file_path.name} (line {line_no} from end): {e}")
+                continue
+
+            timestamp = data.get('timestamp', 0)
+
+            if cutoff_timestamp is not None and timestamp < cutoff_timestamp - TAIL_READ_SLACK_SECONDS:
+                break
+
+            if needed is not None and len(newest) >= needed and \
+                    timestamp < newest[0][0] - TAIL_READ_SLACK_SECONDS:
+                break
+
+            try:
+                record = parse_channel_record(data, allowed_channels=allowed_channels)
+            except Exception as e:
+                logger.error(f"Error parsing line in {file_path.name}: {e}")
+                continue
+
+            if not record:
+                continue
+            if cutoff_timestamp is not None and record.timestamp < cutoff_timestamp:
+                continue
+
+            if needed is None:
+                collected.append(record)
+                continue
+
+            # Ties keep file order: later lines (smaller line_no) sort as newer
+            entry = (record.timestamp, -line_no, record)
+            if len(newest) < needed:
+                heapq.heappush(newest, entry)
+            elif entry[:2] > newest[0][:2]:
+                heapq.heapreplace(newest, entry)
+
+    except FileNotFoundError:
+        logger.error(f"File not found: {file_path}")
+        return []
+    except Exception as e:
+        logger.error(f"Error reading {file_path} backwards: {e}")
+        return []
+
+    if needed is None:
+        collected.reverse()
+        records = collected
+        records.sort(key=lambda r: r.timestamp)
+    else:
+        records = [entry[2] for entry in sorted(newest, key=lambda e: e[:2])]
 
     # Apply offset and limit
     if offset > 0:
-        messages = messages[:-offset] if offset < len(messages) else []
+        records = records[:-offset] if offset < len(records) else []
 
     if limit is not None and limit > 0:
-        messages = messages[-limit:]
+        records = records[-limit:]
 
-    logger.info(f"Loaded {len(messages)} messages from archive {archive_date}")
-    return messages
+    return [r.to_dict() for r in records]
 
 
 def filter_messages_by_days(messages: List[Dict], days: int) -> List[Dict]:
@@ -264,7 +928,11 @@ def filter_messages_by_days(messages: List[Dict], days: int) -> List[Dict]:
 
 def delete_channel_messages(channel_idx: int) -> bool:
     """
-    Delete all messages for a specific channel from the .msgs file.
+    Delete all messages for a specific channel.
+
+    Records a tombstone (channel index + current time) that readers apply
+    immediately; the .msgs file itself is compacted later by the background
+    worker, so meshcli can keep appending meanwhile.
 
     Args:
         channel_idx: Channel index to delete messages from
@@ -272,41 +940,11 @@ def delete_channel_messages(channel_idx: int) -> bool:
     Returns:
         True if successful, False otherwise
     """
-    msgs_file = runtime_config.get_msgs_file_path()
-
-    if not msgs_file.exists():
-        logger.warning(f"Messages file not found: {msgs_file}")
-        return True  # No messages to delete
+    from app.meshcore.tombstones import tombstone_log
 
     try:
-        # Read all lines
-        lines_to_keep = []
-        deleted_count = 0
-
-        with open(msgs_file, 'r', encoding='utf-8') as f:
-            for line_num, line in enumerate(f, 1):
-                line = line.strip()
-                if not line:
-                    continue
-
-                try:
-                    data = json.loads(line)
-                    # Keep messages from other channels
-                    if data.get('channel_idx', 0) != channel_idx:
-                        lines_to_keep.append(line)
-                    else:
-                        deleted_count += 1
-                except json.JSONDecodeError as e:
-                    # Keep malformed lines (don't delete them)
-                    logger.warning(f"Invalid JSON at line {line_num}, keeping: {e}")
-                    lines_to_keep.append(line)
-
-        # Write back the filtered lines
-        with open(msgs_file, 'w', encoding='utf-8') as f:
-            for line in lines_to_keep:
-                f.write(line + '\n')
-
-        logger.info(f"Deleted {deleted_count} messages from channel {channel_idx}")
+        tombstone_log.add(channel_idx)
+        logger.info(f"Deleted messages from channel {channel_idx} (compaction pending)")
         return True
 
     except Exception as e:
@@ -352,7 +990,7 @@ def _cleanup_old_dm_sent_log() -> None:
         _dm_cleanup_done = True
 
 
-def _parse_priv_message(line: Dict) -> Optional[Dict]:
+def _parse_priv_record(line: Dict) -> Optional[DirectMessage]:
     """
     Parse incoming private message (PRIV type).
 
@@ -360,46 +998,26 @@ def _parse_priv_message(line: Dict) -> Optional[Dict]:
         line: Raw JSON object from .msgs file with type='PRIV'
 
     Returns:
-        Parsed DM dict or None if invalid
+        DirectMessage record or None if invalid
     """
     text = line.get('text', '').strip()
     if not text:
         return None
 
-    timestamp = line.get('timestamp', 0)
-    pubkey_prefix = line.get('pubkey_prefix', '')
-    sender = line.get('name', 'Unknown')
-    sender_timestamp = line.get('sender_timestamp', 0)
-
-    # Generate conversation ID - prefer pubkey_prefix if available
-    if pubkey_prefix:
-        conversation_id = f"pk_{pubkey_prefix}"
-    else:
-        conversation_id = f"name_{sender}"
-
-    # Generate deduplication key
-    text_hash = hash(text[:50]) & 0xFFFFFFFF  # 32-bit positive hash
-    dedup_key = f"priv_{pubkey_prefix}_{sender_timestamp}_{text_hash}"
-
-    return {
-        'type': 'dm',
-        'direction': 'incoming',
-        'sender': sender,
-        'content': text,
-        'timestamp': timestamp,
-        'sender_timestamp': sender_timestamp,
-        'datetime': datetime.fromtimestamp(timestamp).isoformat() if timestamp > 0 else None,
-        'is_own': False,
-        'snr': line.get('SNR'),
-        'path_len': line.get('path_len'),
-        'pubkey_prefix': pubkey_prefix,
-        'txt_type': line.get('txt_type', 0),
-        'conversation_id': conversation_id,
-        'dedup_key': dedup_key
-    }
+    return DirectMessage(
+        is_own=False,
+        sender=line.get('name', 'Unknown'),
+        content=text,
+        timestamp=line.get('timestamp', 0),
+        sender_timestamp=line.get('sender_timestamp', 0),
+        snr=line.get('SNR'),
+        path_len=line.get('path_len'),
+        pubkey_prefix=line.get('pubkey_prefix', ''),
+        txt_type=line.get('txt_type', 0)
+    )
 
 
-def _parse_sent_msg(line: Dict) -> Optional[Dict]:
+def _parse_sent_record(line: Dict) -> Optional[DirectMessage]:
     """
     Parse outgoing private message (SENT_MSG type) from meshcore-cli 1.3.12+.
 
@@ -410,7 +1028,7 @@ def _parse_sent_msg(line: Dict) -> Optional[Dict]:
         line: Raw JSON object from .msgs file with type='SENT_MSG'
 
     Returns:
-        Parsed DM dict or None if invalid or not a private message
+        DirectMessage record or None if invalid or not a private message
     """
     text = line.get('text', '').strip()
     if not text:
@@ -421,34 +1039,31 @@ def _parse_sent_msg(line: Dict) -> Optional[Dict]:
     if txt_type != 0:
         return None
 
-    timestamp = line.get('timestamp', 0)
-    # Use 'recipient' field (added in meshcore-cli 1.3.12), fallback to 'name'
-    recipient = line.get('recipient', line.get('name', 'Unknown'))
-    sender = line.get('sender', runtime_config.get_device_name())
+    return DirectMessage(
+        is_own=True,
+        # Use 'recipient' field (added in meshcore-cli 1.3.12), fallback to 'name'
+        recipient=line.get('recipient', line.get('name', 'Unknown')),
+        sender=line.get('sender', runtime_config.get_device_name()),
+        content=text,
+        timestamp=line.get('timestamp', 0),
+        txt_type=txt_type,
+        expected_ack=line.get('expected_ack')
+    )
 
-    # Generate conversation ID from recipient name
-    conversation_id = f"name_{recipient}"
 
-    # Deduplication key
-    text_hash = hash(text[:50]) & 0xFFFFFFFF
-    dedup_key = f"sent_{timestamp}_{text_hash}"
+def _parse_priv_message(line: Dict) -> Optional[Dict]:
+    """Parse incoming private message (PRIV type) into a DM dict (None if invalid)."""
+    record = _parse_priv_record(line)
+    return record.to_dict() if record else None
 
-    return {
-        'type': 'dm',
-        'direction': 'outgoing',
-        'recipient': recipient,
-        'sender': sender,
-        'content': text,
-        'timestamp': timestamp,
-        'datetime': datetime.fromtimestamp(timestamp).isoformat() if timestamp > 0 else None,
-        'is_own': True,
-        'txt_type': txt_type,
-        'conversation_id': conversation_id,
-        'dedup_key': dedup_key,
-        'expected_ack': line.get('expected_ack'),
-    }
+
+def _parse_sent_msg(line: Dict) -> Optional[Dict]:
+    """Parse outgoing private message (SENT_MSG type) into a DM dict (None if invalid)."""
+    record = _parse_sent_record(line)
+    return record.to_dict() if record else None
 
 
+@result_cache.memoize(_live_sources)
 def read_dm_messages(
     limit: Optional[int] = None,
     conversation_id: Optional[str] = None,
@@ -469,54 +1084,76 @@ def read_dm_messages(
         The mapping helps correlate outgoing messages (name only) with incoming (pubkey)
     """
     messages = []
-    seen_dedup_keys = set()
     pubkey_to_name = {}  # Map pubkey_prefix -> most recent name
 
     # Clean up old DM sent log file (once per session)
     _cleanup_old_dm_sent_log()
 
+    if config.MC_STORAGE_ENGINE == 'sqlite':
+        from app.meshcore.sqlite_index import sqlite_index
+        backend, exists = _get_message_backend()
+        if backend is sqlite_index:
+            if not exists:
+                return [], {}
+            messages, pubkey_to_name = backend.get_dm_messages(
+                limit=limit, conversation_id=conversation_id, days=days)
+            logger.info(f"Loaded {len(messages)} DM messages")
+            return messages, pubkey_to_name
+
     # --- Read DM messages from .msgs file ---
     msgs_file = runtime_config.get_msgs_file_path()
-    if msgs_file.exists():
-        try:
-            with open(msgs_file, 'r', encoding='utf-8') as f:
-                for line_num, line in enumerate(f, 1):
-                    line = line.strip()
-                    if not line:
-                        continue
-
-                    try:
-                        data = json.loads(line)
-                        msg_type = data.get('type')
+    from app.meshcore.dm_dedup import dm_dedup_index
+    if dm_dedup_index.update():
+        # Duplicate lines are known by offset; lines appended after the
+        # dedup index was updated are left for the next read
+        end_offset, duplicates = dm_dedup_index.snapshot()
+
+        # With a days window, bisect the sidecar offset index to skip old lines;
+        # the index also provides the pubkey->name mapping of the skipped part
+        # so conversations resolve exactly as with a full scan.
+        start_offset = 0
+        if days is not None and days > 0:
+            from app.meshcore.msgs_index import msgs_offset_index
+            if msgs_offset_index.update():
+                cutoff_timestamp = (datetime.now() - timedelta(days=days)).timestamp()
+                start_offset = msgs_offset_index.offset_for_timestamp(cutoff_timestamp)
+                if start_offset > 0:
+                    pubkey_to_name.update(msgs_offset_index.get_pubkey_to_name())
 
-                        # Process PRIV (incoming) and SENT_MSG (outgoing) messages
-                        if msg_type == 'PRIV':
-                            parsed = _parse_priv_message(data)
-                        elif msg_type == 'SENT_MSG':
-                            parsed = _parse_sent_msg(data)
-                        else:
-                            continue  # Ignore other message types
+        try:
+            for line_offset, line in LineScanner(msgs_file, start=start_offset, end=end_offset,
+                                                 tokens=decoder.DM_TOKENS):
+                try:
+                    data = decoder.loads(line)
+                    msg_type = data.get('type')
+
+                    # Process PRIV (incoming) and SENT_MSG (outgoing) messages
+                    if msg_type == 'PRIV':
+                        record = _parse_priv_record(data)
+                    elif msg_type == 'SENT_MSG':
+                        record = _parse_sent_record(data)
+                    else:
+                        continue  # Ignore other message types
 
-                        if not parsed:
-                            continue
+                    if not record:
+                        continue
 
-                        # Update pubkey->name mapping (only for PRIV messages)
-                        if msg_type == 'PRIV' and parsed.get('pubkey_prefix'):
-                            pubkey_to_name[parsed['pubkey_prefix']] = parsed['sender']
+                    # Update pubkey->name mapping (only for PRIV messages)
+                    if msg_type == 'PRIV' and record.pubkey_prefix:
+                        pubkey_to_name[record.pubkey_prefix] = record.sender
 
-                        # Deduplicate
-                        if parsed['dedup_key'] in seen_dedup_keys:
-                            continue
-                        seen_dedup_keys.add(parsed['dedup_key'])
+                    # Deduplicate
+                    if line_offset in duplicates:
+                        continue
 
-                        messages.append(parsed)
+                    messages.append(record)
 
-                    except json.JSONDecodeError as e:
-                        logger.warning(f"Invalid JSON at line {line_num}: {e}")
-                        continue
-                    except Exception as e:
-                        logger.error(f"Error parsing message at line {line_num}: {e}")
-                        continue
+                except json.JSONDecodeError as e:
+                    logger.warning(f"Invalid JSON at offset {line_offset}: {e}")
+                    continue
+                except Exception as e:
+                    logger.error(f"Error parsing message at offset {line_offset}: {e}")
+                    continue
 
         except Exception as e:
             logger.error(f"Error reading messages file: {e}")
@@ -525,40 +1162,43 @@ def read_dm_messages(
     if conversation_id:
         filtered_messages = []
         for msg in messages:
-            if msg['conversation_id'] == conversation_id:
+            msg_conversation_id = msg.conversation_id
+            if msg_conversation_id == conversation_id:
                 filtered_messages.append(msg)
             else:
                 # Check if it matches via pubkey->name mapping
                 if conversation_id.startswith('pk_'):
                     pk = conversation_id[3:]
                     name = pubkey_to_name.get(pk)
-                    if name and msg['conversation_id'] == f"name_{name}":
+                    if name and msg_conversation_id == f"name_{name}":
                         filtered_messages.append(msg)
                 elif conversation_id.startswith('name_'):
                     name = conversation_id[5:]
                     # Check if any pubkey maps to this name
                     for pk, n in pubkey_to_name.items():
-                        if n == name and msg['conversation_id'] == f"pk_{pk}":
+                        if n == name and msg_conversation_id == f"pk_{pk}":
                             filtered_messages.append(msg)
                             break
         messages = filtered_messages
 
     # Sort by timestamp (oldest first)
-    messages.sort(key=lambda m: m['timestamp'])
+    messages.sort(key=lambda m: m.timestamp)
 
     # Filter by days if specified
     if days is not None and days > 0:
         cutoff_timestamp = (datetime.now() - timedelta(days=days)).timestamp()
-        messages = [m for m in messages if m['timestamp'] >= cutoff_timestamp]
+        messages = [m for m in messages if m.timestamp >= cutoff_timestamp]
 
     # Apply limit (return most recent)
     if limit is not None and limit > 0:
         messages = messages[-limit:]
 
+    messages = [m.to_dict() for m in messages]
     logger.info(f"Loaded {len(messages)} DM messages")
     return messages, pubkey_to_name
 
 
+@result_cache.memoize(_live_sources)
 def get_dm_conversations(days: Optional[int] = 7) -> List[Dict]:
     """
     Get list of DM conversations with metadata.
@@ -580,6 +1220,16 @@ def get_dm_conversations(days: Optional[int] = 7) -> List[Dict]:
             }
         ]
     """
+    _cleanup_old_dm_sent_log()
+
+    # The in-memory store keeps per-conversation aggregates up to date
+    from app.meshcore.store import message_store
+    backend, exists = _get_message_backend()
+    if backend is message_store:
+        result = backend.dm_conversations(days=days) if exists else []
+        logger.info(f"Found {len(result)} DM conversations")
+        return result
+
     messages, pubkey_to_name = read_dm_messages(days=days)
 
     # Build reverse mapping: name -> pubkey_prefix
@@ -646,3 +1296,57 @@ def get_dm_conversations(days: Optional[int] = 7) -> List[Dict]:
 
     logger.info(f"Found {len(result)} DM conversations")
     return result
+
+
+def get_dm_unread_counts(last_seen: Dict[str, float], days: Optional[int] = 7) -> List[Dict]:
+    """
+    Count unread DMs per conversation in a single pass.
+
+    Args:
+        last_seen: {conversation_id: timestamp} of the last message seen per conversation
+        days: Only consider messages from the last N days (None = all)
+
+    Returns:
+        List of {'conversation_id', 'display_name', 'unread_count',
+        'latest_timestamp'} for conversations with unread messages,
+        most recent first
+    """
+    from app.meshcore.store import message_store
+    backend, exists = _get_message_backend()
+    if not exists:
+        return []
+    if backend is message_store:
+        return backend.dm_unread_counts(last_seen, days=days)
+
+    # SQLite engine: one read of the window, then count per conversation
+    # with the same matching rules as read_dm_messages(conversation_id=...)
+    conversations = get_dm_conversations(days=days)
+    messages, pubkey_to_name = read_dm_messages(days=days)
+
+    # Raw conversation_id -> conversations whose unread count it feeds
+    feeds: Dict[str, List[str]] = {}
+    for conv in conversations:
+        conversation_id = conv['conversation_id']
+        if conv['last_message_timestamp'] <= last_seen.get(conversation_id, 0):
+            continue
+        feeds.setdefault(conversation_id, []).append(conversation_id)
+        if conversation_id.startswith('pk_'):
+            name = pubkey_to_name.get(conversation_id[3:])
+            if name:
+                feeds.setdefault(f"name_{name}", []).append(conversation_id)
+
+    unread: Dict[str, int] = {}
+    for msg in messages:
+        for conversation_id in feeds.get(msg['conversation_id'], ()):
+            if msg['timestamp'] > last_seen.get(conversation_id, 0):
+                unread[conversation_id] = unread.get(conversation_id, 0) + 1
+
+    return [
+        {
+            'conversation_id': conv['conversation_id'],
+            'display_name': conv['display_name'],
+            'unread_count': unread[conv['conversation_id']],
+            'latest_timestamp': conv['last_message_timestamp']
+        }
+        for conv in conversations if unread.get(conv['conversation_id'])
+    ]
@@ -0,0 +1,158 @@
+"""
+Compact message records kept by the in-memory readers
+
+Parsed messages used to be 11-14 key dicts, each carrying a pre-formatted
+ISO datetime string and two copies of the message text. Records store only
+the fields read from the .msgs line, in __slots__, with sender/recipient
+names and pubkey prefixes interned (a busy channel repeats the same few
+names thousands of times). Derived fields - content, datetime,
+conversation_id, dedup_key - are computed when needed, and `to_dict()`
+produces exactly the dict the API has always returned.
+"""
+
+import hashlib
+import sys
+from datetime import datetime
+from typing import Dict, Optional
+
+
+def intern_name(value):
+    """Intern a sender/recipient name or pubkey prefix so repeats share one string."""
+    return sys.intern(value) if type(value) is str else value
+
+
+def format_datetime(timestamp) -> Optional[str]:
+    """ISO datetime of a message timestamp, as returned by the API (None if unset)."""
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp > 0 else None
+
+
+class ChannelMessage:
+    """
+    A CHAN / SENT_CHAN message.
+
+    `file_offset` is the byte offset of the line in the file it was read
+    from, set by readers that page through a file; (timestamp, file_offset)
+    orders messages the way the API returns them.
+    """
+
+    __slots__ = ('sender', 'raw_text', 'timestamp', 'is_own', 'snr', 'path_len',
+                 'channel_idx', 'sender_timestamp', 'txt_type', 'file_offset')
+
+    def __init__(self, sender: str, raw_text: str, timestamp, is_own: bool, snr, path_len,
+                 channel_idx: int, sender_timestamp, txt_type):
+        self.sender = intern_name(sender)
+        self.raw_text = raw_text
+        self.timestamp = timestamp
+        self.is_own = is_own
+        self.snr = snr
+        self.path_len = path_len
+        # Small ints are shared by the interpreter, so channel indices cost nothing extra
+        self.channel_idx = channel_idx
+        self.sender_timestamp = sender_timestamp
+        self.txt_type = txt_type
+        self.file_offset = None
+
+    @property
+    def key(self):
+        """Position in timestamp order, used for pagination cursors."""
+        return self.timestamp, self.file_offset
+
+    @property
+    def content(self) -> str:
+        """Message text without the "SenderName: " prefix of received messages."""
+        text = self.raw_text.strip()
+        if not self.is_own and ':' in text:
+            return text.split(':', 1)[1].strip()
+        return text
+
+    def to_dict(self) -> Dict:
+        return {
+            'sender': self.sender,
+            'content': self.content,
+            'timestamp': self.timestamp,
+            'datetime': format_datetime(self.timestamp),
+            'is_own': self.is_own,
+            'snr': self.snr,
+            'path_len': self.path_len,
+            'channel_idx': self.channel_idx,
+            'sender_timestamp': self.sender_timestamp,
+            'txt_type': self.txt_type,
+            'raw_text': self.raw_text
+        }
+
+
+class DirectMessage:
+    """A PRIV (incoming) or SENT_MSG (outgoing) direct message."""
+
+    __slots__ = ('is_own', 'sender', 'recipient', 'content', 'timestamp', 'sender_timestamp',
+                 'snr', 'path_len', 'pubkey_prefix', 'txt_type', 'expected_ack')
+
+    def __init__(self, is_own: bool, sender: str, content: str, timestamp, txt_type,
+                 recipient: Optional[str] = None, sender_timestamp=0, snr=None, path_len=None,
+                 pubkey_prefix: str = '', expected_ack=None):
+        self.is_own = is_own
+        self.sender = intern_name(sender)
+        self.recipient = intern_name(recipient)
+        self.content = content
+        self.timestamp = timestamp
+        self.sender_timestamp = sender_timestamp
+        self.snr = snr
+        self.path_len = path_len
+        self.pubkey_prefix = intern_name(pubkey_prefix)
+        self.txt_type = txt_type
+        self.expected_ack = expected_ack
+
+    @property
+    def direction(self) -> str:
+        return 'outgoing' if self.is_own else 'incoming'
+
+    @property
+    def conversation_id(self) -> str:
+        """pk_<pubkey_prefix> when known, otherwise name_<contact name>."""
+        if self.is_own:
+            return f"name_{self.recipient}"
+        if self.pubkey_prefix:
+            return f"pk_{self.pubkey_prefix}"
+        return f"name_{self.sender}"
+
+    @property
+    def dedup_key(self) -> str:
+        # Stable digest (not hash(), which is randomized per process), so keys
+        # can be persisted and compared between processes
+        text_hash = hashlib.blake2b(self.content[:50].encode('utf-8'), digest_size=8).hexdigest()
+        if self.is_own:
+            return f"sent_{self.timestamp}_{text_hash}"
+        return f"priv_{self.pubkey_prefix}_{self.sender_timestamp}_{text_hash}"
+
+    def to_dict(self) -> Dict:
+        if self.is_own:
+            return {
+                'type': 'dm',
+                'direction': 'outgoing',
+                'recipient': self.recipient,
+                'sender': self.sender,
+                'content': self.content,
+                'timestamp': self.timestamp,
+                'datetime': format_datetime(self.timestamp),
+                'is_own': True,
+                'txt_type': self.txt_type,
+                'conversation_id': self.conversation_id,
+                'dedup_key': self.dedup_key,
+                'expected_ack': self.expected_ack,
+            }
+        return {
+            'type': 'dm',
+            'direction': 'incoming',
+            'sender': self.sender,
+            'content': self.content,
+            'timestamp': self.timestamp,
+            'sender_timestamp': self.sender_timestamp,
+            'datetime': format_datetime(self.timestamp),
+            'is_own': False,
+            'snr': self.snr,
+            'path_len': self.path_len,
+            'pubkey_prefix': self.pubkey_prefix,
+            'txt_type': self.txt_type,
+            'conversation_id': self.conversation_id,
+            'dedup_key': self.dedup_key
+        }
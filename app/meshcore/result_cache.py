@@ -0,0 +1,182 @@
+"""
+Memoization of parser results, keyed on the version of the files they were read from
+
+Several tabs polling status, updates, messages and DM updates issue the same
+queries against a .msgs file that has not changed since the previous request.
+Results are cached under the function name, its arguments and the identity of
+each source file - (path, inode, size, mtime_ns) - so any append, compaction
+or archive rewrite produces a new key and stale entries simply age out of the
+LRU. The channel tombstone version is part of every key, as deleting a channel
+changes results without touching the file.
+
+Results that depend on the current time through a `days` window are also
+keyed on a CACHE_TIME_BUCKET_SECONDS bucket.
+"""
+
+import functools
+import inspect
+import logging
+import os
+import sys
+import time
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from app.config import config
+
+logger = logging.getLogger(__name__)
+
+# Results of `days` queries are reused for at most this long
+CACHE_TIME_BUCKET_SECONDS = 60
+
+# Upper bound on the number of cached results, whatever their size
+CACHE_MAX_ENTRIES = 256
+
+
+def _file_version(path: Path) -> Optional[Tuple]:
+    """(path, inode, size, mtime_ns) of a file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return str(path), st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def _estimate_size(value, limit: float = float('inf')) -> int:
+    """
+    Approximate memory footprint of a parser result (lists/tuples of dicts of
+    scalars). Stops counting once `limit` is exceeded.
+    """
+    if isinstance(value, (list, tuple)):
+        size = sys.getsizeof(value)
+        for item in value:
+            size += _estimate_size(item, limit - size)
+            if size > limit:
+                break
+        return size
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sys.getsizeof(v) for v in value.values())
+    return sys.getsizeof(value)
+
+
+def _copy_result(value):
+    """
+    Copy a result so callers can annotate it (e.g. echo data merged into
+    message dicts) without altering the cached entry.
+    """
+    if isinstance(value, list):
+        return [_copy_result(item) for item in value]
+    if isinstance(value, tuple):
+        return tuple(_copy_result(item) for item in value)
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+
+class ResultCache:
+    """Thread-safe LRU of parser results with an entry count and memory cap."""
+
+    def __init__(self, max_bytes: int, max_entries: int = CACHE_MAX_ENTRIES):
+        self._lock = Lock()
+        self._entries: OrderedDict = OrderedDict()  # key -> (value, size)
+        self._max_bytes = max_bytes
+        self._max_entries = max_entries
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key) -> Tuple[bool, object]:
+        """Return (found, copy of the cached value)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._hits += 1
+        return True, _copy_result(entry[0])
+
+    def put(self, key, value):
+        """Cache a copy of value, evicting least recently used entries beyond the caps."""
+        if self._max_bytes <= 0:
+            return
+        size = _estimate_size(value, self._max_bytes)
+        if size > self._max_bytes:
+            return
+        value = _copy_result(value)
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+
+            while self._bytes > self._max_bytes or len(self._entries) > self._max_entries:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current usage."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 3) if lookups else 0.0,
+                'evictions': self._evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self._max_bytes
+            }
+
+    def memoize(self, sources: Callable[..., Iterable[Path]]):
+        """
+        Decorator caching a parser function's results.
+
+        Args:
+            sources: Called with the function's arguments (by name, defaults
+                     applied); returns the files the result is read from
+        """
+        def decorator(func):
+            signature = inspect.signature(func)
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                arguments = bound.arguments
+
+                from app.meshcore.tombstones import tombstone_log
+
+                key = (
+                    func.__name__,
+                    tuple(arguments.items()),
+                    tuple(_file_version(path) for path in sources(**arguments)),
+                    tombstone_log.version,
+                    int(time.time() // CACHE_TIME_BUCKET_SECONDS) if arguments.get('days') else None
+                )
+
+                found, value = self.get(key)
+                if found:
+                    return value
+
+                value = func(*args, **kwargs)
+                self.put(key, value)
+                return value
+
+            return wrapper
+        return decorator
+
+
+# Global parser result cache instance
+result_cache = ResultCache(max_bytes=config.MC_PARSER_CACHE_MB * 1024 * 1024)
@@ -0,0 +1,560 @@
+"""
+Channel activity rollups ({device_name}.rollups.db in MC_CONFIG_DIR)
+
+Per-channel message counts, sender counts, SNR and path_len distributions,
+aggregated per hour, per local calendar day and per local calendar month as
+lines are appended to the .msgs file. Dashboards query these tables instead
+of re-reading the file: a range is answered from monthly rows for the whole
+months it spans, daily rows for the whole days around them and hourly rows
+for the partial days at either end, so a year of data is a few dozen rows
+per channel and key. Hourly, daily and monthly rows follow the server's
+timezone (hours start at whole local hours, so in zones with a half-hour
+offset they start at :30 UTC and every hour lies within one local day);
+they are rebuilt if it changes.
+
+Like the other indexes, the rollups catch up incrementally by inode and byte
+offset (the offset is committed together with the counts), are rebuilt when
+the file is replaced, and drop the rows of deleted channels. The hour, day
+and month containing a deletion cutoff are recounted from the file, as they
+may also hold messages sent after it.
+"""
+
+import json
+import logging
+import math
+import os
+import sqlite3
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from app.config import config, runtime_config
+from app.meshcore import decoder
+from app.meshcore.msgs_index import msgs_offset_index
+from app.meshcore.parser import parse_channel_record
+from app.meshcore.records import ChannelMessage
+from app.meshcore.scan import LineScanner
+from app.meshcore.tombstones import tombstone_log, is_deleted
+from app.meshcore.workers import scan_pool, split_file
+
+logger = logging.getLogger(__name__)
+
+# Bump when the table layout changes - the rollups are rebuilt from the .msgs file
+SCHEMA_VERSION = 2
+
+# Resolutions ("res" column): hourly rows start at whole local hours, daily
+# and monthly rows at local midnight
+HOUR = 3600
+DAY = 86400
+MONTH = 31 * 86400
+
+# Width of the SNR histogram buckets in dB
+SNR_BUCKET_DB = 2
+
+# Lines aggregated in memory before the counts are written
+ROLLUP_BATCH_SIZE = 5000
+
+# Catch-ups of more than this many bytes are split across the scan worker pool
+ROLLUP_PARALLEL_MIN_BYTES = 32 * 1024 * 1024
+
+DEFAULT_TOP_SENDERS = 10
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS counts (
+    res INTEGER NOT NULL,
+    period INTEGER NOT NULL,
+    channel_idx INTEGER NOT NULL,
+    messages INTEGER NOT NULL,
+    own INTEGER NOT NULL,
+    PRIMARY KEY (res, period, channel_idx)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS senders (
+    res INTEGER NOT NULL,
+    period INTEGER NOT NULL,
+    channel_idx INTEGER NOT NULL,
+    sender TEXT NOT NULL,
+    messages INTEGER NOT NULL,
+    PRIMARY KEY (res, period, channel_idx, sender)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS snr (
+    res INTEGER NOT NULL,
+    period INTEGER NOT NULL,
+    channel_idx INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    messages INTEGER NOT NULL,
+    PRIMARY KEY (res, period, channel_idx, bucket)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS path_len (
+    res INTEGER NOT NULL,
+    period INTEGER NOT NULL,
+    channel_idx INTEGER NOT NULL,
+    path_len INTEGER NOT NULL,
+    messages INTEGER NOT NULL,
+    PRIMARY KEY (res, period, channel_idx, path_len)
+) WITHOUT ROWID;
+"""
+
+_TABLES = ('counts', 'senders', 'snr', 'path_len')
+
+
+def _hour(timestamp: float) -> int:
+    """Timestamp of the whole local hour containing `timestamp`."""
+    # Local hours start where timestamp + UTC offset is a multiple of HOUR
+    shift = -time.localtime(timestamp).tm_gmtoff % HOUR
+    return int((timestamp - shift) // HOUR) * HOUR + shift
+
+
+def _local_day(timestamp: float) -> int:
+    """Timestamp of the local midnight starting the day of `timestamp`."""
+    day = datetime.fromtimestamp(timestamp)
+    return int(datetime(day.year, day.month, day.day).timestamp())
+
+
+def _next_local_day(day_start: int) -> int:
+    day = datetime.fromtimestamp(day_start) + timedelta(days=1)
+    return int(datetime(day.year, day.month, day.day).timestamp())
+
+
+def _local_month(timestamp: float) -> int:
+    """Timestamp of the local midnight starting the month of `timestamp`."""
+    day = datetime.fromtimestamp(timestamp)
+    return int(datetime(day.year, day.month, 1).timestamp())
+
+
+def _next_local_month(month_start: int) -> int:
+    day = datetime.fromtimestamp(month_start)
+    if day.month == 12:
+        return int(datetime(day.year + 1, 1, 1).timestamp())
+    return int(datetime(day.year, day.month + 1, 1).timestamp())
+
+
+def _timezone_signature() -> str:
+    """Identifies the server timezone the daily rows were built for."""
+    return f"{time.tzname}|{time.timezone}|{time.altzone}"
+
+
+def _split(start: int, end: int, res: int, max_res: int) -> List[Tuple[int, int, int]]:
+    """Cover [start, end), both on `res` boundaries, with the coarsest periods up to max_res."""
+    if res == max_res:
+        return [(res, start, end)] if start < end else []
+
+    coarser, floor, step = (DAY, _local_day, _next_local_day) if res == HOUR else \
+        (MONTH, _local_month, _next_local_month)
+    inner_start = floor(start)
+    if inner_start < start:
+        inner_start = step(inner_start)
+    inner_end = floor(end)
+    if inner_start >= inner_end:
+        return [(res, start, end)] if start < end else []
+
+    segments = []
+    if start < inner_start:
+        segments.append((res, start, inner_start))
+    segments.extend(_split(inner_start, inner_end, coarser, max_res))
+    if inner_end < end:
+        segments.append((res, inner_end, end))
+    return segments
+
+
+def split_range(from_ts: float, to_ts: float, max_res: int = MONTH) -> List[Tuple[int, int, int]]:
+    """
+    Cover [from_ts, to_ts) with rollup periods: hours at the edges, then whole
+    local days, then whole local months in the middle.
+
+    The range is widened to whole hours.
+
+    Args:
+        from_ts, to_ts: Range to cover
+        max_res: Coarsest resolution to use (HOUR, DAY or MONTH)
+
+    Returns:
+        List of (resolution, first period, end) segments, in time order
+    """
+    return _split(_hour(from_ts), _hour(to_ts + HOUR - 1), HOUR, max_res)
+
+
+class _Batch:
+    """Rollup counters of a run of channel messages, keyed like the table rows."""
+
+    __slots__ = ('counts', 'own', 'senders', 'snr', 'path_len', 'messages')
+
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self.own: Counter = Counter()
+        self.senders: Counter = Counter()
+        self.snr: Counter = Counter()
+        self.path_len: Counter = Counter()
+        self.messages = 0
+
+    def add(self, record: ChannelMessage, periods_of_hour: Dict[int, Tuple]):
+        """
+        Count one message in its hour, day and month.
+
+        Args:
+            record: Channel message
+            periods_of_hour: Cache of hour -> periods, shared between batches
+        """
+        channel_idx = record.channel_idx
+        hour = _hour(record.timestamp)
+        periods = periods_of_hour.get(hour)
+        if periods is None:
+            day = _local_day(hour)
+            if day == _local_day(hour + HOUR - 1):
+                periods = periods_of_hour[hour] = ((HOUR, hour), (DAY, day), (MONTH, _local_month(hour)))
+            else:
+                # Hour spanning local midnight (offset changed within it):
+                # day and month of the message itself, not cached
+                periods = ((HOUR, hour), (DAY, _local_day(record.timestamp)),
+                           (MONTH, _local_month(record.timestamp)))
+        for res, period in periods:
+            key = (res, period, channel_idx)
+            self.counts[key] += 1
+            if record.is_own:
+                self.own[key] += 1
+            if record.sender:
+                self.senders[(res, period, channel_idx, record.sender)] += 1
+            if isinstance(record.snr, (int, float)) and math.isfinite(record.snr):
+                self.snr[(res, period, channel_idx, int(record.snr // SNR_BUCKET_DB) * SNR_BUCKET_DB)] += 1
+            if isinstance(record.path_len, int):
+                self.path_len[(res, period, channel_idx, record.path_len)] += 1
+        self.messages += 1
+
+    def keep_periods(self, periods: set):
+        """Drop the counts of all periods but the given (res, period) pairs."""
+        for counter in (self.counts, self.own, self.senders, self.snr, self.path_len):
+            for key in [key for key in counter if key[:2] not in periods]:
+                del counter[key]
+
+
+def _channel_record(line: bytes, tombstones: Dict[int, float]) -> Optional[ChannelMessage]:
+    """Channel message of a raw line, or None if it is not one or was deleted."""
+    try:
+        record = parse_channel_record(decoder.loads(line))
+    except (json.JSONDecodeError, AttributeError):
+        return None
+    if not record or is_deleted(tombstones, record.channel_idx, record.timestamp):
+        return None
+    return record
+
+
+def _aggregate_range(msgs_file: Path, start: int, end: int,
+                     tombstones: Dict[int, float]) -> Tuple[_Batch, int]:
+    """
+    Aggregate the channel messages of [start, end) of the .msgs file
+    (runs in a scan worker process).
+
+    Returns:
+        Tuple of (batch, offset just past the last complete line)
+    """
+    batch = _Batch()
+    periods_of_hour: Dict[int, Tuple] = {}
+    scanner = LineScanner(msgs_file, start=start, end=end, tokens=decoder.CHANNEL_TOKENS)
+    for _, line in scanner:
+        record = _channel_record(line, tombstones)
+        if record:
+            batch.add(record, periods_of_hour)
+    return batch, scanner.end_offset
+
+
+class ChannelRollups:
+    """
+    Incrementally maintained activity rollups of the live .msgs file.
+
+    A single connection is shared between request threads, serialized with a lock.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_path: Optional[Path] = None
+        self._tombstones: Dict[int, float] = {}
+        self._tombstone_version = None
+        self._periods_of_hour: Dict[int, Tuple] = {}
+
+    # -------------------------------------------------------------------------
+    # Connection
+    # -------------------------------------------------------------------------
+
+    def _get_db_path(self) -> Path:
+        return Path(config.MC_CONFIG_DIR) / f"{runtime_config.get_device_name()}.rollups.db"
+
+    def _open(self):
+        """Open (or reopen after device name change) the database."""
+        db_path = self._get_db_path()
+        if self._conn is not None and db_path == self._db_path:
+            return
+
+        if self._conn is not None:
+            self._conn.close()
+
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+
+        row = None
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+        except sqlite3.OperationalError:
+            pass
+        if row is None or int(row[0]) != SCHEMA_VERSION:
+            conn.executescript(''.join(f'DROP TABLE IF EXISTS {table};' for table in _TABLES + ('meta',)))
+        conn.executescript(_SCHEMA)
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)",
+                     (str(SCHEMA_VERSION),))
+        conn.commit()
+
+        self._conn = conn
+        self._db_path = db_path
+        self._tombstone_version = None
+        logger.info(f"Channel rollups opened: {db_path}")
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    # -------------------------------------------------------------------------
+    # Ingestion
+    # -------------------------------------------------------------------------
+
+    def refresh(self) -> bool:
+        """
+        Aggregate whatever was appended to the .msgs file since the last call.
+
+        Returns:
+            True if the .msgs file exists
+        """
+        with self._lock:
+            self._open()
+
+            msgs_file = runtime_config.get_msgs_file_path()
+            try:
+                st = os.stat(msgs_file)
+            except FileNotFoundError:
+                return False
+
+            inode = self._get_meta('inode')
+            offset = int(self._get_meta('offset') or 0)
+            if inode is None or int(inode) != st.st_ino or st.st_size < offset:
+                # New or replaced file (compaction, device change) - rebuild
+                if inode is not None:
+                    logger.info(f"Messages file replaced, rebuilding channel rollups: {msgs_file}")
+                self._clear(st.st_ino)
+                offset = 0
+            elif self._get_meta('timezone') != _timezone_signature():
+                logger.info("Timezone changed, rebuilding channel rollups")
+                self._clear(st.st_ino)
+                offset = 0
+
+            self._sync_tombstones(msgs_file)
+
+            if st.st_size > offset:
+                self._ingest(msgs_file, offset)
+            return True
+
+    def _clear(self, inode: int):
+        with self._conn:
+            for table in _TABLES:
+                self._conn.execute(f'DELETE FROM {table}')
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('inode', ?)", (str(inode),))
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('offset', '0')")
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('timezone', ?)",
+                               (_timezone_signature(),))
+        self._periods_of_hour = {}
+
+    def _sync_tombstones(self, msgs_file: Path):
+        """Drop the rollups of channel messages deleted since the last refresh."""
+        version = tombstone_log.version
+        if version == self._tombstone_version:
+            return
+        tombstones = tombstone_log.get()
+        changed = {channel_idx: cutoff for channel_idx, cutoff in tombstones.items()
+                   if self._tombstones.get(channel_idx) != cutoff}
+        self._tombstones = tombstones
+
+        for channel_idx, cutoff in changed.items():
+            try:
+                self._apply_tombstone(msgs_file, channel_idx, cutoff)
+            except Exception as e:
+                logger.error(f"Error applying channel deletion to rollups: {e}")
+        self._tombstone_version = version
+
+    def _apply_tombstone(self, msgs_file: Path, channel_idx: int, cutoff: float):
+        """
+        Remove the channel's messages up to `cutoff` from the rollups.
+
+        Rows ending at or before the cutoff are deleted. The hour, day and
+        month containing it may also count later messages (e.g. of a new
+        channel at the same index), so they are recounted from the
+        ingested part of the file.
+        """
+        straddling = {(HOUR, _hour(cutoff)), (DAY, _local_day(cutoff)), (MONTH, _local_month(cutoff))}
+        with self._conn:
+            for res, period in straddling:
+                for table in _TABLES:
+                    self._conn.execute(f'DELETE FROM {table} WHERE res = ? AND channel_idx = ? AND period <= ?',
+                                       (res, channel_idx, period))
+
+        month_start = _local_month(cutoff)
+        month_end = _next_local_month(month_start)
+        msgs_offset_index.update()
+        batch = _Batch()
+        scanner = LineScanner(msgs_file, start=msgs_offset_index.offset_for_timestamp(month_start),
+                              end=int(self._get_meta('offset') or 0), tokens=decoder.CHANNEL_TOKENS)
+        for _, line in scanner:
+            record = _channel_record(line, self._tombstones)
+            if record and record.channel_idx == channel_idx and month_start <= record.timestamp < month_end:
+                batch.add(record, self._periods_of_hour)
+        batch.keep_periods(straddling)
+        self._flush(batch)
+
+    def _ingest(self, msgs_file: Path, offset: int):
+        """Aggregate complete lines from `offset`, committing counts and offset together."""
+        added = 0
+        try:
+            size = os.path.getsize(msgs_file)
+            if scan_pool.workers and size - offset >= ROLLUP_PARALLEL_MIN_BYTES:
+                # Large catch-up (first build, rebuild): aggregate ranges of the
+                # file in worker processes and write their counts in file order
+                jobs = [(msgs_file, start, end, self._tombstones)
+                        for start, end in split_file(msgs_file, offset, size)]
+                for batch, end_offset in scan_pool.map(_aggregate_range, jobs):
+                    self._flush(batch, end_offset)
+                    added += batch.messages
+            else:
+                batch = _Batch()
+                scanner = LineScanner(msgs_file, start=offset, tokens=decoder.CHANNEL_TOKENS)
+                for line_offset, line in scanner:
+                    record = _channel_record(line, self._tombstones)
+                    if not record:
+                        continue
+                    batch.add(record, self._periods_of_hour)
+                    if batch.messages >= ROLLUP_BATCH_SIZE:
+                        self._flush(batch, line_offset + len(line) + 1)
+                        added += batch.messages
+                        batch = _Batch()
+
+                self._flush(batch, scanner.end_offset)
+                added += batch.messages
+        except Exception as e:
+            logger.error(f"Error updating channel rollups from {msgs_file}: {e}")
+            return
+
+        if added:
+            logger.info(f"Channel rollups: added {added} messages")
+
+    def _flush(self, batch: _Batch, new_offset: Optional[int] = None):
+        """Add a batch to the tables and store the offset it was read up to (if given)."""
+        with self._conn:
+            self._conn.executemany(
+                'INSERT INTO counts (res, period, channel_idx, messages, own) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (res, period, channel_idx) DO UPDATE SET '
+                'messages = messages + excluded.messages, own = own + excluded.own',
+                [(*key, n, batch.own[key]) for key, n in batch.counts.items()])
+            for table, column, counter in (('senders', 'sender', batch.senders),
+                                           ('snr', 'bucket', batch.snr),
+                                           ('path_len', 'path_len', batch.path_len)):
+                self._conn.executemany(
+                    f'INSERT INTO {table} (res, period, channel_idx, {column}, messages) '
+                    f'VALUES (?, ?, ?, ?, ?) '
+                    f'ON CONFLICT (res, period, channel_idx, {column}) DO UPDATE SET '
+                    f'messages = messages + excluded.messages',
+                    [(*key, n) for key, n in counter.items()])
+            if new_offset is not None:
+                self._conn.execute("UPDATE meta SET value = ? WHERE key = 'offset'", (str(new_offset),))
+
+    # -------------------------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _filters(segments: List[Tuple[int, int, int]], channel_idx: Optional[int]) -> Tuple[str, list]:
+        clauses = ' OR '.join('(res = ? AND period >= ? AND period < ?)' for _ in segments)
+        params: list = [value for segment in segments for value in segment]
+        sql = f'({clauses})'
+        if channel_idx is not None:
+            sql += ' AND channel_idx = ?'
+            params.append(channel_idx)
+        return sql, params
+
+    def stats(self, from_ts: float, to_ts: float, channel_idx: Optional[int] = None,
+              bucket: str = 'day', top: int = DEFAULT_TOP_SENDERS) -> Dict:
+        """
+        Activity statistics for a time range.
+
+        Args:
+            from_ts, to_ts: Range [from_ts, to_ts), widened to whole hours
+            channel_idx: Only this channel (None = all channels)
+            bucket: Time series resolution: 'hour' or 'day' (local days)
+            top: Number of top senders to return
+
+        Returns:
+            Dict with total, per-channel counts, time series, top senders
+            and SNR / path_len histograms
+        """
+        segments = split_range(from_ts, to_ts)
+        result = {
+            'total': 0,
+            'own': 0,
+            'channels': [],
+            'series': [],
+            'top_senders': [],
+            'snr_histogram': [],
+            'path_len_histogram': []
+        }
+        if not segments:
+            return result
+
+        where, params = self._filters(segments, channel_idx)
+        series_segments = split_range(from_ts, to_ts, max_res=HOUR if bucket == 'hour' else DAY)
+        series_where, series_params = self._filters(series_segments, channel_idx)
+
+        with self._lock:
+            self._open()
+            channels = self._conn.execute(
+                f'SELECT channel_idx, SUM(messages), SUM(own) FROM counts WHERE {where} '
+                f'GROUP BY channel_idx ORDER BY channel_idx', params).fetchall()
+            periods = self._conn.execute(
+                f'SELECT period, SUM(messages) FROM counts WHERE {series_where} '
+                f'GROUP BY period ORDER BY period', series_params).fetchall()
+            top_senders = self._conn.execute(
+                f'SELECT sender, SUM(messages) AS n FROM senders WHERE {where} '
+                f'GROUP BY sender ORDER BY n DESC, sender LIMIT ?', params + [top]).fetchall()
+            snr_rows = self._conn.execute(
+                f'SELECT bucket, SUM(messages) FROM snr WHERE {where} '
+                f'GROUP BY bucket ORDER BY bucket', params).fetchall()
+            path_rows = self._conn.execute(
+                f'SELECT path_len, SUM(messages) FROM path_len WHERE {where} '
+                f'GROUP BY path_len ORDER BY path_len', params).fetchall()
+
+        if bucket == 'hour':
+            series = [{'start': period, 'count': n} for period, n in periods]
+        else:
+            # Edge hours fold into the local day they belong to
+            days: Dict[str, int] = {}
+            for period, n in periods:
+                day = datetime.fromtimestamp(period).strftime('%Y-%m-%d')
+                days[day] = days.get(day, 0) + n
+            series = [{'date': day, 'count': n} for day, n in days.items()]
+
+        result.update({
+            'total': sum(row[1] for row in channels),
+            'own': sum(row[2] for row in channels),
+            'channels': [{'channel_idx': idx, 'count': n, 'own': o} for idx, n, o in channels],
+            'series': series,
+            'top_senders': [{'sender': sender, 'count': n} for sender, n in top_senders],
+            'snr_histogram': [{'snr': b, 'count': n} for b, n in snr_rows],
+            'path_len_histogram': [{'path_len': p, 'count': n} for p, n in path_rows]
+        })
+        return result
+
+
+# Global channel rollups instance
+channel_rollups = ChannelRollups()
@@ -0,0 +1,160 @@
+"""
+Memory-mapped line scanning of .msgs and archive files
+
+Full scans (store and index rebuilds, archive reads, exports) usually want
+a few message types out of a much larger file. Instead of reading every
+line into a new bytes object and testing it, `LineScanner` maps the file
+and searches the mapping for the wanted type tokens directly; only the
+lines containing a token are located (by searching for the surrounding
+newlines) and copied out for decoding. Lines that cannot match are never
+materialized.
+
+Files are mapped in windows of SCAN_WINDOW_SIZE bytes so large archives do
+not need a contiguous address range (32-bit Raspberry Pi OS). If a file
+cannot be mapped, or MC_SCAN_MMAP is disabled, the same lines are produced
+with buffered reads.
+"""
+
+import logging
+import mmap
+import os
+from pathlib import Path
+from typing import Iterator, Optional, Tuple, Union
+
+from app.config import config
+from app.meshcore import decoder
+
+logger = logging.getLogger(__name__)
+
+# Size of each mapped window (rounded to the allocation granularity)
+SCAN_WINDOW_SIZE = 64 * 1024 * 1024
+
+
+class LineScanner:
+    """
+    Iterate the complete lines of a file, optionally only those containing
+    one of the given type tokens (see decoder.type_tokens).
+
+    Yields (line_offset, line) tuples, where line excludes the trailing
+    newline. A trailing line without a newline (still being written) is not
+    returned. After the iteration is exhausted, `end_offset` is the offset
+    just past the last complete line, i.e. where the next incremental scan
+    should start.
+
+    Example:
+        scanner = LineScanner(path, start=offset, tokens=decoder.CHANNEL_TOKENS)
+        for line_offset, line in scanner:
+            data = decoder.loads(line)
+        offset = scanner.end_offset
+    """
+
+    def __init__(self, path: Union[str, Path], start: int = 0, end: Optional[int] = None,
+                 tokens: Optional[Tuple[bytes, ...]] = None):
+        """
+        Args:
+            path: File to scan
+            start: Offset to start at (must be the start of a line)
+            end: Stop at this offset (None = current end of file)
+            tokens: Only return lines containing one of these (None = all lines)
+        """
+        self.path = path
+        self.start = start
+        self.end = end
+        self.tokens = tokens
+        self.end_offset = start
+
+    def __iter__(self) -> Iterator[Tuple[int, bytes]]:
+        with open(self.path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            end = size if self.end is None else min(self.end, size)
+            if end <= self.start:
+                return
+
+            if config.MC_SCAN_MMAP:
+                try:
+                    yield from self._scan_mapped(f, end)
+                    return
+                except (OSError, ValueError) as e:
+                    # Nothing has been yielded yet if mapping the first window failed
+                    if self.end_offset != self.start:
+                        raise
+                    logger.warning(f"Cannot mmap {self.path}, using buffered reads: {e}")
+
+            yield from self._scan_buffered(f, end)
+
+    def _scan_buffered(self, f, end: int) -> Iterator[Tuple[int, bytes]]:
+        tokens = self.tokens
+        offset = self.start
+        f.seek(offset)
+        for raw in f:
+            if offset + len(raw) > end or not raw.endswith(b'\n'):
+                break
+            line_offset = offset
+            offset += len(raw)
+            if tokens is None or decoder.has_type(raw, tokens):
+                yield line_offset, raw[:-1]
+            self.end_offset = offset
+
+    def _scan_mapped(self, f, end: int) -> Iterator[Tuple[int, bytes]]:
+        granularity = mmap.ALLOCATIONGRANULARITY
+        window_size = max(granularity, SCAN_WINDOW_SIZE // granularity * granularity)
+        pos = self.start
+
+        while pos < end:
+            base = pos - pos % granularity
+            length = min(end - base, window_size)
+            with mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ, offset=base) as mm:
+                # Only whole lines of this window are scanned; the rest is
+                # picked up by the next window
+                limit = mm.rfind(b'\n', pos - base, length) + 1
+                if limit == 0:
+                    if base + length >= end:
+                        return  # Only a partial line is left
+                    window_size *= 2  # A single line longer than the window
+                    continue
+
+                if self.tokens is None:
+                    yield from self._all_lines(mm, base, pos - base, limit)
+                else:
+                    yield from self._matching_lines(mm, base, pos - base, limit)
+
+            pos = base + limit
+            self.end_offset = pos
+
+    def _all_lines(self, mm: mmap.mmap, base: int, pos: int,
+                   limit: int) -> Iterator[Tuple[int, bytes]]:
+        find = mm.find
+        while pos < limit:
+            newline = find(b'\n', pos, limit)
+            yield base + pos, mm[pos:newline]
+            pos = newline + 1
+            self.end_offset = base + pos
+
+    def _matching_lines(self, mm: mmap.mmap, base: int, pos: int,
+                        limit: int) -> Iterator[Tuple[int, bytes]]:
+        """Lines of [pos, limit) of the window that contain a token."""
+        find = mm.find
+        rfind = mm.rfind
+        tokens = self.tokens
+        # Next occurrence of each token at or after pos (-1 = none left)
+        hits = [find(token, pos, limit) for token in tokens]
+
+        while True:
+            hit = -1
+            for token_hit in hits:
+                if token_hit >= 0 and (hit < 0 or token_hit < hit):
+                    hit = token_hit
+            if hit < 0:
+                return
+
+            line_start = rfind(b'\n', pos, hit) + 1
+            if line_start < pos:
+                line_start = pos
+            line_end = find(b'\n', hit, limit)
+            yield base + line_start, mm[line_start:line_end]
+
+            pos = line_end + 1
+            self.end_offset = base + pos
+            for i, token_hit in enumerate(hits):
+                if 0 <= token_hit < pos:
+                    hits[i] = find(tokens[i], pos, limit)
@@ -0,0 +1,628 @@
+"""
+Full-text message search index (SQLite FTS5)
+
+Indexes channel messages and DMs from the live .msgs file and from every
+archive file into {device_name}.search.db in MC_CONFIG_DIR, so searching
+months of history is an indexed lookup instead of a download of every day.
+
+Each message is keyed by a digest of its raw .msgs line. Archives are
+cumulative copies of the .msgs file, so the same line shows up in many
+files; lines whose key is already indexed are skipped before they are
+decoded, which keeps indexing a new archive close to the cost of hashing it.
+A DM logged twice (received again, with a different receive timestamp, SNR
+or path) is a different line but the same message: DM rows also carry the
+DM's dedup_key, and a new DM line whose dedup_key is already indexed counts
+as another copy of that row, so search hits match the DM view.
+
+The index catches up incrementally in a background thread: the live file by
+inode and byte offset, archive files when they appear. The thread starts
+with the app and runs every SEARCH_REFRESH_INTERVAL seconds, and right away
+when a search comes in or the archiver has written an archive. Searches
+never wait for it - they query what is indexed so far through their own
+connection (WAL lets it read while the indexer writes) and report
+`indexing` while a catch-up, such as the first backfill of every archive,
+is still running.
+
+Sources are ordered by name: archive dates, oldest first, then 'live'. As
+archives are cumulative, every message is contained in a contiguous run of
+sources, stored as its oldest (`source`) and newest (`last_source`) one.
+Dropping a source - an archive deleted from disk, the live file replaced by
+compaction, a channel deletion hiding live lines - only moves the rows at
+the ends of their run to the neighbouring source (or deletes rows found
+nowhere else), without rescanning the other files. Results report messages
+still in the live file as live, others under their oldest archive date.
+"""
+
+import hashlib
+import html
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from app.config import config, runtime_config
+from app.meshcore import decoder
+from app.meshcore.parser import parse_channel_record, _parse_priv_record, _parse_sent_record
+from app.meshcore.scan import LineScanner
+from app.meshcore.tombstones import tombstone_log, is_deleted, _is_deleted_line
+
+logger = logging.getLogger(__name__)
+
+# Bump when the table layout changes - the index is rebuilt from the files
+SCHEMA_VERSION = 3
+
+LIVE_SOURCE = 'live'
+
+_INDEX_TOKENS = decoder.CHANNEL_TOKENS + decoder.DM_TOKENS
+
+# Lines hashed (and looked up) per batch while catching up with a file
+INDEX_BATCH_SIZE = 2000
+
+# Seconds between background catch-ups when no search or archive asks for one
+SEARCH_REFRESH_INTERVAL = 60
+
+# Search result paging
+DEFAULT_SEARCH_LIMIT = 50
+MAX_SEARCH_LIMIT = 200
+
+# Snippet highlight markers - replaced by <mark> after HTML-escaping the text
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS sources (
+    name TEXT PRIMARY KEY,
+    inode INTEGER,
+    offset INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    msg_key BLOB NOT NULL UNIQUE,
+    source TEXT NOT NULL,
+    last_source TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    channel_idx INTEGER,
+    conversation TEXT,
+    dedup_key TEXT,
+    timestamp REAL NOT NULL,
+    sender TEXT,
+    content TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_search_source ON messages(source);
+CREATE INDEX IF NOT EXISTS idx_search_last_source ON messages(last_source);
+CREATE INDEX IF NOT EXISTS idx_search_ts ON messages(timestamp);
+CREATE INDEX IF NOT EXISTS idx_search_dedup ON messages(dedup_key) WHERE dedup_key IS NOT NULL;
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    content, sender,
+    content='messages', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts (rowid, content, sender) VALUES (new.id, new.content, new.sender);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, content, sender)
+    VALUES ('delete', old.id, old.content, old.sender);
+END;
+"""
+
+
+def _line_key(line: bytes) -> bytes:
+    return hashlib.blake2b(line, digest_size=16).digest()
+
+
+def build_match_query(text: str) -> Optional[str]:
+    """
+    Turn user input into an FTS5 MATCH expression.
+
+    Every whitespace-separated term must match (as a word prefix); FTS5
+    operators typed by the user are treated as plain text.
+
+    Returns:
+        MATCH expression, or None if the input has no searchable terms
+    """
+    terms = [t.replace('"', '""') for t in text.split()]
+    terms = [t for t in terms if t.strip('"')]
+    if not terms:
+        return None
+    return ' '.join(f'"{t}"*' for t in terms)
+
+
+def _date_to_timestamp(date_str: str, end_of_day: bool = False) -> float:
+    day = datetime.strptime(date_str, '%Y-%m-%d')
+    if end_of_day:
+        day = day.replace(hour=23, minute=59, second=59, microsecond=999999)
+    return day.timestamp()
+
+
+class MessageSearchIndex:
+    """
+    Incrementally maintained FTS5 index over live and archived messages.
+
+    The indexing connection is used by the background worker (serialized
+    with a lock); Flask request threads share a separate read connection.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_path: Optional[Path] = None
+        self._tombstones: Dict[int, float] = {}
+        self._tombstone_version = None
+
+        self._read_lock = Lock()
+        self._read_conn: Optional[sqlite3.Connection] = None
+        self._read_path: Optional[Path] = None
+
+        self._refresh_requested = threading.Event()
+        self._worker_started = False
+        self._indexing = False
+
+    # -------------------------------------------------------------------------
+    # Connection
+    # -------------------------------------------------------------------------
+
+    def _get_db_path(self) -> Path:
+        return Path(config.MC_CONFIG_DIR) / f"{runtime_config.get_device_name()}.search.db"
+
+    def _open(self):
+        """Open (or reopen after device name change) the database."""
+        db_path = self._get_db_path()
+        if self._conn is not None and db_path == self._db_path:
+            return
+
+        if self._conn is not None:
+            self._conn.close()
+
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+
+        row = None
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+        except sqlite3.OperationalError:
+            pass
+        if row is None or int(row[0]) != SCHEMA_VERSION:
+            conn.executescript("""
+                DROP TRIGGER IF EXISTS messages_fts_insert;
+                DROP TRIGGER IF EXISTS messages_fts_delete;
+                DROP TABLE IF EXISTS messages_fts;
+                DROP TABLE IF EXISTS messages;
+                DROP TABLE IF EXISTS sources;
+                DROP TABLE IF EXISTS meta;
+            """)
+        conn.executescript(_SCHEMA)
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)",
+                     (str(SCHEMA_VERSION),))
+        conn.commit()
+
+        self._conn = conn
+        self._db_path = db_path
+        self._tombstone_version = None
+        logger.info(f"Search index opened: {db_path}")
+
+    def _reader(self) -> Optional[sqlite3.Connection]:
+        """
+        Read connection to the current device's index (caller holds _read_lock).
+
+        Returns:
+            Connection, or None if the worker has not opened that index yet
+        """
+        db_path = self._db_path
+        if db_path is None or db_path != self._get_db_path():
+            return None
+        if self._read_conn is None or self._read_path != db_path:
+            if self._read_conn is not None:
+                self._read_conn.close()
+            self._read_conn = sqlite3.connect(str(db_path), check_same_thread=False)
+            self._read_path = db_path
+        return self._read_conn
+
+    # -------------------------------------------------------------------------
+    # Background worker
+    # -------------------------------------------------------------------------
+
+    def _refresh_loop(self):
+        while True:
+            self._refresh_requested.wait(SEARCH_REFRESH_INTERVAL)
+            self._refresh_requested.clear()
+            self._indexing = True
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Search index refresh failed: {e}")
+            finally:
+                self._indexing = False
+
+    def start(self):
+        """Start the background thread keeping the index current."""
+        if self._worker_started:
+            return
+        self._worker_started = True
+        self._refresh_requested.set()
+        threading.Thread(target=self._refresh_loop, daemon=True, name='search-index').start()
+        logger.info("Search index worker started")
+
+    def request_refresh(self):
+        """Have the background worker catch up now (without waiting for it)."""
+        self._refresh_requested.set()
+        self.start()
+
+    @property
+    def indexing(self) -> bool:
+        """True while a catch-up is running or the index was not opened yet."""
+        return self._indexing or self._db_path != self._get_db_path()
+
+    # -------------------------------------------------------------------------
+    # Indexing
+    # -------------------------------------------------------------------------
+
+    def _list_archives(self) -> List[Tuple[str, Path]]:
+        """(archive_date, path) of all archive files, oldest first."""
+        archive_dir = config.archive_dir_path
+        if not archive_dir.exists():
+            return []
+
+        prefix = f"{runtime_config.get_device_name()}."
+        archives = []
+        for archive_file in archive_dir.glob(f"{prefix}*.msgs"):
+            date_part = archive_file.name[len(prefix):-len('.msgs')]
+            try:
+                datetime.strptime(date_part, '%Y-%m-%d')
+            except ValueError:
+                continue
+            archives.append((date_part, archive_file))
+        archives.sort()
+        return archives
+
+    def refresh(self) -> bool:
+        """
+        Index whatever was appended to the .msgs file or archived since the last call.
+
+        Runs in the background worker; the first call for a device indexes
+        every archive, which takes a while with months of them.
+
+        Returns:
+            True if the index is usable
+        """
+        with self._lock:
+            self._open()
+
+            sources = self._list_archives()
+            sources.append((LIVE_SOURCE, runtime_config.get_msgs_file_path()))
+            present = {name for name, _ in sources}
+
+            # Archive files removed from disk take their unique messages with them
+            for (name,) in self._conn.execute('SELECT name FROM sources').fetchall():
+                if name not in present:
+                    self._drop_source(name)
+
+            self._sync_tombstones()
+
+            for name, path in sources:
+                self._index_source(name, path)
+            return True
+
+    def _sync_tombstones(self):
+        """Remove live messages of channels deleted since the last refresh."""
+        version = tombstone_log.version
+        if version == self._tombstone_version:
+            return
+        self._tombstones = tombstone_log.get()
+
+        # Archives keep their copies of deleted messages: rows also found in
+        # an archive now end at the newest archive, the others are deleted
+        newest_archive = self._neighbour_source(LIVE_SOURCE, newer=False)
+        with self._conn:
+            for channel_idx, cutoff in self._tombstones.items():
+                hidden = ("kind = 'channel' AND channel_idx = ? AND timestamp <= ? "
+                          "AND last_source = ?")
+                params = (channel_idx, cutoff, LIVE_SOURCE)
+                self._conn.execute(f'DELETE FROM messages WHERE {hidden} AND source = ?',
+                                   params + (LIVE_SOURCE,))
+                if newest_archive is not None:
+                    self._conn.execute(f'UPDATE messages SET last_source = ? WHERE {hidden}',
+                                       (newest_archive,) + params)
+        self._tombstone_version = version
+
+    def _neighbour_source(self, name: str, newer: bool) -> Optional[str]:
+        """Closest indexed source after (newer) or before `name` in source order."""
+        if newer:
+            row = self._conn.execute('SELECT MIN(name) FROM sources WHERE name > ?', (name,)).fetchone()
+        else:
+            row = self._conn.execute('SELECT MAX(name) FROM sources WHERE name < ?', (name,)).fetchone()
+        return row[0]
+
+    def _drop_source(self, name: str):
+        """
+        Forget a source's messages.
+
+        Rows contained only in this source are deleted. Rows whose run of
+        sources starts or ends here now start at the next source or end at
+        the previous one - by contiguity they are contained there.
+        """
+        logger.info(f"Search index: dropping source {name}")
+        with self._conn:
+            self._conn.execute('DELETE FROM sources WHERE name = ?', (name,))
+            older = self._neighbour_source(name, newer=False)
+            newer = self._neighbour_source(name, newer=True)
+            self._conn.execute('DELETE FROM messages WHERE source = ? AND last_source = ?', (name, name))
+            if newer is not None:
+                self._conn.execute('UPDATE messages SET source = ? WHERE source = ?', (newer, name))
+            else:
+                self._conn.execute('DELETE FROM messages WHERE source = ?', (name,))
+            if older is not None:
+                self._conn.execute('UPDATE messages SET last_source = ? WHERE last_source = ?', (older, name))
+            else:
+                self._conn.execute('DELETE FROM messages WHERE last_source = ?', (name,))
+
+    def _index_source(self, name: str, path: Path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return
+
+        row = self._conn.execute('SELECT inode, offset FROM sources WHERE name = ?', (name,)).fetchone()
+        offset = 0
+        if row is not None:
+            inode, offset = row
+            if inode != st.st_ino or st.st_size < offset:
+                # File replaced or rewritten (e.g. channel deleted) - reindex it
+                self._drop_source(name)
+                offset = 0
+
+        if row is None or offset == 0:
+            with self._conn:
+                self._conn.execute('INSERT OR REPLACE INTO sources (name, inode, offset) VALUES (?, ?, 0)',
+                                   (name, st.st_ino))
+
+        if st.st_size > offset:
+            self._ingest(name, path, offset)
+
+    def _ingest(self, name: str, path: Path, offset: int):
+        """Index complete lines of `path` from `offset`, in batches."""
+        batch: List[Tuple[bytes, bytes]] = []
+        added = 0
+
+        def flush(new_offset):
+            nonlocal batch, added
+            rows, extended = self._new_rows(name, batch)
+            with self._conn:
+                self._conn.executemany(
+                    'INSERT OR IGNORE INTO messages '
+                    '(msg_key, source, last_source, kind, channel_idx, conversation, dedup_key, '
+                    'timestamp, sender, content, data) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+                self._conn.executemany(
+                    'UPDATE messages SET source = min(source, ?), last_source = max(last_source, ?) '
+                    'WHERE msg_key = ?', [(name, name, key) for key in extended])
+                self._conn.execute('UPDATE sources SET offset = ? WHERE name = ?', (new_offset, name))
+            added += len(rows)
+            batch = []
+
+        try:
+            scanner = LineScanner(path, start=offset, tokens=_INDEX_TOKENS)
+            for line_offset, raw in scanner:
+                line = raw.strip()
+                batch.append((_line_key(line), line))
+                if len(batch) >= INDEX_BATCH_SIZE:
+                    flush(line_offset + len(raw) + 1)
+
+            offset = scanner.end_offset
+            flush(offset)
+        except Exception as e:
+            logger.error(f"Error updating search index from {path}: {e}")
+            return
+
+        if added:
+            logger.info(f"Search index: added {added} messages from {name}")
+
+    def _new_rows(self, name: str, batch: List[Tuple[bytes, bytes]]) -> Tuple[List[Tuple], List[bytes]]:
+        """
+        Decode the lines of a batch that are not indexed yet.
+
+        Returns:
+            Tuple of (rows to insert, keys of indexed rows whose run of
+            sources does not include this source yet)
+        """
+        if not batch:
+            return [], []
+
+        known: Dict[bytes, Tuple[str, str]] = {}
+        keys = [key for key, _ in batch]
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            known.update((row[0], (row[1], row[2])) for row in self._conn.execute(
+                f"SELECT msg_key, source, last_source FROM messages "
+                f"WHERE msg_key IN ({', '.join('?' * len(chunk))})", chunk))
+
+        rows = []
+        extended = set()
+        # dedup_key -> msg_key of the DM rows added by this batch
+        batch_dms: Dict[str, bytes] = {}
+
+        def extend(key):
+            first, last = known[key]
+            if name < first or name > last:
+                extended.add(key)
+                known[key] = (min(first, name), max(last, name))
+
+        for key, line in batch:
+            if key in known:
+                if name == LIVE_SOURCE and self._tombstones and _is_deleted_line(line, self._tombstones):
+                    continue  # Hidden in the live file
+                extend(key)
+                continue
+            known[key] = (name, name)
+            try:
+                row = self._to_row(name, key, decoder.loads(line),
+                                   self._tombstones if name == LIVE_SOURCE else {})
+            except json.JSONDecodeError:
+                continue
+            except Exception as e:
+                logger.debug(f"Search index: skipping unparsable line: {e}")
+                continue
+            if not row:
+                continue
+
+            dedup_key = row[6]
+            if dedup_key is not None:
+                # Another copy of an indexed DM - extend that row instead
+                dm_key = batch_dms.get(dedup_key)
+                if dm_key is None:
+                    found = self._conn.execute(
+                        'SELECT msg_key, source, last_source FROM messages WHERE dedup_key = ?',
+                        (dedup_key,)).fetchone()
+                    if found is not None:
+                        dm_key = found[0]
+                        known.setdefault(dm_key, (found[1], found[2]))
+                if dm_key is not None:
+                    extend(dm_key)
+                    continue
+                batch_dms[dedup_key] = key
+            rows.append(row)
+        return rows, list(extended)
+
+    @staticmethod
+    def _to_row(source: str, key: bytes, data: Dict, tombstones: Dict[int, float]) -> Optional[Tuple]:
+        msg_type = data.get('type')
+
+        if msg_type == 'PRIV' or msg_type == 'SENT_MSG':
+            record = _parse_priv_record(data) if msg_type == 'PRIV' else _parse_sent_record(data)
+            if not record:
+                return None
+            return (key, source, source, 'dm', None, record.conversation_id, record.dedup_key,
+                    record.timestamp, record.sender, record.content, json.dumps(record.to_dict(), ensure_ascii=False))
+
+        record = parse_channel_record(data)
+        if not record or is_deleted(tombstones, record.channel_idx, record.timestamp):
+            return None
+        return (key, source, source, 'channel', record.channel_idx, None, None,
+                record.timestamp, record.sender, record.content, json.dumps(record.to_dict(), ensure_ascii=False))
+
+    # -------------------------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _filters(kind: Optional[str], channel_idx: Optional[int], from_ts: Optional[float],
+                 to_ts: Optional[float], skip: Tuple[str, ...] = ()) -> Tuple[str, list]:
+        clauses, params = [], []
+        if kind and 'kind' not in skip:
+            clauses.append('m.kind = ?')
+            params.append(kind)
+        if channel_idx is not None and 'channel' not in skip:
+            clauses.append('m.channel_idx = ?')
+            params.append(channel_idx)
+        if from_ts is not None and 'date' not in skip:
+            clauses.append('m.timestamp >= ?')
+            params.append(from_ts)
+        if to_ts is not None and 'date' not in skip:
+            clauses.append('m.timestamp <= ?')
+            params.append(to_ts)
+        return ''.join(f' AND {c}' for c in clauses), params
+
+    def search(self, text: str, kind: Optional[str] = None, channel_idx: Optional[int] = None,
+               from_date: Optional[str] = None, to_date: Optional[str] = None,
+               sort: str = 'relevance', limit: int = DEFAULT_SEARCH_LIMIT, offset: int = 0) -> Dict:
+        """
+        Search messages.
+
+        Args:
+            text: Words to look for (all must match, as word prefixes)
+            kind: 'channel' or 'dm' (None = both)
+            channel_idx: Only messages of this channel
+            from_date: Oldest day to include (YYYY-MM-DD, local time)
+            to_date: Newest day to include (YYYY-MM-DD, local time)
+            sort: 'relevance' (BM25, newest first on ties) or 'newest'
+            limit: Page size (capped at MAX_SEARCH_LIMIT)
+            offset: Number of hits to skip
+
+        Returns:
+            Dict with total, results (message dicts with kind, archive_date
+            and an HTML snippet), facets (per channel, DMs, per day) and
+            indexing (True while the index is still catching up, so older
+            or newest messages may be missing)
+
+        Raises:
+            ValueError: on invalid dates
+        """
+        match = build_match_query(text)
+        indexing = self.indexing
+        # Pick up messages received since the last catch-up for the next search
+        self.request_refresh()
+        empty = {'total': 0, 'results': [], 'facets': {'channels': [], 'dm': 0, 'dates': []},
+                 'indexing': indexing}
+        if match is None:
+            return empty
+
+        from_ts = _date_to_timestamp(from_date) if from_date else None
+        to_ts = _date_to_timestamp(to_date, end_of_day=True) if to_date else None
+        limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+        offset = max(offset, 0)
+        order = 'm.timestamp DESC, m.id DESC' if sort == 'newest' else 'rank, m.timestamp DESC, m.id DESC'
+
+        base = 'FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid WHERE messages_fts MATCH ?'
+
+        with self._read_lock:
+            conn = self._reader()
+            if conn is None:
+                return empty
+
+            where, params = self._filters(kind, channel_idx, from_ts, to_ts)
+            total = conn.execute(f'SELECT COUNT(*) {base}{where}', [match, *params]).fetchone()[0]
+
+            rows = conn.execute(
+                f"SELECT m.data, m.kind, m.source, m.last_source, "
+                f"snippet(messages_fts, 0, '{_MARK_START}', '{_MARK_END}', '…', 16) "
+                f"{base}{where} ORDER BY {order} LIMIT ? OFFSET ?",
+                [match, *params, limit, offset]).fetchall()
+
+            # Facets count every hit matching the other filters, so picking
+            # a channel or day still shows the alternatives
+            where, params = self._filters(kind, None, from_ts, to_ts, skip=('channel',))
+            channel_rows = conn.execute(
+                f"SELECT m.channel_idx, COUNT(*) {base}{where} AND m.kind = 'channel' "
+                f"GROUP BY m.channel_idx ORDER BY m.channel_idx", [match, *params]).fetchall()
+            dm_count = conn.execute(
+                f"SELECT COUNT(*) {base}{where} AND m.kind = 'dm'", [match, *params]).fetchone()[0]
+
+            where, params = self._filters(kind, channel_idx, None, None, skip=('date',))
+            date_rows = conn.execute(
+                f"SELECT date(m.timestamp, 'unixepoch', 'localtime') AS day, COUNT(*) {base}{where} "
+                f"GROUP BY day ORDER BY day DESC", [match, *params]).fetchall()
+
+        results = []
+        for data, row_kind, source, last_source, snippet in rows:
+            msg = decoder.loads(data)
+            msg['kind'] = row_kind
+            msg['archive_date'] = None if last_source == LIVE_SOURCE else source
+            msg['snippet'] = html.escape(snippet).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+            results.append(msg)
+
+        return {
+            'total': total,
+            'results': results,
+            'facets': {
+                'channels': [{'channel_idx': idx, 'count': n} for idx, n in channel_rows],
+                'dm': dm_count,
+                'dates': [{'date': day, 'count': n} for day, n in date_rows]
+            },
+            'indexing': indexing
+        }
+
+
+# Global search index instance (indexed by its worker, started with the app)
+search_index = MessageSearchIndex()
@@ -0,0 +1,450 @@
+"""
+SQLite message index - optional storage engine mirroring the .msgs file
+
+Ingests .msgs lines into a local SQLite database ({device_name}.msgs.db in
+MC_CONFIG_DIR) so channel, DM and update queries become indexed lookups
+instead of full file scans. The JSONL file remains the source of truth:
+the index remembers the file inode and byte offset it has consumed and
+catches up incrementally, rebuilding from scratch if the file is replaced
+or shrinks.
+
+Duplicate DM lines are dropped by the shared DM dedup index (rolling
+per-conversation windows, see dm_dedup), so both storage engines return
+the same DM lists.
+
+Enabled with MC_STORAGE_ENGINE=sqlite.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from app.config import config, runtime_config
+from app.meshcore import decoder
+from app.meshcore.dm_dedup import dm_dedup_index
+from app.meshcore.parser import parse_message, _parse_priv_message, _parse_sent_msg
+from app.meshcore.scan import LineScanner
+from app.meshcore.tombstones import tombstone_log, is_deleted
+
+logger = logging.getLogger(__name__)
+
+# Bump when the table layout or dedup_key format changes - the index is rebuilt
+# from the .msgs file
+SCHEMA_VERSION = 3
+
+CHANNEL_TYPES = decoder.CHANNEL_MESSAGE_TYPES
+DM_TYPES = decoder.DM_MESSAGE_TYPES
+
+_INGEST_TOKENS = decoder.CHANNEL_TOKENS + decoder.DM_TOKENS
+
+# Rows are inserted in batches while catching up with a large file
+INGEST_BATCH_SIZE = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    file_offset INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    channel_idx INTEGER,
+    timestamp REAL NOT NULL,
+    sender TEXT,
+    conversation TEXT,
+    dedup_key TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_channel_ts ON messages(channel_idx, timestamp);
+CREATE INDEX IF NOT EXISTS idx_messages_type_conv ON messages(type, conversation, timestamp);
+CREATE INDEX IF NOT EXISTS idx_messages_sender ON messages(sender);
+CREATE INDEX IF NOT EXISTS idx_messages_ts ON messages(timestamp);
+CREATE INDEX IF NOT EXISTS idx_messages_ts_offset ON messages(timestamp, file_offset);
+CREATE TABLE IF NOT EXISTS dm_names (
+    pubkey_prefix TEXT PRIMARY KEY,
+    name TEXT NOT NULL
+);
+"""
+
+
+def _cutoff_timestamp(days: Optional[int]) -> float:
+    if days is not None and days > 0:
+        return (datetime.now() - timedelta(days=days)).timestamp()
+    return float('-inf')
+
+
+class SQLiteMessageIndex:
+    """
+    Incrementally maintained SQLite mirror of the .msgs file.
+
+    Exposes the same query surface as the in-memory MessageStore
+    (refresh / get_messages / count / latest / channel_stats) plus DM queries.
+    A single connection is shared between Flask request threads and
+    serialized with a lock.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_path: Optional[Path] = None
+        self._tombstones: Dict[int, float] = {}
+        self._tombstone_version = None
+        # (channel message count, latest timestamp), maintained by _ingest
+        # once loaded so status() does not have to scan the table
+        self._counters: Optional[Tuple[int, Optional[float]]] = None
+
+    # -------------------------------------------------------------------------
+    # Connection and catch-up
+    # -------------------------------------------------------------------------
+
+    def _get_db_path(self) -> Path:
+        return Path(config.MC_CONFIG_DIR) / f"{runtime_config.get_device_name()}.msgs.db"
+
+    def _open(self):
+        """Open (or reopen after device name change) the database."""
+        db_path = self._get_db_path()
+        if self._conn is not None and db_path == self._db_path:
+            return
+
+        if self._conn is not None:
+            self._conn.close()
+
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(_SCHEMA)
+
+        row = conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+        if row is None or int(row[0]) != SCHEMA_VERSION:
+            self._clear(conn)
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)",
+                         (str(SCHEMA_VERSION),))
+            conn.commit()
+
+        self._conn = conn
+        self._db_path = db_path
+        self._tombstone_version = None
+        self._counters = None
+        logger.info(f"SQLite message index opened: {db_path}")
+
+    @staticmethod
+    def _clear(conn: sqlite3.Connection):
+        conn.execute('DELETE FROM messages')
+        conn.execute('DELETE FROM dm_names')
+        conn.execute("DELETE FROM meta WHERE key IN ('inode', 'offset')")
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def refresh(self) -> bool:
+        """
+        Ingest lines appended to the .msgs file since the stored offset.
+
+        Returns:
+            True if the messages file exists, False otherwise
+        """
+        msgs_file = runtime_config.get_msgs_file_path()
+
+        with self._lock:
+            self._open()
+
+            try:
+                st = os.stat(msgs_file)
+            except FileNotFoundError:
+                return False
+
+            inode = self._get_meta('inode')
+            offset = int(self._get_meta('offset') or 0)
+
+            if inode != str(st.st_ino) or st.st_size < offset:
+                if inode is not None:
+                    logger.info(f"Messages file changed, rebuilding SQLite index: {msgs_file}")
+                self._clear(self._conn)
+                self._counters = None
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('inode', ?)",
+                                   (str(st.st_ino),))
+                self._conn.commit()
+                offset = 0
+
+            self._sync_tombstones()
+
+            # DM lines are only ingested once the dedup index has judged them
+            end_offset, duplicates = dm_dedup_index.snapshot() if dm_dedup_index.update() else (0, frozenset())
+            if end_offset > offset:
+                self._ingest(msgs_file, offset, end_offset, duplicates)
+
+            return True
+
+    def _sync_tombstones(self):
+        """Delete rows of channels deleted since the last refresh."""
+        version = tombstone_log.version
+        if version == self._tombstone_version:
+            return
+        self._tombstones = tombstone_log.get()
+        with self._conn:
+            for channel_idx, cutoff in self._tombstones.items():
+                self._conn.execute(
+                    'DELETE FROM messages WHERE type IN (?, ?) AND channel_idx = ? AND timestamp <= ?',
+                    (*CHANNEL_TYPES, channel_idx, cutoff))
+        self._tombstone_version = version
+        self._counters = None
+
+    def _ingest(self, msgs_file: Path, offset: int, end_offset: int, duplicates: frozenset):
+        """
+        Parse complete lines of [offset, end_offset) and insert them in batches,
+        skipping the duplicate DM lines at the given offsets.
+        """
+        rows = []
+        names = {}
+        added = 0
+
+        def flush(new_offset):
+            nonlocal rows, names
+            with self._conn:
+                self._conn.executemany(
+                    'INSERT INTO messages '
+                    '(file_offset, type, channel_idx, timestamp, sender, conversation, dedup_key, data) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO dm_names (pubkey_prefix, name) VALUES (?, ?)',
+                    names.items())
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('offset', ?)",
+                                   (str(new_offset),))
+            if self._counters is not None:
+                count, latest_ts = self._counters
+                for row in rows:
+                    if row[1] in CHANNEL_TYPES:
+                        count += 1
+                        if latest_ts is None or row[3] > latest_ts:
+                            latest_ts = row[3]
+                self._counters = (count, latest_ts)
+            rows = []
+            names = {}
+
+        try:
+            scanner = LineScanner(msgs_file, start=offset, end=end_offset, tokens=_INGEST_TOKENS)
+            for line_offset, line in scanner:
+                if line_offset in duplicates:
+                    continue
+                try:
+                    data = decoder.loads(line)
+                    row = self._to_row(data, line_offset, names, self._tombstones)
+                except json.JSONDecodeError as e:
+                    logger.warning(f"Invalid JSON at offset {line_offset}: {e}")
+                    continue
+                except Exception as e:
+                    logger.error(f"Error parsing line at offset {line_offset}: {e}")
+                    continue
+
+                if row:
+                    rows.append(row)
+                    added += 1
+                    if len(rows) >= INGEST_BATCH_SIZE:
+                        flush(line_offset + len(line) + 1)
+
+            offset = scanner.end_offset
+            flush(offset)
+        except Exception as e:
+            logger.error(f"Error updating SQLite index: {e}")
+            return
+
+        if added:
+            logger.debug(f"SQLite index: ingested {added} rows (offset {offset})")
+
+    @staticmethod
+    def _to_row(data: Dict, line_offset: int, names: Dict[str, str],
+                tombstones: Dict[int, float]) -> Optional[Tuple]:
+        """Convert a raw .msgs entry into a messages table row (or None to skip)."""
+        msg_type = data.get('type')
+
+        if msg_type in CHANNEL_TYPES:
+            parsed = parse_message(data)
+            if not parsed or is_deleted(tombstones, parsed['channel_idx'], parsed['timestamp']):
+                return None
+            return (line_offset, msg_type, parsed['channel_idx'], parsed['timestamp'],
+                    parsed['sender'], None, None, json.dumps(parsed, ensure_ascii=False))
+
+        if msg_type == 'PRIV':
+            parsed = _parse_priv_message(data)
+            if parsed and parsed.get('pubkey_prefix'):
+                names[parsed['pubkey_prefix']] = parsed['sender']
+        elif msg_type == 'SENT_MSG':
+            parsed = _parse_sent_msg(data)
+        else:
+            return None
+
+        if not parsed:
+            return None
+        return (line_offset, msg_type, None, parsed['timestamp'], parsed['sender'],
+                parsed['conversation_id'], parsed['dedup_key'], json.dumps(parsed, ensure_ascii=False))
+
+    # -------------------------------------------------------------------------
+    # Channel message queries
+    # -------------------------------------------------------------------------
+
+    def get_messages(self, channel_idx: Optional[int] = None, days: Optional[int] = None,
+                     offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        """Return channel messages (oldest first) with read_messages semantics."""
+        sql = 'SELECT data FROM messages WHERE type IN (?, ?) AND timestamp >= ?'
+        params: list = [*CHANNEL_TYPES, _cutoff_timestamp(days)]
+        if channel_idx is not None:
+            sql += ' AND channel_idx = ?'
+            params.append(channel_idx)
+        sql += ' ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?'
+        params += [limit if limit is not None and limit > 0 else -1, max(offset, 0)]
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        return [decoder.loads(row[0]) for row in reversed(rows)]
+
+    def get_page(self, channel_idx: Optional[int] = None, limit: int = 100, days: Optional[int] = None,
+                 before: Optional[Tuple] = None, after: Optional[Tuple] = None) -> Dict:
+        """Return one page of channel messages next to a cursor key (see MessageStore.get_page)."""
+        # "+type" keeps the planner off the type index, so the page is read
+        # straight from the (timestamp, file_offset) or channel index
+        sql = 'SELECT data, timestamp, file_offset FROM messages WHERE +type IN (?, ?) AND timestamp >= ?'
+        params: list = [*CHANNEL_TYPES, _cutoff_timestamp(days)]
+        if channel_idx is not None:
+            sql += ' AND channel_idx = ?'
+            params.append(channel_idx)
+
+        if after is not None:
+            sql += ' AND (timestamp, file_offset) > (?, ?) ORDER BY timestamp, file_offset'
+            params += list(after)
+        else:
+            if before is not None:
+                sql += ' AND (timestamp, file_offset) < (?, ?)'
+                params += list(before)
+            sql += ' ORDER BY timestamp DESC, file_offset DESC'
+
+        # One extra row tells whether there is another page
+        sql += ' LIMIT ?'
+        params.append(limit + 1)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if after is None:
+            rows.reverse()
+
+        return {
+            'messages': [decoder.loads(row[0]) for row in rows],
+            'first': (rows[0][1], rows[0][2]) if rows else None,
+            'last': (rows[-1][1], rows[-1][2]) if rows else None,
+            'has_more': has_more
+        }
+
+    def count(self) -> int:
+        """Total number of channel messages."""
+        with self._lock:
+            row = self._conn.execute('SELECT COUNT(*) FROM messages WHERE type IN (?, ?)',
+                                     CHANNEL_TYPES).fetchone()
+        return row[0]
+
+    def latest(self) -> Optional[Dict]:
+        """Most recent channel message or None."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT data FROM messages WHERE type IN (?, ?) '
+                'ORDER BY timestamp DESC, id DESC LIMIT 1', CHANNEL_TYPES).fetchone()
+        return decoder.loads(row[0]) if row else None
+
+    def status(self) -> Dict:
+        """Channel message count, latest timestamp and consumed file offset."""
+        with self._lock:
+            if self._counters is None:
+                count = self._conn.execute('SELECT COUNT(*) FROM messages WHERE type IN (?, ?)',
+                                           CHANNEL_TYPES).fetchone()[0]
+                row = self._conn.execute(
+                    'SELECT data FROM messages WHERE type IN (?, ?) '
+                    'ORDER BY timestamp DESC, id DESC LIMIT 1', CHANNEL_TYPES).fetchone()
+                self._counters = (count, decoder.loads(row[0])['timestamp'] if row else None)
+            count, latest_ts = self._counters
+            return {
+                'message_count': count,
+                'latest_message_timestamp': latest_ts,
+                'file_offset': int(self._get_meta('offset') or 0)
+            }
+
+    def channel_stats(self, last_seen: Dict[int, float], days: Optional[int] = None) -> Dict[int, Dict]:
+        """
+        Per-channel latest timestamp and unread count within the days window.
+
+        Returns:
+            {channel_idx: {'latest_timestamp': ts, 'unread_count': n}}
+        """
+        cutoff = _cutoff_timestamp(days)
+        stats = {}
+
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT channel_idx, MAX(timestamp) FROM messages '
+                'WHERE type IN (?, ?) AND timestamp >= ? GROUP BY channel_idx',
+                (*CHANNEL_TYPES, cutoff)).fetchall()
+
+            for channel_idx, latest_ts in rows:
+                since = max(cutoff, last_seen.get(channel_idx, 0))
+                unread = self._conn.execute(
+                    'SELECT COUNT(*) FROM messages WHERE channel_idx = ? AND timestamp > ? '
+                    'AND timestamp >= ? AND type IN (?, ?)',
+                    (channel_idx, since, cutoff, *CHANNEL_TYPES)).fetchone()[0]
+                stats[channel_idx] = {
+                    'latest_timestamp': latest_ts,
+                    'unread_count': unread
+                }
+
+        return stats
+
+    # -------------------------------------------------------------------------
+    # DM queries
+    # -------------------------------------------------------------------------
+
+    def get_pubkey_to_name(self) -> Dict[str, str]:
+        """Map pubkey_prefix -> most recent sender name seen in PRIV messages."""
+        with self._lock:
+            return dict(self._conn.execute('SELECT pubkey_prefix, name FROM dm_names').fetchall())
+
+    def get_dm_messages(self, limit: Optional[int] = None, conversation_id: Optional[str] = None,
+                        days: Optional[int] = 7) -> Tuple[List[Dict], Dict[str, str]]:
+        """Return (messages oldest first, pubkey_to_name) with read_dm_messages semantics."""
+        pubkey_to_name = self.get_pubkey_to_name()
+
+        sql = 'SELECT data FROM messages WHERE type IN (?, ?) AND timestamp >= ?'
+        params: list = [*DM_TYPES, _cutoff_timestamp(days)]
+
+        if conversation_id:
+            # A conversation may be keyed by pubkey (incoming) or name (outgoing)
+            conversation_ids = {conversation_id}
+            if conversation_id.startswith('pk_'):
+                name = pubkey_to_name.get(conversation_id[3:])
+                if name:
+                    conversation_ids.add(f"name_{name}")
+            elif conversation_id.startswith('name_'):
+                name = conversation_id[5:]
+                conversation_ids.update(f"pk_{pk}" for pk, n in pubkey_to_name.items() if n == name)
+
+            sql += f" AND conversation IN ({', '.join('?' * len(conversation_ids))})"
+            params += sorted(conversation_ids)
+
+        sql += ' ORDER BY timestamp DESC, id DESC LIMIT ?'
+        params.append(limit if limit is not None and limit > 0 else -1)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        return [decoder.loads(row[0]) for row in reversed(rows)], pubkey_to_name
+
+
+# Global SQLite index instance (only opened when MC_STORAGE_ENGINE=sqlite)
+sqlite_index = SQLiteMessageIndex()
@@ -0,0 +1,535 @@
+"""
+Message store - incremental, tail-following view of the .msgs file
+
+Keeps parsed channel messages in memory and remembers the byte offset it has
+already consumed, so each refresh only parses lines appended since the last
+call. Readers answer from per-channel sequences in O(result) instead of
+re-reading the whole file on every request.
+
+Direct messages are aggregated per conversation as they arrive, so the DM
+conversation list and unread counts are a bisect per conversation instead
+of a file scan per conversation.
+"""
+
+import json
+import logging
+import os
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from pathlib import Path
+from threading import RLock
+from typing import Dict, List, Optional, Tuple
+
+from app.config import runtime_config
+from app.meshcore import decoder
+from app.meshcore.dm_dedup import DedupWindows
+from app.meshcore.parser import parse_channel_record, _parse_priv_record, _parse_sent_record
+from app.meshcore.records import ChannelMessage, DirectMessage
+from app.meshcore.scan import LineScanner
+from app.meshcore.tombstones import tombstone_log, is_deleted
+
+logger = logging.getLogger(__name__)
+
+# Lines the store cares about: channel messages and direct messages
+_STORE_TOKENS = decoder.CHANNEL_TOKENS + decoder.DM_TOKENS
+
+
+def _cutoff_timestamp(days: Optional[int]) -> Optional[float]:
+    if days is not None and days > 0:
+        return (datetime.now() - timedelta(days=days)).timestamp()
+    return None
+
+
+def _record_key(record: ChannelMessage) -> Tuple:
+    return record.timestamp, record.file_offset
+
+
+class _DMRun:
+    """DMs of one conversation and direction, sorted by (timestamp, file order)."""
+
+    __slots__ = ('records', 'ts', 'seq')
+
+    def __init__(self):
+        self.records: List[DirectMessage] = []
+        self.ts: List[float] = []
+        self.seq: List[int] = []
+
+    def add(self, record: DirectMessage, seq: int):
+        ts = record.timestamp
+        pos = len(self.ts) if not self.ts or ts >= self.ts[-1] else bisect_right(self.ts, ts)
+        self.records.insert(pos, record)
+        self.ts.insert(pos, ts)
+        self.seq.insert(pos, seq)
+
+    def start(self, cutoff_timestamp: Optional[float]) -> int:
+        return bisect_left(self.ts, cutoff_timestamp) if cutoff_timestamp is not None else 0
+
+    def first(self, start: int) -> Optional[Tuple]:
+        """(timestamp, seq, record) of the oldest message from `start`."""
+        if start >= len(self.ts):
+            return None
+        return self.ts[start], self.seq[start], self.records[start]
+
+    def last(self, start: int) -> Optional[Tuple]:
+        """(timestamp, seq, record) of the newest message from `start`."""
+        if start >= len(self.ts):
+            return None
+        return self.ts[-1], self.seq[-1], self.records[-1]
+
+    def first_with_latest_timestamp(self, start: int) -> Optional[Tuple]:
+        """(timestamp, seq, record) of the earliest message sharing the newest timestamp."""
+        if start >= len(self.ts):
+            return None
+        pos = max(start, bisect_left(self.ts, self.ts[-1]))
+        return self.ts[pos], self.seq[pos], self.records[pos]
+
+    def count_after(self, start: int, timestamp: float) -> int:
+        return len(self.ts) - max(start, bisect_right(self.ts, timestamp))
+
+
+class _DMThread:
+    """Raw DM conversation (one conversation_id as parsed from the file)."""
+
+    __slots__ = ('incoming', 'outgoing')
+
+    def __init__(self):
+        self.incoming = _DMRun()
+        self.outgoing = _DMRun()
+
+
+class MessageStore:
+    """
+    Process-wide in-memory index of channel messages (CHAN / SENT_CHAN).
+
+    Messages are kept as compact ChannelMessage records, sorted by timestamp
+    (stable with respect to file order), both per channel and across all
+    channels. Records are turned into dicts only for the slice a caller asks
+    for. A parallel list of timestamps
+    is maintained for each sequence so day cutoffs are a bisect.
+
+    The store resets itself when the device name (file path) changes, when
+    the file is replaced (inode change) or when it shrinks (rewritten).
+    """
+
+    def __init__(self):
+        self._lock = RLock()
+        self._reset(None)
+
+    def _reset(self, path: Optional[Path]):
+        self._path = path
+        self._inode = None
+        self._offset = 0
+        self._all: List[ChannelMessage] = []
+        self._all_ts: List[float] = []
+        self._channels: Dict[int, List[ChannelMessage]] = {}
+        self._channel_ts: Dict[int, List[float]] = {}
+        self._dm_threads: Dict[str, _DMThread] = {}
+        self._dm_dedup = DedupWindows()
+        self._dm_seq = 0
+        self._pubkey_to_name: Dict[str, str] = {}
+        self._tombstones: Dict[int, float] = {}
+        self._tombstone_version = None
+
+    def invalidate(self):
+        """Drop all cached state; the next refresh re-reads the file."""
+        with self._lock:
+            self._reset(None)
+            logger.debug("Message store invalidated")
+
+    def refresh(self) -> bool:
+        """
+        Parse lines appended to the .msgs file since the last refresh.
+
+        Returns:
+            True if the messages file exists, False otherwise
+        """
+        msgs_file = runtime_config.get_msgs_file_path()
+
+        with self._lock:
+            try:
+                st = os.stat(msgs_file)
+            except FileNotFoundError:
+                if self._path is not None:
+                    self._reset(None)
+                return False
+
+            if (msgs_file != self._path or st.st_ino != self._inode or
+                    st.st_size < self._offset):
+                if self._path is not None:
+                    logger.info(f"Messages file changed, rebuilding message store: {msgs_file}")
+                self._reset(msgs_file)
+                self._inode = st.st_ino
+
+            self._sync_tombstones()
+
+            if st.st_size == self._offset:
+                return True
+
+            self._consume(msgs_file)
+            return True
+
+    def _sync_tombstones(self):
+        """Hide channel messages deleted since the last refresh."""
+        version = tombstone_log.version
+        if version == self._tombstone_version:
+            return
+        self._tombstones = tombstone_log.get()
+        self._tombstone_version = version
+
+        removed = 0
+        for channel_idx, cutoff in self._tombstones.items():
+            ts_list = self._channel_ts.get(channel_idx)
+            if not ts_list:
+                continue
+            pos = bisect_right(ts_list, cutoff)
+            if pos:
+                del self._channels[channel_idx][:pos]
+                del ts_list[:pos]
+                removed += pos
+
+        if removed:
+            keep = [i for i, m in enumerate(self._all)
+                    if not is_deleted(self._tombstones, m.channel_idx, m.timestamp)]
+            self._all = [self._all[i] for i in keep]
+            self._all_ts = [self._all_ts[i] for i in keep]
+            logger.info(f"Message store: removed {removed} deleted channel messages")
+
+    def _consume(self, msgs_file: Path):
+        """Read and index complete lines from the current offset."""
+        added = 0
+        scanner = LineScanner(msgs_file, start=self._offset, tokens=_STORE_TOKENS)
+
+        try:
+            for line_offset, line in scanner:
+                try:
+                    data = decoder.loads(line)
+                    msg_type = data.get('type')
+                    if msg_type == 'PRIV' or msg_type == 'SENT_MSG':
+                        if self._insert_dm(data, msg_type):
+                            added += 1
+                        continue
+                    record = parse_channel_record(data)
+                    if record:
+                        record.file_offset = line_offset
+                        self._insert(record)
+                        added += 1
+                except json.JSONDecodeError as e:
+                    logger.warning(f"Invalid JSON at offset {line_offset}: {e}")
+                    continue
+                except Exception as e:
+                    logger.error(f"Error parsing line at offset {line_offset}: {e}")
+                    continue
+        except Exception as e:
+            logger.error(f"Error reading messages file: {e}")
+
+        self._offset = scanner.end_offset
+        if added:
+            logger.debug(f"Message store: indexed {added} new messages (offset {self._offset})")
+
+    @staticmethod
+    def _insert_sorted(msgs: List[ChannelMessage], ts_list: List[float], msg: ChannelMessage):
+        ts = msg.timestamp
+        if not ts_list or ts >= ts_list[-1]:
+            msgs.append(msg)
+            ts_list.append(ts)
+        else:
+            pos = bisect_right(ts_list, ts)
+            msgs.insert(pos, msg)
+            ts_list.insert(pos, ts)
+
+    def _insert(self, msg: ChannelMessage):
+        channel_idx = msg.channel_idx
+        if is_deleted(self._tombstones, channel_idx, msg.timestamp):
+            return
+        if channel_idx not in self._channels:
+            self._channels[channel_idx] = []
+            self._channel_ts[channel_idx] = []
+
+        self._insert_sorted(self._channels[channel_idx], self._channel_ts[channel_idx], msg)
+        self._insert_sorted(self._all, self._all_ts, msg)
+
+    def _insert_dm(self, data: Dict, msg_type: str) -> bool:
+        record = _parse_priv_record(data) if msg_type == 'PRIV' else _parse_sent_record(data)
+        if not record:
+            return False
+
+        # Same rules as parser.read_dm_messages: the name mapping follows every
+        # PRIV line, duplicates (within the conversation's dedup window) are dropped
+        if not record.is_own and record.pubkey_prefix:
+            self._pubkey_to_name[record.pubkey_prefix] = record.sender
+
+        conversation_id = record.conversation_id
+        if self._dm_dedup.is_duplicate(conversation_id, record.dedup_key):
+            return False
+
+        thread = self._dm_threads.get(conversation_id)
+        if thread is None:
+            thread = self._dm_threads[conversation_id] = _DMThread()
+
+        self._dm_seq += 1
+        (thread.outgoing if record.is_own else thread.incoming).add(record, self._dm_seq)
+        return True
+
+    def get_messages(self, channel_idx: Optional[int] = None, days: Optional[int] = None,
+                     offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Return messages (oldest first), applying days, offset and limit the
+        same way parser.read_messages always has: days filter first, then
+        skip `offset` from the end, then keep the last `limit`.
+
+        Returned dicts are built fresh, so callers may annotate them freely.
+        """
+        with self._lock:
+            if channel_idx is None:
+                msgs, ts_list = self._all, self._all_ts
+            else:
+                msgs = self._channels.get(channel_idx, [])
+                ts_list = self._channel_ts.get(channel_idx, [])
+
+            start = 0
+            if days is not None and days > 0:
+                cutoff_timestamp = (datetime.now() - timedelta(days=days)).timestamp()
+                start = bisect_left(ts_list, cutoff_timestamp)
+
+            end = len(msgs)
+            if offset > 0:
+                end = max(start, end - offset)
+
+            if limit is not None and limit > 0:
+                start = max(start, end - limit)
+
+            return [m.to_dict() for m in msgs[start:end]]
+
+    def get_page(self, channel_idx: Optional[int] = None, limit: int = 100, days: Optional[int] = None,
+                 before: Optional[Tuple] = None, after: Optional[Tuple] = None) -> Dict:
+        """
+        Return one page of messages (oldest first) next to a cursor key.
+
+        Args:
+            channel_idx: Filter by channel (None = all channels)
+            limit: Page size
+            days: Only messages from the last N days (None = no limit)
+            before: (timestamp, file_offset) - return the newest messages older than this
+            after: (timestamp, file_offset) - return the oldest messages newer than this
+                   (without either, the newest page)
+
+        Returns:
+            {'messages': [...], 'first': key or None, 'last': key or None,
+             'has_more': whether more messages exist in the paging direction}
+        """
+        with self._lock:
+            if channel_idx is None:
+                msgs, ts_list = self._all, self._all_ts
+            else:
+                msgs = self._channels.get(channel_idx, [])
+                ts_list = self._channel_ts.get(channel_idx, [])
+
+            cutoff_timestamp = _cutoff_timestamp(days)
+            start = bisect_left(ts_list, cutoff_timestamp) if cutoff_timestamp is not None else 0
+            end = len(msgs)
+
+            if after is not None:
+                lo = max(start, bisect_right(msgs, tuple(after), lo=start, key=_record_key))
+                hi = min(end, lo + limit)
+                has_more = hi < end
+            else:
+                if before is not None:
+                    end = max(start, bisect_left(msgs, tuple(before), lo=start, key=_record_key))
+                hi = end
+                lo = max(start, end - limit)
+                has_more = lo > start
+
+            page = msgs[lo:hi]
+            return {
+                'messages': [m.to_dict() for m in page],
+                'first': page[0].key if page else None,
+                'last': page[-1].key if page else None,
+                'has_more': has_more
+            }
+
+    def channel_stats(self, last_seen: Dict[int, float], days: Optional[int] = None) -> Dict[int, Dict]:
+        """
+        Per-channel latest timestamp and unread count within the days window.
+
+        Args:
+            last_seen: {channel_idx: timestamp} - messages newer than this are unread
+            days: Only consider messages from the last N days (None = all)
+
+        Returns:
+            {channel_idx: {'latest_timestamp': ts, 'unread_count': n}}
+        """
+        cutoff_timestamp = _cutoff_timestamp(days)
+
+        stats = {}
+        with self._lock:
+            for channel_idx, ts_list in self._channel_ts.items():
+                start = bisect_left(ts_list, cutoff_timestamp) if cutoff_timestamp is not None else 0
+                if start >= len(ts_list):
+                    continue
+                unread_start = max(start, bisect_right(ts_list, last_seen.get(channel_idx, 0)))
+                stats[channel_idx] = {
+                    'latest_timestamp': ts_list[-1],
+                    'unread_count': len(ts_list) - unread_start
+                }
+        return stats
+
+    def _canonical_dm_groups(self) -> Dict[str, List[_DMThread]]:
+        """
+        Group raw DM threads the way parser.get_dm_conversations does:
+        name-based threads join the pubkey thread of a known contact name.
+        """
+        name_to_pubkey = {name: pk for pk, name in self._pubkey_to_name.items()}
+        groups: Dict[str, List[_DMThread]] = {}
+        for conversation_id, thread in self._dm_threads.items():
+            canonical_id = conversation_id
+            if conversation_id.startswith('name_'):
+                pk = name_to_pubkey.get(conversation_id[5:])
+                if pk:
+                    canonical_id = f"pk_{pk}"
+            groups.setdefault(canonical_id, []).append(thread)
+        return groups
+
+    def dm_conversations(self, days: Optional[int] = None) -> List[Dict]:
+        """
+        DM conversation list, same format and order as parser.get_dm_conversations.
+
+        Args:
+            days: Only consider messages from the last N days (None = all)
+
+        Returns:
+            List of conversation dicts sorted by most recent activity
+        """
+        cutoff_timestamp = _cutoff_timestamp(days)
+        result = []
+
+        with self._lock:
+            for conversation_id, threads in self._canonical_dm_groups().items():
+                message_count = 0
+                first = latest = last_incoming = last_with_pubkey = first_outgoing = None
+                for thread in threads:
+                    for run in (thread.incoming, thread.outgoing):
+                        start = run.start(cutoff_timestamp)
+                        message_count += len(run.ts) - start
+                        candidate = run.first(start)
+                        if candidate and (first is None or candidate[:2] < first[:2]):
+                            first = candidate
+                        candidate = run.first_with_latest_timestamp(start)
+                        if candidate and (latest is None or (candidate[0], -candidate[1]) > (latest[0], -latest[1])):
+                            latest = candidate
+                    candidate = thread.incoming.last(thread.incoming.start(cutoff_timestamp))
+                    if candidate and (last_incoming is None or candidate[:2] > last_incoming[:2]):
+                        last_incoming = candidate
+                    if candidate and candidate[2].pubkey_prefix and \
+                            (last_with_pubkey is None or candidate[:2] > last_with_pubkey[:2]):
+                        last_with_pubkey = candidate
+                    candidate = thread.outgoing.first(thread.outgoing.start(cutoff_timestamp))
+                    if candidate and (first_outgoing is None or candidate[:2] < first_outgoing[:2]):
+                        first_outgoing = candidate
+
+                if not message_count:
+                    continue
+
+                display_name = last_incoming[2].sender if last_incoming else first_outgoing[2].recipient
+                pubkey_prefix = last_with_pubkey[2].pubkey_prefix if last_with_pubkey else None
+
+                last_message_timestamp = 0
+                preview = ''
+                if latest[0] > 0:
+                    last_message_timestamp = latest[0]
+                    record = latest[2]
+                    preview = record.content[:50]
+                    if len(record.content) > 50:
+                        preview += '...'
+                    if record.is_own:
+                        preview = f"You: {preview}"
+
+                result.append(((-last_message_timestamp, first[0], first[1]), {
+                    'conversation_id': conversation_id,
+                    'display_name': display_name,
+                    'pubkey_prefix': pubkey_prefix,
+                    'last_message_timestamp': last_message_timestamp,
+                    'last_message_preview': preview,
+                    'unread_count': 0,
+                    'message_count': message_count
+                }))
+
+        result.sort(key=lambda item: item[0])
+        return [conv for _, conv in result]
+
+    def dm_unread_counts(self, last_seen: Dict[str, float], days: Optional[int] = None) -> List[Dict]:
+        """
+        Unread DM counts per conversation.
+
+        A pk_ conversation also counts outgoing messages addressed to the
+        contact's current name, as parser.read_dm_messages does when
+        filtering by conversation.
+
+        Args:
+            last_seen: {conversation_id: timestamp} - messages newer than this are unread
+            days: Only consider messages from the last N days (None = all)
+
+        Returns:
+            List of {'conversation_id', 'display_name', 'unread_count',
+            'latest_timestamp'} for conversations with unread messages
+        """
+        cutoff_timestamp = _cutoff_timestamp(days)
+        updates = []
+
+        with self._lock:
+            for conv in self.dm_conversations(days):
+                conversation_id = conv['conversation_id']
+                last_seen_ts = last_seen.get(conversation_id, 0)
+                if conv['last_message_timestamp'] <= last_seen_ts:
+                    continue
+
+                thread_ids = [conversation_id]
+                if conversation_id.startswith('pk_'):
+                    name = self._pubkey_to_name.get(conversation_id[3:])
+                    if name:
+                        thread_ids.append(f"name_{name}")
+
+                unread_count = 0
+                for thread_id in thread_ids:
+                    thread = self._dm_threads.get(thread_id)
+                    if thread is None:
+                        continue
+                    for run in (thread.incoming, thread.outgoing):
+                        unread_count += run.count_after(run.start(cutoff_timestamp), last_seen_ts)
+
+                if unread_count > 0:
+                    updates.append({
+                        'conversation_id': conversation_id,
+                        'display_name': conv['display_name'],
+                        'unread_count': unread_count,
+                        'latest_timestamp': conv['last_message_timestamp']
+                    })
+
+        return updates
+
+    def count(self) -> int:
+        """Total number of channel messages."""
+        with self._lock:
+            return len(self._all)
+
+    def latest(self) -> Optional[Dict]:
+        """Most recent channel message (as a dict) or None."""
+        with self._lock:
+            return self._all[-1].to_dict() if self._all else None
+
+    def status(self) -> Dict:
+        """Channel message count, latest timestamp and consumed file offset."""
+        with self._lock:
+            return {
+                'message_count': len(self._all),
+                'latest_message_timestamp': self._all[-1].timestamp if self._all else None,
+                'file_offset': self._offset
+            }
+
+    @property
+    def offset(self) -> int:
+        """Byte offset of the .msgs file consumed so far."""
+        return self._offset
+
+
+# Global message store instance
+message_store = MessageStore()
@@ -0,0 +1,278 @@
+"""
+Channel deletion tombstones for the .msgs file ({device_name}.msgs.tombstones)
+
+Deleting a channel records a tombstone - channel index plus cutoff timestamp -
+instead of rewriting the .msgs file while meshcli may be appending to it.
+Channel messages of that channel at or before the cutoff are hidden by the
+readers (message store, SQLite index, search index). Messages received after
+the cutoff, e.g. on a new channel created at the same index, stay visible.
+
+A background worker compacts the file during idle periods: it writes a
+filtered copy next to the original, copies whatever was appended in the
+meantime, fsyncs and atomically replaces the original, and only then drops
+the tombstones it applied. A crash at any point leaves either the old file
+with its tombstones or the compacted file, never a half-written one.
+
+Replacing the file (new inode) is safe because meshcli does not keep the
+.msgs file open: `log_message()` in meshcore-cli (1.4.2 as pinned by the
+bridge image, and still in 1.6.x) opens the path in append mode for every
+line it writes. A line written through a handle opened just before the
+replace lands in the old inode; compaction copies such lines over after the
+replace.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Optional
+
+from app.config import runtime_config
+from app.meshcore import decoder
+
+logger = logging.getLogger(__name__)
+
+# Compact only when the .msgs file has not been written for this long
+COMPACTION_IDLE_SECONDS = 120
+
+# How often the background worker checks for pending tombstones
+COMPACTION_CHECK_INTERVAL = 60
+
+_compaction_lock = Lock()
+_worker_started = False
+
+
+def _get_tombstones_path(msgs_file: Path) -> Path:
+    return msgs_file.with_name(msgs_file.name + '.tombstones')
+
+
+class TombstoneLog:
+    """Persisted {channel_idx: cutoff_timestamp} map of deleted channel messages."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._msgs_file: Optional[Path] = None
+        self._entries: Dict[int, float] = {}
+        self._version = 0
+
+    def _sync_path(self):
+        """Load the tombstones of the current device's .msgs file (after a device name change)."""
+        msgs_file = runtime_config.get_msgs_file_path()
+        if msgs_file == self._msgs_file:
+            return
+
+        self._msgs_file = msgs_file
+        self._entries = {}
+        self._version += 1
+
+        path = _get_tombstones_path(msgs_file)
+        if not path.exists():
+            return
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._entries = {int(t['channel_idx']): float(t['cutoff']) for t in data.get('tombstones', [])}
+            if self._entries:
+                logger.info(f"Loaded {len(self._entries)} channel tombstones from {path}")
+        except Exception as e:
+            logger.error(f"Failed to load tombstones from {path}: {e}")
+
+    def _save(self):
+        path = _get_tombstones_path(self._msgs_file)
+        try:
+            if not self._entries:
+                path.unlink(missing_ok=True)
+                return
+            temp_file = path.with_name(path.name + '.tmp')
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({'tombstones': [{'channel_idx': idx, 'cutoff': cutoff}
+                                          for idx, cutoff in sorted(self._entries.items())]}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            temp_file.replace(path)
+        except Exception as e:
+            logger.error(f"Failed to save tombstones to {path}: {e}")
+            raise
+
+    def add(self, channel_idx: int, cutoff: Optional[float] = None):
+        """
+        Hide all messages of a channel up to `cutoff` (default: now).
+
+        Raises:
+            OSError: if the tombstone could not be persisted
+        """
+        cutoff = time.time() if cutoff is None else cutoff
+        with self._lock:
+            self._sync_path()
+            if self._entries.get(channel_idx, float('-inf')) >= cutoff:
+                return
+            self._entries[channel_idx] = cutoff
+            self._save()
+            self._version += 1
+        logger.info(f"Tombstoned channel {channel_idx} messages up to {cutoff}")
+
+    def get(self) -> Dict[int, float]:
+        """Current tombstones as {channel_idx: cutoff_timestamp}."""
+        with self._lock:
+            self._sync_path()
+            return dict(self._entries)
+
+    @property
+    def version(self) -> int:
+        """Changes whenever the set of tombstones changes."""
+        with self._lock:
+            self._sync_path()
+            return self._version
+
+    def discard(self, applied: Dict[int, float]):
+        """Drop tombstones that compaction has applied (unless they were raised since)."""
+        with self._lock:
+            self._sync_path()
+            changed = False
+            for channel_idx, cutoff in applied.items():
+                if self._entries.get(channel_idx) == cutoff:
+                    del self._entries[channel_idx]
+                    changed = True
+            if changed:
+                self._save()
+                self._version += 1
+
+
+def is_deleted(tombstones: Dict[int, float], channel_idx: int, timestamp: float) -> bool:
+    """Is a channel message hidden by one of the tombstones?"""
+    cutoff = tombstones.get(channel_idx)
+    return cutoff is not None and timestamp <= cutoff
+
+
+def _is_deleted_line(raw: bytes, tombstones: Dict[int, float]) -> bool:
+    if not decoder.has_type(raw, decoder.CHANNEL_TOKENS):
+        return False
+    try:
+        data = decoder.loads(raw)
+    except (json.JSONDecodeError, ValueError):
+        return False
+    if not isinstance(data, dict) or data.get('type') not in decoder.CHANNEL_MESSAGE_TYPES:
+        return False
+    return is_deleted(tombstones, data.get('channel_idx', 0), data.get('timestamp', 0))
+
+
+def _fsync_dir(path: Path):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def compact_msgs_file(force: bool = False) -> bool:
+    """
+    Rewrite the .msgs file without the tombstoned messages.
+
+    The file gets a new inode, which every incremental reader treats as a
+    new file: the message store, the .msgs.idx offset index, the
+    .msgs.dedup DM index, the SQLite mirror, the activity rollups and the
+    live part of the search index re-read it in full on their next refresh
+    (one sequential pass each, a few seconds for ~1M lines). Compaction
+    runs only while tombstones are pending, i.e. after a channel deletion,
+    and only once the file has been idle for COMPACTION_IDLE_SECONDS.
+
+    Args:
+        force: Compact even if the file was written to recently
+
+    Returns:
+        True if the file was compacted
+    """
+    with _compaction_lock:
+        tombstones = tombstone_log.get()
+        if not tombstones:
+            return False
+
+        msgs_file = runtime_config.get_msgs_file_path()
+        try:
+            st = os.stat(msgs_file)
+        except FileNotFoundError:
+            tombstone_log.discard(tombstones)
+            return False
+
+        if not force and time.time() - st.st_mtime < COMPACTION_IDLE_SECONDS:
+            return False
+
+        temp_file = msgs_file.with_name(msgs_file.name + '.compact.tmp')
+        removed = 0
+
+        try:
+            with open(msgs_file, 'rb') as src, open(temp_file, 'wb') as dst:
+                for raw in src:
+                    if raw.endswith(b'\n') and _is_deleted_line(raw, tombstones):
+                        removed += 1
+                        continue
+                    dst.write(raw)
+
+                # Lines appended while filtering are newer than every cutoff - copy as-is
+                while True:
+                    tail = src.read()
+                    if not tail:
+                        break
+                    dst.write(tail)
+
+                dst.flush()
+                os.fsync(dst.fileno())
+                os.replace(temp_file, msgs_file)
+                _fsync_dir(msgs_file.parent)
+
+                # Bytes that reached the old file between the last read and the
+                # replace; writers opening the path from now on see the new file
+                tail = src.read()
+                if tail:
+                    with open(msgs_file, 'ab') as f:
+                        f.write(tail)
+        except Exception as e:
+            logger.error(f"Compaction of {msgs_file} failed, keeping tombstones: {e}")
+            try:
+                temp_file.unlink(missing_ok=True)
+            except OSError:
+                pass
+            return False
+
+        tombstone_log.discard(tombstones)
+
+        # The file was replaced - drop incremental state (the SQLite and
+        # search indexes notice the new inode on their next refresh)
+        from app.meshcore.store import message_store
+        from app.meshcore.msgs_index import msgs_offset_index
+        message_store.invalidate()
+        msgs_offset_index.invalidate()
+
+        logger.info(f"Compacted {msgs_file}: removed {removed} tombstoned messages")
+        return True
+
+
+def _compaction_worker():
+    while True:
+        time.sleep(COMPACTION_CHECK_INTERVAL)
+        try:
+            compact_msgs_file()
+        except Exception as e:
+            logger.error(f"Compaction worker error: {e}")
+
+
+def start_compaction_worker():
+    """Start the background thread compacting the .msgs file during idle periods."""
+    global _worker_started
+    if _worker_started:
+        return
+    _worker_started = True
+    threading.Thread(target=_compaction_worker, daemon=True, name='msgs-compaction').start()
+    logger.info("Message compaction worker started")
+
+
+# Global tombstone log instance
+tombstone_log = TombstoneLog()
@@ -0,0 +1,153 @@
+"""
+Capped process pool for CPU-heavy scans
+
+Rebuilding rollups from a large .msgs file or reading a directory full of
+archives is pure-Python parsing that holds the GIL for seconds at a time,
+stalling Flask request threads. `scan_pool.map` runs such jobs in worker
+processes and yields their partial results in submission order for the
+caller to merge.
+
+The pool never has more than MC_SCAN_WORKERS processes, nor more than the
+CPU count minus one (but at least one), so the web process keeps a core to
+itself on a Raspberry Pi. With MC_SCAN_WORKERS=0, or if worker processes
+cannot be started, jobs run in the calling thread instead.
+
+Workers are started with 'spawn' - forking a process that runs threads is
+not safe - so job functions must be importable module-level functions and
+their arguments and results picklable.
+"""
+
+import logging
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from app.config import config
+
+logger = logging.getLogger(__name__)
+
+# Ranges of a large file handed to one worker job
+SCAN_CHUNK_SIZE = 16 * 1024 * 1024
+
+# Jobs in flight per worker - bounds the partial results held in memory
+JOBS_PER_WORKER = 2
+
+
+def split_file(path: Path, start: int, end: int,
+               chunk_size: int = SCAN_CHUNK_SIZE) -> List[Tuple[int, int]]:
+    """
+    Split [start, end) of a JSON Lines file into ranges of about chunk_size
+    bytes that start and end on line boundaries (the last range ends at `end`).
+
+    Args:
+        path: File to split
+        start: Offset of a line start
+        end: End of the region (e.g. the file size)
+        chunk_size: Target size of each range
+
+    Returns:
+        List of (start, end) ranges in file order
+    """
+    ranges = []
+    with open(path, 'rb') as f:
+        pos = start
+        while end - pos > chunk_size:
+            f.seek(pos + chunk_size - 1)
+            f.readline()  # Move to the start of the next line
+            boundary = f.tell()
+            if boundary >= end:
+                break
+            ranges.append((pos, boundary))
+            pos = boundary
+    ranges.append((pos, end))
+    return ranges
+
+
+class ScanPool:
+    """Lazily started process pool shared by all scan jobs."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def workers(self) -> int:
+        """Number of worker processes used (0 = jobs run in the calling thread)."""
+        if config.MC_SCAN_WORKERS <= 0:
+            return 0
+        return min(config.MC_SCAN_WORKERS, max(1, (os.cpu_count() or 1) - 1))
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        workers = self.workers
+        if workers == 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                try:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+                    logger.info(f"Scan worker pool started ({workers} processes)")
+                except Exception as e:
+                    logger.error(f"Cannot start scan worker pool, scanning in-process: {e}")
+                    return None
+            return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor, error: Exception):
+        logger.error(f"Scan worker pool failed, scanning in-process: {error}")
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def map(self, fn: Callable, jobs: Iterable[Tuple]) -> Iterator:
+        """
+        Run fn(*job) for each job and yield the results in job order.
+
+        Exceptions raised by a job are re-raised here. If the pool breaks
+        (e.g. a worker is killed), the remaining jobs run in-process.
+        """
+        executor = self._get_executor()
+        if executor is None:
+            for job in jobs:
+                yield fn(*job)
+            return
+
+        pending = deque()
+        jobs = iter(jobs)
+        max_pending = self.workers * JOBS_PER_WORKER
+        try:
+            for job in jobs:
+                pending.append((job, executor.submit(fn, *job)))
+                while len(pending) >= max_pending or (pending and pending[0][1].done()):
+                    result = pending[0][1].result()
+                    pending.popleft()
+                    yield result
+            while pending:
+                result = pending[0][1].result()
+                pending.popleft()
+                yield result
+        except BrokenProcessPool as e:
+            self._discard(executor, e)
+            for job, _ in pending:
+                yield fn(*job)
+            pending.clear()
+            for job in jobs:
+                yield fn(*job)
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Global scan worker pool instance
+scan_pool = ScanPool()
@@ -6,20 +6,24 @@ import hashlib
 import hmac as hmac_mod
 import logging
 import json
+import os
 import re
 import base64
 import struct
 import time
 import requests
 from Crypto.Cipher import AES
-from datetime import datetime
+from datetime import datetime, timedelta
+from functools import lru_cache
 from io import BytesIO
 from pathlib import Path
-from flask import Blueprint, jsonify, request, send_file
+from typing import Optional
+from flask import Blueprint, Response, jsonify, request, send_file, stream_with_context
 from app.meshcore import cli, parser
+from app.meshcore.echoes import echo_snapshot, find_echo_count
 from app.config import config, runtime_config
 from app.archiver import manager as archive_manager
-from app.contacts_cache import get_all_names, get_all_contacts
+from app.contacts_cache import get_all_names, get_all_contacts, get_adverts_version
 
 logger = logging.getLogger(__name__)
 
@@ -37,6 +41,27 @@ _contacts_detailed_cache = None
 _contacts_detailed_cache_timestamp = 0
 CONTACTS_DETAILED_CACHE_TTL = 60  # seconds
 
+# Cache for pending contacts - reused while no advert has been logged since
+# (new pending contacts only come from adverts), refetched at least every 60s
+_pending_contacts_cache = None
+_pending_contacts_cache_timestamp = 0
+_pending_contacts_adverts_version = None
+PENDING_CONTACTS_CACHE_TTL = 60  # seconds
+
+# Generations of the cached bridge data, bumped when a fetch returns
+# different data (part of the polling endpoints' ETags)
+_channels_cache_generation = 0
+_contacts_detailed_cache_generation = 0
+_pending_contacts_cache_generation = 0
+
+# ETags of time-windowed results (e.g. unread counts over the last 7 days)
+# also change at least this often, as messages age out of the window
+ETAG_TIME_BUCKET = 3600  # seconds
+
+
+# Memoized GRP_TXT payloads (a received message needs up to 4, one per attempt)
+PKT_PAYLOAD_CACHE_SIZE = 8192
+CHANNEL_CRYPTO_CACHE_SIZE = 64
 
 ANALYZER_BASE_URL = 'https://analyzer.letsmesh.net/packets?packet_hash='
 GRP_TXT_TYPE_BYTE = 0x05
@@ -52,27 +77,44 @@ def compute_analyzer_url(pkt_payload):
         return None
 
 
+@lru_cache(maxsize=CHANNEL_CRYPTO_CACHE_SIZE)
+def _channel_crypto(channel_secret_hex):
+    """
+    Per-channel crypto state, derived once per secret.
+
+    Returns:
+        Tuple of (AES-128-ECB cipher, keyed HMAC-SHA256 to copy, channel hash byte)
+    """
+    secret = bytes.fromhex(channel_secret_hex)
+    cipher = AES.new(secret[:16], AES.MODE_ECB)
+    mac = hmac_mod.new(secret, digestmod=hashlib.sha256)
+    chan_hash = hashlib.sha256(secret).digest()[0:1]
+    return cipher, mac, chan_hash
+
+
+@lru_cache(maxsize=PKT_PAYLOAD_CACHE_SIZE)
 def compute_pkt_payload(channel_secret_hex, sender_timestamp, txt_type, text, attempt=0):
     """Compute pkt_payload from message data + channel secret.
 
     Reconstructs the encrypted GRP_TXT payload:
       channel_hash(1) + HMAC-MAC(2) + AES-128-ECB(plaintext)
     where plaintext = timestamp(4 LE) + flags(1) + text(UTF-8) + null + zero-pad.
+
+    Memoized: a message always produces the same payload, so repeated page
+    loads do no crypto.
     """
-    secret = bytes.fromhex(channel_secret_hex)
+    cipher, mac, chan_hash = _channel_crypto(channel_secret_hex)
     flags = ((txt_type & 0x3F) << 2) | (attempt & 0x03)
     plaintext = struct.pack('<I', sender_timestamp) + bytes([flags]) + text.encode('utf-8') + b'\x00'
     # Pad to AES block boundary (16 bytes)
     pad_len = (16 - len(plaintext) % 16) % 16
     plaintext += b'\x00' * pad_len
-    # AES-128-ECB encrypt
-    cipher = AES.new(secret[:16], AES.MODE_ECB)
+    # AES-128-ECB encrypt (ECB keeps no state between calls)
     ciphertext = cipher.encrypt(plaintext)
     # HMAC-SHA256 truncated to 2 bytes
-    mac = hmac_mod.new(secret, ciphertext, hashlib.sha256).digest()[:2]
-    # Channel hash: first byte of SHA256(secret)
-    chan_hash = hashlib.sha256(secret).digest()[0:1]
-    return (chan_hash + mac + ciphertext).hex()
+    mac = mac.copy()
+    mac.update(ciphertext)
+    return (chan_hash + mac.digest()[:2] + ciphertext).hex()
 
 
 def get_channels_cached(force_refresh=False):
@@ -85,7 +127,7 @@ def get_channels_cached(force_refresh=False):
     Returns:
         Tuple of (success, channels_list)
     """
-    global _channels_cache, _channels_cache_timestamp
+    global _channels_cache, _channels_cache_timestamp, _channels_cache_generation
 
     current_time = time.time()
 
@@ -101,6 +143,8 @@ def get_channels_cached(force_refresh=False):
     success, channels = cli.get_channels()
 
     if success:
+        if channels != _channels_cache:
+            _channels_cache_generation += 1
         _channels_cache = channels
         _channels_cache_timestamp = current_time
         logger.debug(f"Channels cached ({len(channels)} channels)")
@@ -127,7 +171,7 @@ def get_contacts_detailed_cached(force_refresh=False):
     Returns:
         Tuple of (success, contacts_dict, error_message)
     """
-    global _contacts_detailed_cache, _contacts_detailed_cache_timestamp
+    global _contacts_detailed_cache, _contacts_detailed_cache_timestamp, _contacts_detailed_cache_generation
 
     current_time = time.time()
 
@@ -143,6 +187,8 @@ def get_contacts_detailed_cached(force_refresh=False):
     success, contacts, error = cli.get_contacts_with_last_seen()
 
     if success:
+        if contacts != _contacts_detailed_cache:
+            _contacts_detailed_cache_generation += 1
         _contacts_detailed_cache = contacts
         _contacts_detailed_cache_timestamp = current_time
         logger.debug(f"Contacts cached ({len(contacts)} contacts)")
@@ -151,13 +197,95 @@ def get_contacts_detailed_cached(force_refresh=False):
 
 
 def invalidate_contacts_cache():
-    """Invalidate contacts cache (call after contact changes)"""
+    """Invalidate contacts caches, including pending contacts (call after contact changes)"""
     global _contacts_detailed_cache, _contacts_detailed_cache_timestamp
+    global _pending_contacts_cache, _pending_contacts_cache_timestamp
     _contacts_detailed_cache = None
     _contacts_detailed_cache_timestamp = 0
+    _pending_contacts_cache = None
+    _pending_contacts_cache_timestamp = 0
     logger.debug("Contacts cache invalidated")
 
 
+def get_pending_contacts_cached():
+    """
+    Get pending contacts, reusing the last result while no advert has been
+    logged since it was fetched (and it is younger than the TTL).
+
+    Returns:
+        Tuple of (success, pending_list, error_message)
+    """
+    global _pending_contacts_cache, _pending_contacts_cache_timestamp
+    global _pending_contacts_adverts_version, _pending_contacts_cache_generation
+
+    current_time = time.time()
+    adverts_version = get_adverts_version()
+
+    if (_pending_contacts_cache is not None and
+            adverts_version == _pending_contacts_adverts_version and
+            (current_time - _pending_contacts_cache_timestamp) < PENDING_CONTACTS_CACHE_TTL):
+        return True, _pending_contacts_cache, None
+
+    success, pending, error = cli.get_pending_contacts()
+
+    if success:
+        if pending != _pending_contacts_cache:
+            _pending_contacts_cache_generation += 1
+        _pending_contacts_cache = pending
+        _pending_contacts_cache_timestamp = current_time
+        _pending_contacts_adverts_version = adverts_version
+
+    return success, pending, error
+
+
+# =============================================================================
+# ETags for polling endpoints
+# =============================================================================
+
+def _make_etag(*parts) -> str:
+    """ETag value (unquoted) for the versions a response is computed from."""
+    return hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=12).hexdigest()
+
+
+def _msgs_version() -> tuple:
+    """Version of the live .msgs file: (path, inode, size)."""
+    msgs_file = runtime_config.get_msgs_file_path()
+    try:
+        st = os.stat(msgs_file)
+        return str(msgs_file), st.st_ino, st.st_size
+    except FileNotFoundError:
+        return str(msgs_file), None, 0
+
+
+def _time_bucket() -> int:
+    return int(time.time() // ETAG_TIME_BUCKET)
+
+
+def _not_modified(etag: str) -> Optional[Response]:
+    """
+    Answer a conditional request whose If-None-Match matches the ETag.
+
+    Returns:
+        304 response, or None if the client does not have this version
+    """
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    response = Response(status=304)
+    return _with_etag(response, etag)
+
+
+def _with_etag(response: Response, etag: str) -> Response:
+    """
+    Tag a response; clients must revalidate before reusing it.
+
+    The tag is weak: it identifies the data, not the bytes, which differ
+    between compressed and uncompressed responses.
+    """
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
 # =============================================================================
 # Protected Contacts Management
 # =============================================================================
@@ -300,6 +428,76 @@ def save_cleanup_settings(cleanup_settings: dict) -> bool:
         return False
 
 
+def _merge_echo_data(messages: list):
+    """
+    Merge echo data from the local echo snapshot into live channel messages
+    (in place).
+
+    Own messages get echo_count/echo_paths ("Heard X repeats"), received
+    messages get the paths they arrived by. Failures are non-critical.
+    """
+    try:
+        echo_data = echo_snapshot.get()
+        if echo_data is not None:
+            echo_index, incoming_by_payload = echo_data
+
+            # Merge sent echo counts + paths into own messages
+            for msg in messages:
+                if msg.get('is_own'):
+                    msg['echo_count'] = 0
+                    msg['echo_paths'] = []
+                    ec = find_echo_count(echo_index, msg.get('channel_idx'), msg['timestamp'])
+                    if ec is not None:
+                        msg['echo_count'] = ec['count']
+                        msg['echo_paths'] = ec.get('paths', [])
+                        pkt = ec.get('pkt_payload')
+                        if pkt:
+                            msg['analyzer_url'] = compute_analyzer_url(pkt)
+
+            # Merge incoming paths into received messages
+            # Deterministic matching via computed pkt_payload
+
+            # Get channel secrets for payload computation
+            _, channels = get_channels_cached()
+            channel_secrets = {ch['index']: ch['key'] for ch in (channels or [])}
+
+            for msg in messages:
+                if not msg.get('is_own') and msg.get('sender_timestamp') and msg.get('channel_idx') in channel_secrets:
+                    secret = channel_secrets[msg['channel_idx']]
+                    # Always compute attempt=0 payload for analyzer URL
+                    base_payload = compute_pkt_payload(
+                        secret, msg['sender_timestamp'],
+                        msg.get('txt_type', 0), msg.get('raw_text', ''), attempt=0
+                    )
+                    msg['analyzer_url'] = compute_analyzer_url(base_payload)
+                    # Try all 4 attempt values for path matching
+                    matched = False
+                    for attempt in range(4):
+                        try:
+                            computed_payload = base_payload if attempt == 0 else compute_pkt_payload(
+                                secret, msg['sender_timestamp'],
+                                msg.get('txt_type', 0), msg.get('raw_text', ''), attempt
+                            )
+                        except Exception:
+                            break
+                        if computed_payload in incoming_by_payload:
+                            entry = incoming_by_payload[computed_payload]
+                            msg['paths'] = entry.get('paths', [])
+                            matched = True
+                            break
+                    if not matched and incoming_by_payload:
+                        raw = msg.get('raw_text', '')
+                        logger.debug(
+                            f"Echo mismatch: ts={msg.get('sender_timestamp')} "
+                            f"ch={msg.get('channel_idx')} "
+                            f"text_bytes={len(raw.encode('utf-8'))} "
+                            f"base_payload={base_payload[:16]}... "
+                            f"text_preview={raw[:40]!r}"
+                        )
+    except Exception as e:
+        logger.debug(f"Echo data fetch failed (non-critical): {e}")
+
+
 @api_bp.route('/messages', methods=['GET'])
 def get_messages():
     """
@@ -311,9 +509,14 @@ def get_messages():
         archive_date (str): View archive for specific date (YYYY-MM-DD format)
         days (int): Show only messages from last N days (live view only)
         channel_idx (int): Filter by channel index (optional)
+        before (str): Cursor - page of messages older than it (infinite scroll)
+        after (str): Cursor - page of messages newer than it
 
     Returns:
-        JSON with messages list
+        JSON with messages list. Paged requests (limit without offset, or a
+        cursor) also return has_more and cursors {before, after} for the
+        next page in either direction. Live requests return delta_cursor
+        for /api/messages/delta.
     """
     try:
         limit = request.args.get('limit', type=int)
@@ -321,6 +524,14 @@ def get_messages():
         archive_date = request.args.get('archive_date', type=str)
         days = request.args.get('days', type=int)
         channel_idx = request.args.get('channel_idx', type=int)
+        before = request.args.get('before', type=str)
+        after = request.args.get('after', type=str)
+
+        if before and after:
+            return jsonify({
+                'success': False,
+                'error': 'Use either before or after, not both'
+            }), 400
 
         # Validate archive_date format if provided
         if archive_date:
@@ -332,93 +543,56 @@ def get_messages():
                     'error': f'Invalid date format: {archive_date}. Expected YYYY-MM-DD'
                 }), 400
 
-        # Read messages (from archive or live .msgs file)
-        messages = parser.read_messages(
-            limit=limit,
-            offset=offset,
-            archive_date=archive_date,
-            days=days,
-            channel_idx=channel_idx
-        )
+        # Taken before reading, so nothing appended meanwhile is missed by the
+        # next delta sync (clients drop the duplicates)
+        delta_cursor = None if archive_date else parser.get_delta_cursor()
 
-        # Fetch echo data from bridge (for "Heard X repeats" + path display)
-        if not archive_date:  # Only for live messages, not archives
+        # Read messages (from archive or live .msgs file). Cursor pages seek
+        # straight to the cursor instead of slicing the full message list.
+        page = None
+        if before or after or (limit is not None and limit > 0 and offset <= 0):
             try:
-                bridge_url = config.MC_BRIDGE_URL.replace('/cli', '/echo_counts')
-                response = requests.get(bridge_url, timeout=2)
-                if response.ok:
-                    resp_data = response.json()
-                    echo_counts = resp_data.get('echo_counts', [])
-                    incoming_paths = resp_data.get('incoming_paths', [])
-                    if incoming_paths:
-                        logger.debug(f"Echo data: {len(echo_counts)} sent, {len(incoming_paths)} incoming paths from bridge")
-
-                    # Merge sent echo counts + paths into own messages
-                    for msg in messages:
-                        if msg.get('is_own'):
-                            msg['echo_count'] = 0
-                            msg['echo_paths'] = []
-                            for ec in echo_counts:
-                                if (msg.get('channel_idx') == ec.get('channel_idx') and
-                                        abs(msg['timestamp'] - ec['timestamp']) < 5):
-                                    msg['echo_count'] = ec['count']
-                                    msg['echo_paths'] = ec.get('paths', [])
-                                    pkt = ec.get('pkt_payload')
-                                    if pkt:
-                                        msg['analyzer_url'] = compute_analyzer_url(pkt)
-                                    break
-
-                    # Merge incoming paths into received messages
-                    # Deterministic matching via computed pkt_payload
-                    incoming_by_payload = {ip['pkt_payload']: ip for ip in incoming_paths}
-
-                    # Get channel secrets for payload computation
-                    _, channels = get_channels_cached()
-                    channel_secrets = {ch['index']: ch['key'] for ch in (channels or [])}
+                page = parser.read_messages_page(
+                    limit=limit if limit is not None and limit > 0 else 100,
+                    channel_idx=channel_idx,
+                    archive_date=archive_date,
+                    days=days,
+                    before=before,
+                    after=after
+                )
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
+            messages = page['messages']
+        else:
+            messages = parser.read_messages(
+                limit=limit,
+                offset=offset,
+                archive_date=archive_date,
+                days=days,
+                channel_idx=channel_idx
+            )
 
-                    for msg in messages:
-                        if not msg.get('is_own') and msg.get('sender_timestamp') and msg.get('channel_idx') in channel_secrets:
-                            secret = channel_secrets[msg['channel_idx']]
-                            # Always compute attempt=0 payload for analyzer URL
-                            base_payload = compute_pkt_payload(
-                                secret, msg['sender_timestamp'],
-                                msg.get('txt_type', 0), msg.get('raw_text', ''), attempt=0
-                            )
-                            msg['analyzer_url'] = compute_analyzer_url(base_payload)
-                            # Try all 4 attempt values for path matching
-                            matched = False
-                            for attempt in range(4):
-                                try:
-                                    computed_payload = compute_pkt_payload(
-                                        secret, msg['sender_timestamp'],
-                                        msg.get('txt_type', 0), msg.get('raw_text', ''), attempt
-                                    )
-                                except Exception:
-                                    break
-                                if computed_payload in incoming_by_payload:
-                                    entry = incoming_by_payload[computed_payload]
-                                    msg['paths'] = entry.get('paths', [])
-                                    matched = True
-                                    break
-                            if not matched and incoming_by_payload:
-                                raw = msg.get('raw_text', '')
-                                logger.debug(
-                                    f"Echo mismatch: ts={msg.get('sender_timestamp')} "
-                                    f"ch={msg.get('channel_idx')} "
-                                    f"text_bytes={len(raw.encode('utf-8'))} "
-                                    f"base_payload={base_payload[:16]}... "
-                                    f"text_preview={raw[:40]!r}"
-                                )
-            except Exception as e:
-                logger.debug(f"Echo data fetch failed (non-critical): {e}")
+        # Fetch echo data from bridge (for "Heard X repeats" + path display)
+        if not archive_date:  # Only for live messages, not archives
+            _merge_echo_data(messages)
 
-        return jsonify({
+        response = {
             'success': True,
             'count': len(messages),
             'messages': messages,
             'archive_date': archive_date if archive_date else None,
             'channel_idx': channel_idx
-        }), 200
+        }
+        if page is not None:
+            response['has_more'] = page['has_more']
+            response['cursors'] = page['cursors']
+        if delta_cursor is not None:
+            response['delta_cursor'] = delta_cursor
+
+        return jsonify(response), 200
 
     except Exception as e:
         logger.error(f"Error fetching messages: {e}")
@@ -508,28 +682,28 @@ def get_status():
     """
     Get device connection status and basic info.
 
+    Served from cached counters and the bridge health snapshot; does not
+    send any command to the device.
+
     Returns:
         JSON with status information
     """
     try:
-        # Check if device is accessible
-        connected = cli.check_connection()
-
-        # Get message count
-        message_count = parser.count_messages()
-
-        # Get latest message timestamp
-        latest = parser.get_latest_message()
-        latest_timestamp = latest['timestamp'] if latest else None
+        # Connection state comes from the background bridge health snapshot
+        # and counts from the storage engine, so polling never reaches the device
+        bridge = cli.get_bridge_health()
+        counters = parser.get_message_status()
 
         return jsonify({
             'success': True,
-            'connected': connected,
+            'connected': bridge['status'] == 'healthy',
+            'bridge_checked_at': bridge['checked_at'],
             'device_name': runtime_config.get_device_name(),
             'device_name_source': runtime_config.get_device_name_source(),
             'serial_port': config.MC_SERIAL_PORT,
-            'message_count': message_count,
-            'latest_message_timestamp': latest_timestamp
+            'message_count': counters['message_count'],
+            'latest_message_timestamp': counters['latest_message_timestamp'],
+            'file_offset': counters['file_offset']
         }), 200
 
     except Exception as e:
@@ -540,6 +714,119 @@ def get_status():
         }), 500
 
 
+@api_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Get internal performance counters.
+
+    Returns:
+        JSON with parser_cache stats (hits, misses, hit_rate, evictions,
+        entries, bytes, max_bytes), pkt_payload_cache stats (hits,
+        misses, entries, max_entries), the echo_snapshot state (epoch,
+        version, synced_at, sent, incoming) and compression stats
+        (encodings, min_size, bytes_saved and per-endpoint responses,
+        compressed, bytes_original, bytes_sent, bytes_saved)
+    """
+    try:
+        from app.compression import compression_stats
+        from app.meshcore.result_cache import result_cache
+
+        payload_cache = compute_pkt_payload.cache_info()
+        return jsonify({
+            'success': True,
+            'parser_cache': result_cache.stats(),
+            'pkt_payload_cache': {
+                'hits': payload_cache.hits,
+                'misses': payload_cache.misses,
+                'entries': payload_cache.currsize,
+                'max_entries': payload_cache.maxsize
+            },
+            'echo_snapshot': echo_snapshot.status(),
+            'compression': compression_stats.stats()
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error getting metrics: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@api_bp.route('/stats', methods=['GET'])
+def get_stats():
+    """
+    Get channel activity statistics from the incrementally maintained rollups.
+
+    Query parameters:
+        from (float): Range start, unix timestamp (or from_date, YYYY-MM-DD)
+        to (float): Range end, unix timestamp (or to_date, YYYY-MM-DD, inclusive)
+                    (default: the last 7 days)
+        channel_idx (int): Only this channel (optional)
+        bucket (str): Time series resolution: day (default) or hour
+        top (int): Number of top senders (default: 10, max: 100)
+
+    Returns:
+        JSON with total, channels, series, top_senders, snr_histogram
+        and path_len_histogram
+    """
+    try:
+        from app.meshcore.rollups import channel_rollups, DEFAULT_TOP_SENDERS
+
+        channel_idx = request.args.get('channel_idx', type=int)
+        bucket = request.args.get('bucket', default='day', type=str)
+        top = request.args.get('top', default=DEFAULT_TOP_SENDERS, type=int)
+
+        if bucket not in ('day', 'hour'):
+            return jsonify({
+                'success': False,
+                'error': 'bucket must be day or hour'
+            }), 400
+
+        try:
+            now = time.time()
+            from_ts = request.args.get('from', type=float)
+            to_ts = request.args.get('to', type=float)
+            from_date = request.args.get('from_date', type=str)
+            to_date = request.args.get('to_date', type=str)
+            if from_ts is None and from_date:
+                from_ts = datetime.strptime(from_date, '%Y-%m-%d').timestamp()
+            if to_ts is None and to_date:
+                to_ts = (datetime.strptime(to_date, '%Y-%m-%d') + timedelta(days=1)).timestamp()
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Dates must be in YYYY-MM-DD format'
+            }), 400
+
+        to_ts = now if to_ts is None else to_ts
+        from_ts = to_ts - 7 * 86400 if from_ts is None else from_ts
+
+        channel_rollups.refresh()
+        stats = channel_rollups.stats(
+            from_ts, to_ts,
+            channel_idx=channel_idx,
+            bucket=bucket,
+            top=max(1, min(top, 100))
+        )
+
+        return jsonify({
+            'success': True,
+            'from': from_ts,
+            'to': to_ts,
+            'channel_idx': channel_idx,
+            'bucket': bucket,
+            **stats
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error getting stats: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @api_bp.route('/contacts', methods=['GET'])
 def get_contacts():
     """
@@ -1083,6 +1370,221 @@ def get_archives():
         }), 500
 
 
+@api_bp.route('/archives/messages', methods=['GET'])
+def get_archive_range_messages():
+    """
+    Get channel messages across a range of archive days (newest page first).
+
+    Query parameters:
+        from_date (str): First day, YYYY-MM-DD (required)
+        to_date (str): Last day, YYYY-MM-DD, inclusive (default: from_date)
+        channel_idx (int): Filter by channel index (optional)
+        limit (int): Page size (default: 100, max: 1000)
+        before (str): Cursor from a previous page - continue with older messages
+
+    Returns:
+        JSON with messages (oldest first), has_more and cursors {before}
+    """
+    try:
+        from_date = request.args.get('from_date', type=str)
+        to_date = request.args.get('to_date', default=from_date, type=str)
+        channel_idx = request.args.get('channel_idx', type=int)
+        limit = request.args.get('limit', default=100, type=int)
+        before = request.args.get('before', type=str)
+
+        if not from_date:
+            return jsonify({
+                'success': False,
+                'error': 'from_date is required'
+            }), 400
+
+        try:
+            page = parser.read_archive_range(
+                from_date=from_date,
+                to_date=to_date,
+                channel_idx=channel_idx,
+                limit=max(1, min(limit, 1000)),
+                before=before
+            )
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+
+        return jsonify({
+            'success': True,
+            'count': len(page['messages']),
+            'messages': page['messages'],
+            'has_more': page['has_more'],
+            'cursors': page['cursors'],
+            'from_date': from_date,
+            'to_date': to_date,
+            'channel_idx': channel_idx
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error reading archive range: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+def _parse_export_args():
+    """
+    Parse the query parameters shared by the export endpoints.
+
+    Returns:
+        Tuple of (export params dict, error response or None)
+    """
+    export_format = request.args.get('format', default='ndjson', type=str).lower()
+    from_date = request.args.get('from_date', type=str)
+    to_date = request.args.get('to_date', type=str)
+    archive_date = request.args.get('archive_date', type=str)
+
+    if export_format not in ('ndjson', 'csv'):
+        return None, (jsonify({
+            'success': False,
+            'error': 'format must be ndjson or csv'
+        }), 400)
+
+    try:
+        from_ts = datetime.strptime(from_date, '%Y-%m-%d').timestamp() if from_date else None
+        to_ts = (datetime.strptime(to_date, '%Y-%m-%d') + timedelta(days=1)).timestamp() if to_date else None
+        if archive_date:
+            datetime.strptime(archive_date, '%Y-%m-%d')
+    except ValueError:
+        return None, (jsonify({
+            'success': False,
+            'error': 'Dates must be in YYYY-MM-DD format'
+        }), 400)
+
+    from app.meshcore.export import get_export_source
+    file_path, live = get_export_source(archive_date)
+    if not file_path.exists():
+        return None, (jsonify({
+            'success': False,
+            'error': f'Messages file not found for {archive_date or "live messages"}'
+        }), 404)
+
+    name_parts = [runtime_config.get_device_name(), archive_date or from_date, to_date]
+    return {
+        'format': export_format,
+        'from_ts': from_ts,
+        'to_ts': to_ts,
+        'file_path': file_path,
+        'live': live,
+        'filename': '-'.join(part for part in name_parts if part)
+    }, None
+
+
+def _export_response(chunks, export_format: str, filename: str) -> Response:
+    """Streaming download response for export chunks."""
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    filename = re.sub(r'[^\w.-]', '_', filename)
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}.{export_format}"'}
+    )
+
+
+@api_bp.route('/export/messages', methods=['GET'])
+def export_messages():
+    """
+    Stream channel message history as NDJSON or CSV.
+
+    Rows are read from the file and sent as they are produced, so memory use
+    does not depend on how much history is exported.
+
+    Query parameters:
+        format (str): ndjson (default) or csv
+        channel_idx (int): Filter by channel index (optional)
+        from_date (str): First day, YYYY-MM-DD (optional)
+        to_date (str): Last day, YYYY-MM-DD, inclusive (optional)
+        archive_date (str): Export from this archive instead of the live file
+
+    Returns:
+        Streamed file download (oldest messages first, in file order)
+    """
+    try:
+        from app.meshcore import export
+
+        params, error = _parse_export_args()
+        if error:
+            return error
+        channel_idx = request.args.get('channel_idx', type=int)
+
+        records = export.iter_channel_export(
+            params['file_path'],
+            channel_idx=channel_idx,
+            from_ts=params['from_ts'],
+            to_ts=params['to_ts'],
+            live=params['live']
+        )
+        if params['format'] == 'csv':
+            chunks = export.stream_csv(records, export.CHANNEL_CSV_FIELDS)
+        else:
+            chunks = export.stream_ndjson(records)
+
+        filename = params['filename'] + (f'-channel{channel_idx}' if channel_idx is not None else '')
+        return _export_response(chunks, params['format'], filename)
+
+    except Exception as e:
+        logger.error(f"Error exporting messages: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@api_bp.route('/export/dm', methods=['GET'])
+def export_dm_messages():
+    """
+    Stream direct message history as NDJSON or CSV.
+
+    Query parameters:
+        format (str): ndjson (default) or csv
+        conversation_id (str): Filter by conversation (optional)
+        from_date (str): First day, YYYY-MM-DD (optional)
+        to_date (str): Last day, YYYY-MM-DD, inclusive (optional)
+        archive_date (str): Export from this archive instead of the live file
+
+    Returns:
+        Streamed file download (oldest messages first, in file order)
+    """
+    try:
+        from app.meshcore import export
+
+        params, error = _parse_export_args()
+        if error:
+            return error
+        conversation_id = request.args.get('conversation_id', type=str)
+
+        records = export.iter_dm_export(
+            params['file_path'],
+            conversation_id=conversation_id,
+            from_ts=params['from_ts'],
+            to_ts=params['to_ts'],
+            live=params['live']
+        )
+        if params['format'] == 'csv':
+            chunks = export.stream_csv(records, export.DM_CSV_FIELDS)
+        else:
+            chunks = export.stream_ndjson(records)
+
+        filename = params['filename'] + '-dm' + (f'-{conversation_id}' if conversation_id else '')
+        return _export_response(chunks, params['format'], filename)
+
+    except Exception as e:
+        logger.error(f"Error exporting DM messages: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @api_bp.route('/archive/trigger', methods=['POST'])
 def trigger_archive():
     """
@@ -1136,11 +1638,16 @@ def get_channels():
         success, channels = get_channels_cached()
 
         if success:
-            return jsonify({
+            etag = _make_etag('channels', _channels_cache_generation)
+            not_modified = _not_modified(etag)
+            if not_modified is not None:
+                return not_modified
+
+            return _with_etag(jsonify({
                 'success': True,
                 'channels': channels,
                 'count': len(channels)
-            }), 200
+            }), etag), 200
         else:
             return jsonify({
                 'success': False,
@@ -1465,14 +1972,167 @@ def get_channel_qr(index):
         }), 500
 
 
+@api_bp.route('/messages/delta', methods=['GET'])
+def get_messages_delta():
+    """
+    Get the channel messages appended since a delta cursor (all channels).
+
+    Reads only the bytes written to the .msgs file after the cursor, so
+    polling clients can append new rows instead of reloading whole pages.
+
+    Query parameters:
+        since (str): Cursor from a previous delta call or /api/messages
+                     (omitted = no messages, just a cursor for "now")
+        limit (int): Maximum number of messages (default: 500)
+
+    Returns:
+        JSON with messages (file order), cursor for the next call, has_more,
+        and reset=true if the cursor is stale (file compacted or device
+        changed) and the client should reload its view
+    """
+    try:
+        since = request.args.get('since', type=str)
+        limit = request.args.get('limit', default=500, type=int)
+
+        try:
+            delta = parser.read_messages_delta(since=since, limit=max(1, min(limit, 5000)))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+
+        messages = delta['messages']
+        if messages:
+            _merge_echo_data(messages)
+
+        return jsonify({
+            'success': True,
+            'count': len(messages),
+            'messages': messages,
+            'cursor': delta['cursor'],
+            'has_more': delta['has_more'],
+            'reset': delta['reset']
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error fetching message delta: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@api_bp.route('/messages/search', methods=['GET'])
+def search_messages():
+    """
+    Full-text search over channel messages, DMs and archived days.
+
+    Query params:
+        q (str): Words to search for (required; all must match, as word prefixes)
+        type (str): 'channel' or 'dm' (default: both)
+        channel_idx (int): Only this channel
+        from_date (str): Oldest day to include (YYYY-MM-DD)
+        to_date (str): Newest day to include (YYYY-MM-DD)
+        sort (str): 'relevance' (default) or 'newest'
+        limit (int): Results per page (default: 50, max: 200)
+        offset (int): Number of results to skip (default: 0)
+
+    Returns:
+        JSON with ranked results and facets:
+        {
+            "success": true,
+            "query": "hello",
+            "total": 120,
+            "count": 50,
+            "offset": 0,
+            "results": [{...message fields..., "kind": "channel",
+                         "archive_date": null, "snippet": "say <mark>hello</mark>"}],
+            "facets": {
+                "channels": [{"channel_idx": 0, "count": 100}],
+                "dm": 20,
+                "dates": [{"date": "2025-01-15", "count": 7}]
+            },
+            "indexing": false
+        }
+
+        "indexing" is true while the index is still catching up in the
+        background (e.g. the first backfill of the archives), so results
+        may be incomplete.
+    """
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({
+                'success': False,
+                'error': 'Missing required parameter: q'
+            }), 400
+
+        kind = request.args.get('type', type=str)
+        if kind not in (None, '', 'channel', 'dm'):
+            return jsonify({
+                'success': False,
+                'error': 'Invalid type. Expected channel or dm'
+            }), 400
+
+        sort = request.args.get('sort', default='relevance', type=str)
+        if sort not in ('relevance', 'newest'):
+            return jsonify({
+                'success': False,
+                'error': 'Invalid sort. Expected relevance or newest'
+            }), 400
+
+        from_date = request.args.get('from_date', type=str)
+        to_date = request.args.get('to_date', type=str)
+        for value in (from_date, to_date):
+            if value:
+                try:
+                    datetime.strptime(value, '%Y-%m-%d')
+                except ValueError:
+                    return jsonify({
+                        'success': False,
+                        'error': f'Invalid date format: {value}. Expected YYYY-MM-DD'
+                    }), 400
+
+        from app.meshcore.search_index import search_index, DEFAULT_SEARCH_LIMIT
+        result = search_index.search(
+            query,
+            kind=kind or None,
+            channel_idx=request.args.get('channel_idx', type=int),
+            from_date=from_date or None,
+            to_date=to_date or None,
+            sort=sort,
+            limit=request.args.get('limit', default=DEFAULT_SEARCH_LIMIT, type=int),
+            offset=request.args.get('offset', default=0, type=int)
+        )
+
+        return jsonify({
+            'success': True,
+            'query': query,
+            'total': result['total'],
+            'count': len(result['results']),
+            'offset': max(request.args.get('offset', default=0, type=int), 0),
+            'results': result['results'],
+            'facets': result['facets'],
+            'indexing': result['indexing']
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error searching messages: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @api_bp.route('/messages/updates', methods=['GET'])
 def get_messages_updates():
     """
     Check for new messages across all channels without fetching full message content.
     Used for intelligent refresh mechanism and unread notifications.
 
-    OPTIMIZED: Reads messages file only ONCE and computes stats for all channels.
-    Previously read the file N*2 times (once per channel, twice if updates).
+    OPTIMIZED: Stats for all channels come from the incremental message index
+    in a single call (previously the whole file was read on every poll).
 
     Query parameters:
         last_seen (str): JSON object with last seen timestamps per channel
@@ -1513,38 +2173,23 @@ def get_messages_updates():
                 'error': 'Failed to get channels'
             }), 500
 
-        # OPTIMIZATION: Read ALL messages ONCE (no channel filter)
-        # Then compute per-channel statistics in memory
-        all_messages = parser.read_messages(
-            limit=None,  # Get all messages
-            days=7       # Only last 7 days
-        )
-
-        # Group messages by channel and compute stats
-        channel_stats = {}  # channel_idx -> {latest_ts, messages_after_last_seen}
-        for msg in all_messages:
-            ch_idx = msg.get('channel_idx', 0)
-            ts = msg.get('timestamp', 0)
-
-            if ch_idx not in channel_stats:
-                channel_stats[ch_idx] = {
-                    'latest_timestamp': 0,
-                    'unread_count': 0
-                }
-
-            # Track latest timestamp per channel
-            if ts > channel_stats[ch_idx]['latest_timestamp']:
-                channel_stats[ch_idx]['latest_timestamp'] = ts
-
-            # Count unread messages (newer than last_seen)
-            last_seen_ts = last_seen.get(ch_idx, 0)
-            if ts > last_seen_ts:
-                channel_stats[ch_idx]['unread_count'] += 1
-
         # Get muted channels to exclude from total
         from app import read_status as rs
+        from app.meshcore.tombstones import tombstone_log
         muted_channels = set(rs.get_muted_channels())
 
+        # Nothing changed since the client's copy: answer before touching messages
+        etag = _make_etag('messages_updates', _channels_cache_generation, _msgs_version(),
+                          tombstone_log.version, sorted(muted_channels), sorted(last_seen.items()),
+                          _time_bucket())
+        not_modified = _not_modified(etag)
+        if not_modified is not None:
+            return not_modified
+
+        # Per-channel latest timestamp + unread count, answered by the message
+        # index (bisect/indexed queries) instead of re-reading the file
+        channel_stats = parser.get_channel_update_stats(last_seen, days=7)
+
         # Build response
         updates = []
         total_unread = 0
@@ -1569,12 +2214,12 @@ def get_messages_updates():
                 'unread_count': unread_count
             })
 
-        return jsonify({
+        return _with_etag(jsonify({
             'success': True,
             'channels': updates,
             'total_unread': total_unread,
             'muted_channels': list(muted_channels)
-        }), 200
+        }), etag), 200
 
     except Exception as e:
         logger.error(f"Error checking message updates: {e}")
@@ -1826,42 +2471,21 @@ def get_dm_updates():
         except json.JSONDecodeError:
             last_seen = {}
 
-        # Get all conversations
-        conversations = parser.get_dm_conversations(days=7)
-
-        updates = []
-        total_unread = 0
-
-        for conv in conversations:
-            conv_id = conv['conversation_id']
-            last_seen_ts = last_seen.get(conv_id, 0)
-
-            # Count unread
-            if conv['last_message_timestamp'] > last_seen_ts:
-                # Need to count actual unread messages
-                messages, _ = parser.read_dm_messages(
-                    conversation_id=conv_id,
-                    days=7
-                )
-                unread_count = sum(1 for m in messages if m['timestamp'] > last_seen_ts)
-            else:
-                unread_count = 0
+        etag = _make_etag('dm_updates', _msgs_version(), last_seen_str, _time_bucket())
+        not_modified = _not_modified(etag)
+        if not_modified is not None:
+            return not_modified
 
-            total_unread += unread_count
+        # Unread counts for all conversations in one pass over the
+        # per-conversation aggregates (no file read per conversation)
+        updates = parser.get_dm_unread_counts(last_seen, days=7)
+        total_unread = sum(u['unread_count'] for u in updates)
 
-            if unread_count > 0:
-                updates.append({
-                    'conversation_id': conv_id,
-                    'display_name': conv['display_name'],
-                    'unread_count': unread_count,
-                    'latest_timestamp': conv['last_message_timestamp']
-                })
-
-        return jsonify({
+        return _with_etag(jsonify({
             'success': True,
             'total_unread': total_unread,
             'conversations': updates
-        }), 200
+        }), etag), 200
 
     except Exception as e:
         logger.error(f"Error checking DM updates: {e}")
@@ -1921,13 +2545,18 @@ def get_contacts_detailed_api():
                 'limit': 350
             }), 500
 
+        # Get protected contacts for is_protected field
+        protected_contacts = get_protected_contacts()
+
+        etag = _make_etag('contacts_detailed', _contacts_detailed_cache_generation, sorted(protected_contacts))
+        not_modified = _not_modified(etag)
+        if not_modified is not None:
+            return not_modified
+
         # Convert dict to list and add computed fields
         type_labels = {1: 'CLI', 2: 'REP', 3: 'ROOM', 4: 'SENS'}
         contacts = []
 
-        # Get protected contacts for is_protected field
-        protected_contacts = get_protected_contacts()
-
         for public_key, details in contacts_detailed.items():
             # Compute path display string
             out_path_len = details.get('out_path_len', -1)
@@ -1960,12 +2589,12 @@ def get_contacts_detailed_api():
             }
             contacts.append(contact)
 
-        return jsonify({
+        return _with_etag(jsonify({
             'success': True,
             'contacts': contacts,
             'count': len(contacts),
             'limit': 350  # MeshCore device limit
-        }), 200
+        }), etag), 200
 
     except Exception as e:
         logger.error(f"Error getting detailed contacts list: {e}")
@@ -2358,18 +2987,24 @@ def get_pending_contacts_api():
                     'pending': []
                 }), 400
 
-        success, pending, error = cli.get_pending_contacts()
+        # Served from cache while no advert has arrived since the last fetch
+        success, pending, error = get_pending_contacts_cached()
 
         if success:
+            etag = _make_etag('contacts_pending', _pending_contacts_cache_generation, sorted(types_param))
+            not_modified = _not_modified(etag)
+            if not_modified is not None:
+                return not_modified
+
             # Filter by types if specified
             if types_param:
                 pending = [contact for contact in pending if contact.get('type') in types_param]
 
-            return jsonify({
+            return _with_etag(jsonify({
                 'success': True,
                 'pending': pending,
                 'count': len(pending)
-            }), 200
+            }), etag), 200
         else:
             return jsonify({
                 'success': False,
@@ -13,6 +13,19 @@ let lastSeenTimestamps = {};  // Track last seen message timestamp per channel
 let unreadCounts = {};  // Track unread message counts per channel
 let mutedChannels = new Set();  // Channel indices with muted notifications
 
+// Infinite scroll state (older pages loaded above the newest page)
+const OLDER_PAGE_SIZE = 100;
+let olderMessages = [];  // Messages loaded by scrolling up, oldest first
+let olderCursor = null;  // Cursor of the oldest loaded message
+let hasOlderMessages = false;  // Server reported more messages before olderCursor
+let loadingOlder = false;  // An older page request is in flight
+let newestPage = [];  // Last newest page returned by loadMessages()
+let pagingContext = null;  // Channel/archive the paging state belongs to
+
+// Delta sync state (live view appends new rows instead of reloading)
+let deltaCursor = null;  // Position in the .msgs file the view is synced to
+let syncingDelta = false;  // A delta request is in flight
+
 // DM state (for badge updates on main page)
 let dmLastSeenTimestamps = {};  // Track last seen DM timestamp per conversation
 let dmUnreadCounts = {};  // Track unread DM counts per conversation
@@ -198,7 +211,7 @@ async function showAllContactsOnMap() {
         markersGroup.clearLayers();
 
         try {
-            const response = await fetch('/api/contacts/detailed');
+            const response = await fetchWithETag('/api/contacts/detailed');
             const data = await response.json();
 
             if (data.success && data.contacts) {
@@ -236,7 +249,7 @@ async function showAllContactsOnMap() {
  */
 async function loadContactsGeoCache() {
     try {
-        const response = await fetch('/api/contacts/detailed');
+        const response = await fetchWithETag('/api/contacts/detailed');
         const data = await response.json();
 
         if (data.success && data.contacts) {
@@ -453,6 +466,11 @@ function setupEventListeners() {
         const isAtBottom = container.scrollHeight - container.scrollTop <= container.clientHeight + 100;
         isUserScrolling = !isAtBottom;
 
+        // Fetch the previous page when the user scrolls near the top
+        if (container.scrollTop < 150 && hasOlderMessages && !loadingOlder) {
+            loadOlderMessages();
+        }
+
         // Show/hide scroll-to-bottom button
         if (scrollToBottomBtn) {
             if (isAtBottom) {
@@ -646,7 +664,8 @@ async function loadMessages() {
         const data = await response.json();
 
         if (data.success) {
-            displayMessages(data.messages);
+            deltaCursor = data.delta_cursor || null;
+            displayMessages(mergeNewestPage(data));
             updateStatus('connected');
             updateLastRefresh();
         } else {
@@ -659,6 +678,234 @@ async function loadMessages() {
     }
 }
 
+/**
+ * Key identifying the channel/archive view the paging state belongs to
+ */
+function getPagingContext() {
+    return `${currentChannelIdx}|${currentArchiveDate || ''}`;
+}
+
+/**
+ * Key used to de-duplicate messages across pages
+ */
+function messagePageKey(msg) {
+    return `${msg.timestamp}|${msg.sender}|${msg.raw_text}`;
+}
+
+/**
+ * Combine the newest page with the older pages loaded by scrolling up.
+ * Messages that slid out of the newest page since the last refresh are
+ * kept with the older ones so no gap opens up between them.
+ */
+function mergeNewestPage(data) {
+    const page = data.messages;
+    const context = getPagingContext();
+
+    if (context !== pagingContext) {
+        pagingContext = context;
+        olderMessages = [];
+        olderCursor = data.cursors ? data.cursors.before : null;
+        hasOlderMessages = !!data.has_more;
+    } else if (olderMessages.length > 0) {
+        const pageKeys = new Set(page.map(messagePageKey));
+        const slidOut = newestPage.filter(m => !pageKeys.has(messagePageKey(m)));
+        olderMessages = olderMessages.concat(slidOut);
+    } else if (data.cursors) {
+        olderCursor = data.cursors.before;
+        hasOlderMessages = !!data.has_more;
+    }
+
+    newestPage = page;
+    return olderMessages.concat(page);
+}
+
+/**
+ * Load the page of messages before the oldest one shown (infinite scroll)
+ */
+async function loadOlderMessages() {
+    if (loadingOlder || !hasOlderMessages || !olderCursor) return;
+
+    loadingOlder = true;
+    const context = getPagingContext();
+
+    try {
+        let url = `/api/messages?limit=${OLDER_PAGE_SIZE}&channel_idx=${currentChannelIdx}`;
+        url += `&before=${encodeURIComponent(olderCursor)}`;
+        if (currentArchiveDate) {
+            url += `&archive_date=${currentArchiveDate}`;
+        } else {
+            url += '&days=7';
+        }
+
+        const response = await fetch(url);
+        const data = await response.json();
+
+        // Channel or archive switched while the request was in flight
+        if (context !== getPagingContext()) return;
+
+        if (!data.success) {
+            console.error('Error loading older messages:', data.error);
+            return;
+        }
+
+        olderCursor = data.cursors.before || olderCursor;
+        hasOlderMessages = !!data.has_more;
+        if (data.messages.length === 0) return;
+
+        olderMessages = data.messages.concat(olderMessages);
+        prependMessages(data.messages);
+    } catch (error) {
+        console.error('Error loading older messages:', error);
+    } finally {
+        loadingOlder = false;
+    }
+}
+
+/**
+ * Insert older messages above the current ones, keeping the visible
+ * messages in place
+ */
+function prependMessages(messages) {
+    const list = document.getElementById('messagesList');
+    const container = document.getElementById('messagesContainer');
+    const previousHeight = container.scrollHeight;
+
+    const fragment = document.createDocumentFragment();
+    messages.forEach(msg => fragment.appendChild(createMessageElement(msg)));
+    list.insertBefore(fragment, list.firstChild);
+
+    container.scrollTop += container.scrollHeight - previousHeight;
+    lastMessageCount = list.children.length;
+
+    // Re-apply filter if active
+    clearFilterState();
+}
+
+/**
+ * Fetch channel messages appended to the live file since a delta cursor.
+ * Returns {messages, cursor}, or null if the view has to be reloaded.
+ */
+async function fetchMessagesDelta(since) {
+    let messages = [];
+    let cursor = since;
+
+    while (true) {
+        const response = await fetch(`/api/messages/delta?since=${encodeURIComponent(cursor)}`);
+        const data = await response.json();
+        if (!data.success || data.reset) return null;
+
+        messages = messages.concat(data.messages);
+        cursor = data.cursor;
+        if (!data.has_more) break;
+    }
+
+    return { messages, cursor };
+}
+
+/**
+ * Bring the live view up to date by appending only the new messages
+ * (falls back to a full reload when there is nothing to sync from)
+ */
+async function syncMessages() {
+    if (currentArchiveDate || !deltaCursor) {
+        await loadMessages();
+        return;
+    }
+    if (syncingDelta) return;
+
+    syncingDelta = true;
+    const context = getPagingContext();
+
+    try {
+        const delta = await fetchMessagesDelta(deltaCursor);
+
+        // Channel or archive switched while the request was in flight
+        if (context !== getPagingContext()) return;
+
+        if (!delta) {
+            await loadMessages();
+            return;
+        }
+
+        deltaCursor = delta.cursor;
+        applyMessagesDelta(delta.messages);
+        updateStatus('connected');
+        updateLastRefresh();
+    } catch (error) {
+        console.error('Error syncing messages:', error);
+        updateStatus('disconnected');
+    } finally {
+        syncingDelta = false;
+    }
+}
+
+/**
+ * Re-fetch the messages appended since a cursor and re-render the rows
+ * already shown (e.g. own messages whose echo counts came in since)
+ */
+async function refreshMessagesSince(cursor) {
+    if (currentArchiveDate || !cursor) return;
+
+    const context = getPagingContext();
+    try {
+        const delta = await fetchMessagesDelta(cursor);
+        if (delta && context === getPagingContext()) {
+            applyMessagesDelta(delta.messages);
+        }
+    } catch (error) {
+        console.error('Error refreshing messages:', error);
+    }
+}
+
+/**
+ * Apply delta messages to the current channel view: rows already shown are
+ * replaced in place, new ones are appended
+ */
+function applyMessagesDelta(messages) {
+    const channelMessages = messages.filter(m => m.channel_idx === currentChannelIdx);
+    if (channelMessages.length === 0) return;
+
+    const list = document.getElementById('messagesList');
+    const wasAtBottom = !isUserScrolling;
+
+    const rendered = new Map();
+    for (const el of list.children) {
+        if (el.dataset.key) rendered.set(el.dataset.key, el);
+    }
+
+    const emptyState = list.querySelector('.empty-state');
+    if (emptyState) emptyState.remove();
+
+    let appended = false;
+    channelMessages.forEach(msg => {
+        const key = messagePageKey(msg);
+        const messageEl = createMessageElement(msg);
+        const existing = rendered.get(key);
+        if (existing) {
+            existing.replaceWith(messageEl);
+            const index = newestPage.findIndex(m => messagePageKey(m) === key);
+            if (index >= 0) newestPage[index] = msg;
+        } else {
+            list.appendChild(messageEl);
+            rendered.set(key, messageEl);
+            newestPage.push(msg);
+            appended = true;
+        }
+    });
+
+    if (appended && wasAtBottom) {
+        scrollToBottom();
+    }
+
+    lastMessageCount = list.children.length;
+
+    const latestTimestamp = Math.max(...channelMessages.map(m => m.timestamp));
+    markChannelAsRead(currentChannelIdx, latestTimestamp);
+
+    // Re-apply filter if active
+    clearFilterState();
+}
+
 /**
  * Display messages in the UI
  */
@@ -709,6 +956,7 @@ function displayMessages(messages) {
 function createMessageElement(msg) {
     const wrapper = document.createElement('div');
     wrapper.className = `message-wrapper ${msg.is_own ? 'own' : 'other'}`;
+    wrapper.dataset.key = messagePageKey(msg);
 
     const time = formatTime(msg.timestamp);
 
@@ -842,11 +1090,12 @@ async function sendMessage() {
             updateCharCounter();
             showNotification('Message sent', 'success');
 
-            // Reload messages after short delay to show sent message
-            setTimeout(() => loadMessages(), 1000);
-            // Reload again to catch echo counts (echoes typically arrive within 5-30 seconds)
-            setTimeout(() => loadMessages(), 6000);
-            setTimeout(() => loadMessages(), 15000);
+            // Append the sent message after a short delay
+            const sendCursor = deltaCursor;
+            setTimeout(() => syncMessages(), 1000);
+            // Re-render it to catch echo counts (echoes typically arrive within 5-30 seconds)
+            setTimeout(() => refreshMessagesSince(sendCursor), 6000);
+            setTimeout(() => refreshMessagesSince(sendCursor), 15000);
         } else {
             showNotification('Failed to send: ' + data.error, 'danger');
         }
@@ -1991,7 +2240,7 @@ async function checkForUpdates() {
         const controller = new AbortController();
         const timeoutId = setTimeout(() => controller.abort(), 15000); // 15s timeout
 
-        const response = await fetch(`/api/messages/updates?last_seen=${lastSeenParam}`, {
+        const response = await fetchWithETag(`/api/messages/updates?last_seen=${lastSeenParam}`, {
             signal: controller.signal
         });
         clearTimeout(timeoutId);
@@ -2023,8 +2272,8 @@ async function checkForUpdates() {
             // If current channel has updates, refresh the view
             const currentChannelUpdate = data.channels.find(ch => ch.index === currentChannelIdx);
             if (currentChannelUpdate && currentChannelUpdate.has_updates) {
-                console.log(`New messages detected on channel ${currentChannelIdx}, refreshing...`);
-                await loadMessages();
+                console.log(`New messages detected on channel ${currentChannelIdx}, syncing...`);
+                await syncMessages();
             }
         }
     } catch (error) {
@@ -2202,7 +2451,7 @@ async function loadChannels() {
         const controller = new AbortController();
         const timeoutId = setTimeout(() => controller.abort(), 10000); // 10s timeout
 
-        const response = await fetch('/api/channels', {
+        const response = await fetchWithETag('/api/channels', {
             signal: controller.signal
         });
         clearTimeout(timeoutId);
@@ -2303,7 +2552,7 @@ async function loadChannelsList() {
     listEl.innerHTML = '<div class="text-center text-muted py-3"><div class="spinner-border spinner-border-sm"></div> Loading...</div>';
 
     try {
-        const response = await fetch('/api/channels');
+        const response = await fetchWithETag('/api/channels');
         const data = await response.json();
 
         if (data.success) {
@@ -2549,7 +2798,7 @@ async function checkDmUpdates() {
         const controller = new AbortController();
         const timeoutId = setTimeout(() => controller.abort(), 10000);
 
-        const response = await fetch(`/api/dm/updates?last_seen=${lastSeenParam}`, {
+        const response = await fetchWithETag(`/api/dm/updates?last_seen=${lastSeenParam}`, {
             signal: controller.signal
         });
         clearTimeout(timeoutId);
@@ -2613,7 +2862,7 @@ async function updatePendingContactsBadge() {
         savedTypes.forEach(type => params.append('types', type));
 
         // Fetch pending count with type filter
-        const response = await fetch(`/api/contacts/pending?${params.toString()}`);
+        const response = await fetchWithETag(`/api/contacts/pending?${params.toString()}`);
         if (!response.ok) return;
 
         const data = await response.json();
@@ -248,7 +248,7 @@ async function loadContactCounts() {
         savedTypes.forEach(type => params.append('types', type));
 
         // Fetch pending count (with type filter)
-        const pendingResp = await fetch(`/api/contacts/pending?${params.toString()}`);
+        const pendingResp = await fetchWithETag(`/api/contacts/pending?${params.toString()}`);
         const pendingData = await pendingResp.json();
 
         const pendingBadge = document.getElementById('pendingBadge');
@@ -259,7 +259,7 @@ async function loadContactCounts() {
         }
 
         // Fetch existing count
-        const existingResp = await fetch('/api/contacts/detailed');
+        const existingResp = await fetchWithETag('/api/contacts/detailed');
         const existingData = await existingResp.json();
 
         const existingBadge = document.getElementById('existingBadge');
@@ -1184,7 +1184,7 @@ async function loadPendingContacts() {
         const params = new URLSearchParams();
         selectedTypes.forEach(type => params.append('types', type));
 
-        const response = await fetch(`/api/contacts/pending?${params.toString()}`);
+        const response = await fetchWithETag(`/api/contacts/pending?${params.toString()}`);
         const data = await response.json();
 
         if (loadingEl) loadingEl.style.display = 'none';
@@ -1628,7 +1628,7 @@ async function loadExistingContacts() {
     try {
         // Fetch device contacts and cached contacts in parallel
         const [deviceResponse, cacheResponse] = await Promise.all([
-            fetch('/api/contacts/detailed'),
+            fetchWithETag('/api/contacts/detailed'),
             fetch('/api/contacts/cached?format=full')
         ]);
         const deviceData = await deviceResponse.json();
@@ -0,0 +1,54 @@
+/**
+ * Fetch Utilities
+ * Conditional GET for polling endpoints (ETag / If-None-Match)
+ */
+
+// Max number of URLs whose last response is kept for revalidation
+const ETAG_CACHE_MAX_ENTRIES = 20;
+
+// url -> { etag, body, contentType }, least recently used first
+const etagCache = new Map();
+
+/**
+ * Fetch a polled API endpoint, sending the ETag of the last response for
+ * the same URL. When the server answers 304 Not Modified, the cached body
+ * is returned as a regular 200 response, so callers need no changes.
+ * @param {string} url - Request URL (GET)
+ * @param {Object} options - fetch() options (e.g. signal)
+ * @returns {Promise<Response>} - Response (body from cache on 304)
+ */
+async function fetchWithETag(url, options = {}) {
+    const cached = etagCache.get(url);
+    const headers = new Headers(options.headers || {});
+    if (cached) {
+        headers.set('If-None-Match', cached.etag);
+    }
+
+    // no-store: the browser cache must neither answer nor swallow the 304
+    const response = await fetch(url, { ...options, headers, cache: 'no-store' });
+
+    if (response.status === 304 && cached) {
+        etagCache.delete(url);
+        etagCache.set(url, cached);
+        return new Response(cached.body, {
+            status: 200,
+            headers: { 'Content-Type': cached.contentType, 'ETag': cached.etag }
+        });
+    }
+
+    const etag = response.headers.get('ETag');
+    if (response.ok && etag) {
+        const body = await response.clone().text();
+        etagCache.delete(url);
+        etagCache.set(url, {
+            etag,
+            body,
+            contentType: response.headers.get('Content-Type') || 'application/json'
+        });
+        if (etagCache.size > ETAG_CACHE_MAX_ENTRIES) {
+            etagCache.delete(etagCache.keys().next().value);
+        }
+    }
+
+    return response;
+}
@@ -0,0 +1,7 @@
+"""
+mc-webui benchmarks - run from the repository root, e.g.:
+
+    python -m benchmarks.decode --lines 1000000
+    python -m benchmarks.suite --lines 1000000 --json results.json
+    python -m benchmarks.suite --lines 1000000 --compare results.json
+"""
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+.msgs decoding benchmark - lines/sec before and after the type pre-filter
+and fast JSON decoder (app/meshcore/decoder.py).
+
+Writes a synthetic .msgs file (default 1M lines, mixed CHAN / SENT_CHAN /
+PRIV / SENT_MSG / ADVERT traffic) to a temporary directory and measures:
+
+    baseline   json.loads on every line, then check "type" (previous readers)
+    prefilter  byte pre-filter on the quoted type, then stdlib json.loads
+    fast       byte pre-filter, then decoder.loads (orjson/msgspec if installed)
+
+for a channel view (CHAN, SENT_CHAN) and a DM view (PRIV, SENT_MSG).
+
+Usage:
+    python -m benchmarks.decode [--lines N] [--repeat R]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.meshcore import decoder  # noqa: E402
+from benchmarks.traffic import write_synthetic_msgs  # noqa: E402
+
+
+def scan_baseline(path, types):
+    matched = 0
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if json.loads(line).get('type') in types:
+                matched += 1
+    return matched
+
+
+def scan_prefilter(path, types, loads):
+    tokens = decoder.type_tokens(types)
+    matched = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            line = line.strip()
+            if not line or not decoder.has_type(line, tokens):
+                continue
+            if loads(line).get('type') in types:
+                matched += 1
+    return matched
+
+
+def measure(fn, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--lines', type=int, default=1_000_000, help='synthetic file size in lines')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='runs per measurement (best is reported)')
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'Bench.msgs')
+        print(f"Generating {args.lines:,} lines...")
+        write_synthetic_msgs(path, args.lines)
+        print(f"File size: {os.path.getsize(path) / 1e6:.1f} MB, fast decoder: {decoder.DECODER_NAME}\n")
+
+        print(f"{'view':<10} {'mode':<10} {'seconds':>9} {'lines/sec':>12} {'speedup':>8}")
+        for view, types in (('channel', decoder.CHANNEL_MESSAGE_TYPES), ('dm', decoder.DM_MESSAGE_TYPES)):
+            base_time, base_count = measure(lambda: scan_baseline(path, types), args.repeat)
+            runs = (
+                ('baseline', base_time, base_count),
+                ('prefilter', *measure(lambda: scan_prefilter(path, types, json.loads), args.repeat)),
+                ('fast', *measure(lambda: scan_prefilter(path, types, decoder.loads), args.repeat)),
+            )
+            for mode, elapsed, count in runs:
+                assert count == base_count, f"{mode} matched {count} lines, baseline {base_count}"
+                print(f"{view:<10} {mode:<10} {elapsed:>9.3f} {args.lines / elapsed:>12,.0f} "
+                      f"{base_time / elapsed:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Parser and API benchmark suite on synthetic mesh traffic.
+
+Generates a device's .msgs / .adverts.jsonl / .echoes.jsonl files
+(benchmarks/traffic.py) in a temporary config directory and times:
+
+    parser   read_messages, read_messages_page, read_dm_messages, the
+             channel / DM update statistics behind /api/messages/updates and
+             /api/dm/updates, contacts_cache.scan_new_adverts
+    api      the polling endpoints through the Flask test client, including
+             the echo merge of /api/messages (the echo snapshot is loaded on
+             the first request; no sync thread runs)
+
+"cold" cases drop every in-process cache and index sidecar before each run
+(first request after a restart); "warm" cases measure repeated polling.
+
+The bridge is replaced by a local HTTP stub answering get_channels,
+/echo_counts (built from the generated .echoes.jsonl the way the bridge
+loads it) and /ack_status, so API timings include the real HTTP round trips.
+
+Results can be written as JSON (--json) and compared against an earlier
+run (--compare) to track regressions.
+
+Usage:
+    python -m benchmarks.suite [--lines N] [--channels N] [--peers M] [--engine memory|sqlite]
+                               [--repeat R] [--only SUBSTRING] [--json PATH] [--compare PATH]
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.traffic import DEVICE_NAME, generate  # noqa: E402
+
+# Version of the JSON result layout
+RESULT_FORMAT = 1
+
+
+def load_echo_state(echoes_path: str) -> Dict:
+    """/echo_counts response for an .echoes.jsonl file (as the bridge builds it on startup)."""
+    echo_counts = {}
+    incoming_paths = {}
+    with open(echoes_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            pkt_payload = record['pkt_payload']
+            if record['type'] == 'sent_echo':
+                entry = echo_counts.setdefault(pkt_payload, {
+                    'paths': set(), 'timestamp': record['msg_ts'], 'channel_idx': record['channel_idx']})
+                entry['paths'].add(record['path'])
+            else:
+                entry = incoming_paths.setdefault(pkt_payload, {'paths': [], 'first_ts': record['ts']})
+                entry['paths'].append({'path': record['path'], 'snr': record['snr'],
+                                       'path_len': record['path_len'], 'ts': record['ts']})
+
+    return {
+        'success': True,
+        'echo_counts': [{'timestamp': data['timestamp'], 'channel_idx': data['channel_idx'],
+                         'count': len(data['paths']), 'paths': sorted(data['paths']), 'pkt_payload': pkt_payload}
+                        for pkt_payload, data in echo_counts.items()],
+        'incoming_paths': [{'pkt_payload': pkt_payload, 'timestamp': data['first_ts'], 'paths': data['paths']}
+                           for pkt_payload, data in incoming_paths.items()],
+    }
+
+
+class StubBridge:
+    """Minimal meshcore-bridge stand-in serving canned responses on localhost."""
+
+    def __init__(self, channels: List[Dict], echo_state: Dict):
+        channels_stdout = '\n'.join(f"{ch['index']}: {ch['name']} [{ch['key']}]" for ch in channels)
+        responses = {
+            '/echo_counts': json.dumps(echo_state).encode(),
+            '/ack_status': json.dumps({'success': True, 'acks': {}}).encode(),
+            '/health': json.dumps({'status': 'healthy'}).encode(),
+        }
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, body: bytes, code: int = 200):
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                body = responses.get(self.path.split('?', 1)[0])
+                self._reply(body or b'{}', 200 if body else 404)
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                if request.get('args') == ['get_channels']:
+                    result = {'success': True, 'stdout': channels_stdout, 'stderr': '', 'returncode': 0}
+                else:
+                    result = {'success': False, 'stdout': '', 'stderr': 'not supported by the stub', 'returncode': 1}
+                self._reply(json.dumps(result).encode())
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}/cli"
+        threading.Thread(target=self._server.serve_forever, name='stub-bridge', daemon=True).start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class Runner:
+    """Times benchmark cases and collects their results."""
+
+    def __init__(self, repeat: int, only: Optional[str] = None):
+        self.repeat = repeat
+        self.only = only
+        self.results: List[Dict] = []
+        self.meta: Dict = {}
+
+    def run(self, name: str, fn: Callable, setup: Optional[Callable] = None, params: Optional[Dict] = None):
+        """
+        Run fn `repeat` times (after one untimed warm-up call unless setup is
+        given), calling setup before each timed run.
+        """
+        if self.only and self.only not in name:
+            return
+
+        if setup is None:
+            fn()
+        runs = []
+        for _ in range(self.repeat):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            fn()
+            runs.append(time.perf_counter() - start)
+
+        result = {
+            'name': name,
+            'params': params or {},
+            'runs': runs,
+            'min': min(runs),
+            'median': statistics.median(runs),
+            'mean': statistics.mean(runs),
+        }
+        self.results.append(result)
+        print(f"{name:<44} {result['min'] * 1000:>10.2f} {result['median'] * 1000:>10.2f}", flush=True)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _first_dm_conversation(msgs_path: str) -> str:
+    with open(msgs_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if '"PRIV"' in line:
+                return f"pk_{json.loads(line)['pubkey_prefix']}"
+    return 'pk_000000000000'
+
+
+def run_suite(args, config_dir: str, traffic: Dict) -> Runner:
+    from app.config import config
+    from app import contacts_cache
+    from app.meshcore import decoder, parser
+    from app.meshcore.dm_dedup import dm_dedup_index
+    from app.meshcore.msgs_index import msgs_offset_index
+    from app.meshcore.result_cache import result_cache
+    from app.meshcore.store import message_store
+    from app.routes import api
+    from flask import Flask
+
+    def reset_state():
+        """Forget everything derived from the files, as after a restart without sidecars."""
+        result_cache.clear()
+        message_store.invalidate()
+        msgs_offset_index.invalidate()
+        if config.MC_STORAGE_ENGINE == 'sqlite':
+            from app.meshcore.sqlite_index import sqlite_index
+            with sqlite_index._lock:
+                if sqlite_index._conn is not None:
+                    sqlite_index._conn.close()
+                sqlite_index._conn = None
+                sqlite_index._db_path = None
+        for name in os.listdir(config_dir):
+            if name.startswith(f"{DEVICE_NAME}.msgs."):
+                os.remove(os.path.join(config_dir, name))
+        with dm_dedup_index._lock:
+            dm_dedup_index._msgs_file = None
+
+    def reset_contacts():
+        with contacts_cache._cache_lock:
+            contacts_cache._cache = {}
+            contacts_cache._cache_loaded = False
+        contacts_cache._adverts_offset = 0
+        cache_path = contacts_cache._get_cache_path()
+        if cache_path.exists():
+            cache_path.unlink()
+
+    peer = traffic['peer_conversation']
+    last_seen_channels = {ch['index']: time.time() - 86400 for ch in traffic['channels']}
+    last_seen_dm = {peer: time.time() - 86400}
+    runner = Runner(args.repeat, args.only)
+
+    print(f"{'benchmark':<44} {'min ms':>10} {'median ms':>10}")
+
+    runner.run('parser.read_messages[cold]', lambda: parser.read_messages(channel_idx=0, days=7),
+               setup=reset_state, params={'channel_idx': 0, 'days': 7})
+    runner.run('parser.read_messages[warm]', lambda: parser.read_messages(channel_idx=0, days=7),
+               params={'channel_idx': 0, 'days': 7})
+    runner.run('parser.read_messages_page[warm]', lambda: parser.read_messages_page(limit=100, channel_idx=0),
+               params={'limit': 100, 'channel_idx': 0})
+    runner.run('parser.read_dm_messages[cold]', lambda: parser.read_dm_messages(conversation_id=peer),
+               setup=reset_state, params={'conversation_id': peer})
+    runner.run('parser.read_dm_messages[warm]', lambda: parser.read_dm_messages(conversation_id=peer),
+               params={'conversation_id': peer})
+    runner.run('parser.get_channel_update_stats[warm]',
+               lambda: parser.get_channel_update_stats(last_seen_channels, days=7), params={'days': 7})
+    runner.run('parser.get_dm_unread_counts[warm]',
+               lambda: parser.get_dm_unread_counts(last_seen_dm, days=7), params={'days': 7})
+    runner.run('contacts_cache.scan_new_adverts[cold]', contacts_cache.scan_new_adverts, setup=reset_contacts)
+
+    app = Flask(__name__)
+    app.register_blueprint(api.api_bp)
+    client = app.test_client()
+
+    def get(url):
+        def call():
+            response = client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError(f"GET {url}: HTTP {response.status_code} {response.get_data(as_text=True)[:200]}")
+        return call
+
+    endpoints = (
+        ('api.messages', '/api/messages?limit=100&channel_idx=0'),
+        ('api.messages.500', '/api/messages?limit=500&channel_idx=0'),
+        ('api.messages.updates', '/api/messages/updates?last_seen=' + json.dumps(last_seen_channels)),
+        ('api.dm.conversations', '/api/dm/conversations'),
+        ('api.dm.messages', f'/api/dm/messages?conversation_id={peer}&limit=100'),
+        ('api.dm.updates', '/api/dm/updates?last_seen=' + json.dumps(last_seen_dm)),
+        ('api.status', '/api/status'),
+    )
+    runner.run('api.messages[cold]', get(endpoints[0][1]), setup=reset_state, params={'url': endpoints[0][1]})
+    for name, url in endpoints:
+        runner.run(f"{name}[warm]", get(url), params={'url': url})
+
+    runner.meta = {'decoder': decoder.DECODER_NAME, 'engine': config.MC_STORAGE_ENGINE}
+    return runner
+
+
+def compare(results: List[Dict], baseline_path: str):
+    """Print the change of each median against a previous JSON result file."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {r['name']: r for r in json.load(f)['results']}
+
+    print(f"\n{'benchmark':<44} {'baseline ms':>12} {'now ms':>10} {'change':>8}")
+    for result in results:
+        before = baseline.get(result['name'])
+        if before is None:
+            continue
+        change = result['median'] / before['median'] - 1
+        print(f"{result['name']:<44} {before['median'] * 1000:>12.2f} {result['median'] * 1000:>10.2f} "
+              f"{change:>+7.0%}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--lines', type=int, default=100_000, help='.msgs size in lines (10k - 5M)')
+    arg_parser.add_argument('--channels', type=int, default=4, help='number of channels')
+    arg_parser.add_argument('--peers', type=int, default=50, help='number of DM peers')
+    arg_parser.add_argument('--days', type=float, default=30, help='time span of the traffic')
+    arg_parser.add_argument('--seed', type=int, default=42)
+    arg_parser.add_argument('--engine', choices=('memory', 'sqlite'), default='memory', help='MC_STORAGE_ENGINE')
+    arg_parser.add_argument('--repeat', type=int, default=5, help='timed runs per benchmark')
+    arg_parser.add_argument('--only', help='run only benchmarks whose name contains this')
+    arg_parser.add_argument('--json', help='write results to this JSON file')
+    arg_parser.add_argument('--compare', help='compare medians against this earlier JSON result file')
+    args = arg_parser.parse_args()
+
+    config_dir = tempfile.mkdtemp(prefix='mc-webui-bench-')
+    bridge = None
+    try:
+        # The app reads its configuration from the environment at import time,
+        # and the generator already imports it
+        os.environ.update({
+            'MC_CONFIG_DIR': config_dir,
+            'MC_ARCHIVE_DIR': os.path.join(config_dir, 'archive'),
+            'MC_DEVICE_NAME': DEVICE_NAME,
+            'MC_STORAGE_ENGINE': args.engine,
+        })
+        print(f"Generating {args.lines:,} lines ({args.channels} channels, {args.peers} peers)...")
+        traffic = generate(config_dir, args.lines, args.channels, args.peers, args.days, args.seed)
+        traffic['peer_conversation'] = _first_dm_conversation(traffic['msgs'])
+
+        from app.config import config
+        bridge = StubBridge(traffic['channels'], load_echo_state(traffic['echoes']))
+        config.MC_BRIDGE_URL = bridge.url
+        runner = run_suite(args, config_dir, traffic)
+
+        output = {
+            'format': RESULT_FORMAT,
+            'meta': {
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'commit': _git_commit(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                **runner.meta,
+            },
+            'params': {
+                'lines': args.lines, 'channels': args.channels, 'peers': args.peers, 'days': args.days,
+                'seed': args.seed, 'repeat': args.repeat,
+                'msgs_bytes': os.path.getsize(traffic['msgs']), 'line_counts': traffic['counts'],
+            },
+            'results': runner.results,
+        }
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump(output, f, indent=2)
+            print(f"\nResults written to {args.json}")
+        if args.compare:
+            compare(runner.results, args.compare)
+    finally:
+        if bridge is not None:
+            bridge.close()
+        shutil.rmtree(config_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Synthetic mesh traffic generator for benchmarks.
+
+Writes the files the bridge produces for a device, with realistic shapes:
+
+    {device}.msgs            CHAN / SENT_CHAN / PRIV / SENT_MSG / ADVERT lines
+                             spread over the last --days days, with the
+                             occasional DM logged twice (as meshcli does)
+    {device}.adverts.jsonl   advert log with decodable pkt_payloads
+                             (public key, location, name)
+    {device}.echoes.jsonl    sent_echo / rx_echo records for the channel
+                             messages of the last ECHO_RETENTION_DAYS days;
+                             rx_echo payloads are computed from the channel
+                             secret, so they match received messages exactly
+
+Channel secrets are derived from the seed; `channel_list()` returns the same
+list the bridge reports for `get_channels`.
+
+Usage:
+    python -m benchmarks.traffic --out /tmp/bench [--lines N] [--channels N] [--peers M]
+"""
+
+import argparse
+import json
+import os
+import random
+import struct
+import sys
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Share of each line type in the synthetic .msgs file (rest are ADVERTs)
+TRAFFIC_MIX = (('CHAN', 0.45), ('SENT_CHAN', 0.05), ('PRIV', 0.08), ('SENT_MSG', 0.04))
+
+# Share of DM lines written twice
+DM_DUPLICATE_RATE = 0.01
+
+# The bridge keeps echo records for 7 days
+ECHO_RETENTION_DAYS = 7
+
+DEVICE_NAME = 'Bench'
+
+WORDS = ('mesh', 'repeater', 'node', 'signal', 'hello', 'anyone', 'copy', 'test', 'antenna',
+         'battery', 'solar', 'range', 'weather', 'tonight', 'hilltop', 'relay', 'thanks', 'ok')
+
+
+def channel_list(channels: int, seed: int = 42) -> List[Dict]:
+    """Channels as returned by cli.get_channels(): [{index, name, key}, ...]."""
+    rnd = random.Random(f"channels-{seed}")
+    return [{'index': i, 'name': 'Public' if i == 0 else f"bench{i}", 'key': f"{rnd.getrandbits(128):032x}"}
+            for i in range(channels)]
+
+
+def _advert_payload(rnd: random.Random, public_key: str, name: str, timestamp: int) -> str:
+    """pkt_payload of an advert carrying location and name (see contacts_cache.parse_advert_payload)."""
+    lat = int(rnd.uniform(49.0, 54.8) * 1e6)
+    lon = int(rnd.uniform(14.1, 24.1) * 1e6)
+    raw = (bytes.fromhex(public_key) + struct.pack('<I', timestamp) + rnd.randbytes(64)
+           + bytes([0x90]) + struct.pack('<ii', lat, lon) + name.encode('utf-8'))
+    return raw.hex()
+
+
+def _sentence(rnd: random.Random, i: int) -> str:
+    return ' '.join(rnd.choice(WORDS) for _ in range(rnd.randint(2, 12))) + f" #{i}"
+
+
+def write_synthetic_msgs(path, lines, seed=42):
+    """Write `lines` lines of synthetic mesh traffic to `path` (.msgs only)."""
+    _write_msgs(path, lines, channels=4, peers=50, days=365, seed=seed)
+
+
+def _write_msgs(path, lines: int, channels: int, peers: int, days: float, seed: int,
+                on_chan=None, on_advert=None) -> Dict[str, int]:
+    """
+    Write the .msgs file, calling on_chan(entry) for channel lines and
+    on_advert(entry, node) for adverts. Returns line counts per type.
+    """
+    rnd = random.Random(seed)
+    nodes = [(f"{rnd.getrandbits(256):064x}", f"node{i}") for i in range(max(peers * 4, 8))]
+    dm_peers = nodes[:peers]
+    now = int(time.time())
+    ts = float(now - days * 86400)
+    step = days * 86400 / max(lines, 1)
+    counts: Dict[str, int] = {}
+
+    with open(path, 'w', encoding='utf-8') as f:
+        written = 0
+        while written < lines:
+            ts += rnd.uniform(0, 2 * step)
+            timestamp = min(int(ts), now)
+            pick = rnd.random()
+            msg_type = 'ADVERT'
+            for name, share in TRAFFIC_MIX:
+                if pick < share:
+                    msg_type = name
+                    break
+                pick -= share
+            if msg_type in ('PRIV', 'SENT_MSG') and not dm_peers:
+                msg_type = 'ADVERT'
+
+            # Busy public channel, quieter private ones
+            channel_idx = 0 if rnd.random() < 0.6 else rnd.randrange(channels)
+            if msg_type == 'CHAN':
+                sender = rnd.choice(nodes)[1]
+                entry = {'type': 'CHAN', 'SNR': round(rnd.uniform(-15, 12), 2), 'channel_idx': channel_idx,
+                         'path_len': rnd.randint(0, 8), 'txt_type': 0, 'sender_timestamp': timestamp - rnd.randint(0, 3),
+                         'text': f"{sender}: {_sentence(rnd, written)}", 'timestamp': timestamp}
+            elif msg_type == 'SENT_CHAN':
+                entry = {'type': 'SENT_CHAN', 'channel_idx': channel_idx, 'text': _sentence(rnd, written),
+                         'sender': DEVICE_NAME, 'txt_type': 0, 'timestamp': timestamp}
+            elif msg_type == 'PRIV':
+                public_key, name = rnd.choice(dm_peers)
+                entry = {'type': 'PRIV', 'SNR': round(rnd.uniform(-15, 12), 2), 'pubkey_prefix': public_key[:12],
+                         'path_len': rnd.randint(0, 8), 'txt_type': 0, 'sender_timestamp': timestamp - 1,
+                         'text': _sentence(rnd, written), 'name': name, 'timestamp': timestamp}
+            elif msg_type == 'SENT_MSG':
+                entry = {'type': 'SENT_MSG', 'text': _sentence(rnd, written), 'recipient': rnd.choice(dm_peers)[1],
+                         'sender': DEVICE_NAME, 'txt_type': 0, 'expected_ack': f"{written:08x}",
+                         'timestamp': timestamp}
+            else:
+                node = rnd.choice(nodes)
+                entry = {'type': 'ADVERT', 'timestamp': timestamp,
+                         'pkt_payload': _advert_payload(rnd, *node, timestamp)}
+
+            line = json.dumps(entry) + '\n'
+            f.write(line)
+            written += 1
+            counts[msg_type] = counts.get(msg_type, 0) + 1
+
+            if msg_type in ('PRIV', 'SENT_MSG') and written < lines and rnd.random() < DM_DUPLICATE_RATE:
+                f.write(line)
+                written += 1
+                counts[msg_type] += 1
+            elif msg_type in ('CHAN', 'SENT_CHAN') and on_chan:
+                on_chan(entry)
+            elif msg_type == 'ADVERT' and on_advert:
+                on_advert(entry, node)
+
+    return counts
+
+
+def generate(out_dir, lines: int = 100_000, channels: int = 4, peers: int = 50,
+             days: float = 30, seed: int = 42, device_name: str = DEVICE_NAME) -> Dict:
+    """
+    Write {device}.msgs, {device}.adverts.jsonl and {device}.echoes.jsonl to out_dir.
+
+    Args:
+        out_dir: Directory to write to (created if missing)
+        lines: Number of .msgs lines
+        channels: Number of channels
+        peers: Number of DM peers (adverts come from 4x as many nodes)
+        days: Time span of the traffic, ending now
+        seed: Random seed - the same arguments produce the same traffic
+                  (timestamps are relative to now)
+
+    Returns:
+        Dict with the file paths, line counts per type and the channel list
+    """
+    # Imported here: needs pycryptodome, and the .msgs-only generator does not
+    from app.routes.api import compute_pkt_payload
+
+    os.makedirs(out_dir, exist_ok=True)
+    msgs_path = os.path.join(out_dir, f"{device_name}.msgs")
+    adverts_path = os.path.join(out_dir, f"{device_name}.adverts.jsonl")
+    echoes_path = os.path.join(out_dir, f"{device_name}.echoes.jsonl")
+
+    chans = channel_list(channels, seed)
+    secrets = {ch['index']: ch['key'] for ch in chans}
+    rnd = random.Random(seed + 1)
+    echo_cutoff = time.time() - ECHO_RETENTION_DAYS * 86400
+    repeaters = [f"{rnd.getrandbits(8):02x}" for _ in range(32)]
+
+    with open(adverts_path, 'w', encoding='utf-8') as adverts, \
+            open(echoes_path, 'w', encoding='utf-8') as echoes:
+
+        def on_advert(entry, node):
+            adverts.write(json.dumps({'type': 'ADVERT', 'from_id': node[0][:12], 'pkt_payload': entry['pkt_payload'],
+                                      'ts': entry['timestamp'] + rnd.random()}) + '\n')
+
+        def on_chan(entry):
+            if entry['timestamp'] < echo_cutoff:
+                return
+            hops = rnd.randint(0, 3)
+            if entry['type'] == 'SENT_CHAN':
+                pkt_payload = f"{rnd.getrandbits(320):080x}"
+                for _ in range(hops):
+                    echoes.write(json.dumps({'type': 'sent_echo', 'pkt_payload': pkt_payload,
+                                             'path': rnd.choice(repeaters), 'msg_ts': entry['timestamp'],
+                                             'channel_idx': entry['channel_idx'],
+                                             'ts': entry['timestamp'] + rnd.uniform(0.5, 10)}) + '\n')
+            else:
+                pkt_payload = compute_pkt_payload(secrets[entry['channel_idx']], entry['sender_timestamp'],
+                                                  entry['txt_type'], entry['text'])
+                for _ in range(max(hops, 1)):
+                    path = ''.join(rnd.choice(repeaters) for _ in range(entry['path_len']))
+                    echoes.write(json.dumps({'type': 'rx_echo', 'pkt_payload': pkt_payload, 'path': path,
+                                             'snr': round(rnd.uniform(-15, 12), 2), 'path_len': entry['path_len'],
+                                             'ts': entry['timestamp'] + rnd.uniform(0, 5)}) + '\n')
+
+        counts = _write_msgs(msgs_path, lines, channels, peers, days, seed, on_chan=on_chan, on_advert=on_advert)
+
+    return {
+        'msgs': msgs_path,
+        'adverts': adverts_path,
+        'echoes': echoes_path,
+        'counts': counts,
+        'channels': chans,
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--out', required=True, help='output directory')
+    arg_parser.add_argument('--lines', type=int, default=100_000, help='.msgs size in lines')
+    arg_parser.add_argument('--channels', type=int, default=4, help='number of channels')
+    arg_parser.add_argument('--peers', type=int, default=50, help='number of DM peers')
+    arg_parser.add_argument('--days', type=float, default=30, help='time span of the traffic')
+    arg_parser.add_argument('--seed', type=int, default=42)
+    arg_parser.add_argument('--device', default=DEVICE_NAME, help='device name (file prefix)')
+    args = arg_parser.parse_args()
+
+    start = time.perf_counter()
+    result = generate(args.out, args.lines, args.channels, args.peers, args.days, args.seed, args.device)
+    print(f"Wrote {args.lines:,} lines in {time.perf_counter() - start:.1f}s")
+    for key in ('msgs', 'adverts', 'echoes'):
+        print(f"  {result[key]}  {os.path.getsize(result[key]) / 1e6:.1f} MB")
+    print('  ' + ', '.join(f"{name}={count:,}" for name, count in sorted(result['counts'].items())))
+
+
+if __name__ == '__main__':
+    main()
@@ -18,6 +18,7 @@ import time
 import json
 import queue
 import uuid
+from collections import OrderedDict
 import shlex
 import re
 from pathlib import Path
@@ -41,6 +42,9 @@ MC_DEVICE_NAME = os.getenv('MC_DEVICE_NAME', 'meshtastic')
 DEFAULT_TIMEOUT = 10
 RECV_TIMEOUT = 60
 
+# Removed echo entries remembered for /echo_counts?since_version= diffs
+ECHO_CHANGE_LOG_SIZE = 20000
+
 # Serial port detection
 SERIAL_BY_ID_PATH = Path('/dev/serial/by-id')
 SERIAL_PORT_SOURCE = "config"  # Will be updated by detect_serial_port()
@@ -151,6 +155,14 @@ class MeshCLISession:
         self.echo_counts = {}     # pkt_payload -> {paths: set(), timestamp: float, channel_idx: int}
         self.incoming_paths = {}  # pkt_payload -> {path, snr, path_len, timestamp}
         self.echo_lock = threading.Lock()
+        # Versioned change log so clients can fetch only what changed:
+        # echo_version grows with every change, echo_changes maps each changed
+        # pkt_payload to the version of its last change (oldest first), and
+        # echo_epoch identifies this process (versions restart with it)
+        self.echo_epoch = uuid.uuid4().hex[:12]
+        self.echo_version = 0
+        self.echo_changes = OrderedDict()
+        self.echo_changes_floor = 0  # Diffs since older versions may miss removals
         self.echo_log_path = self.config_dir / f"{device_name}.echoes.jsonl"
 
         # ACK tracking for DM delivery status
@@ -544,6 +556,35 @@ class MeshCLISession:
             pass
         return None
 
+    def _new_echo_epoch(self):
+        """Invalidate all client snapshots: restart versions under a new epoch (caller holds echo_lock)."""
+        self.echo_epoch = uuid.uuid4().hex[:12]
+        self.echo_version = 0
+        self.echo_changes.clear()
+        self.echo_changes_floor = 0
+
+    def _touch_echo(self, pkt_payload):
+        """Record a change of an echo entry (caller holds echo_lock)."""
+        self.echo_version += 1
+        self.echo_changes[pkt_payload] = self.echo_version
+        self.echo_changes.move_to_end(pkt_payload)
+
+    def _prune_echo_entries(self, entries, is_expired):
+        """Drop expired echo entries, recording them as removed (caller holds echo_lock)."""
+        expired = [k for k, v in entries.items() if is_expired(v)]
+        for pkt_payload in expired:
+            del entries[pkt_payload]
+            self._touch_echo(pkt_payload)
+
+        # Forget the oldest removals once there are too many; clients that
+        # last synced before them get a full snapshot instead of a diff
+        while len(self.echo_changes) > ECHO_CHANGE_LOG_SIZE:
+            pkt_payload, version = next(iter(self.echo_changes.items()))
+            if pkt_payload in self.echo_counts or pkt_payload in self.incoming_paths:
+                break
+            del self.echo_changes[pkt_payload]
+            self.echo_changes_floor = version
+
     def _process_echo(self, echo_data):
         """Process a GRP_TXT echo: track as sent echo or incoming path."""
         pkt_payload = echo_data.get('pkt_payload')
@@ -558,6 +599,7 @@ class MeshCLISession:
             if pkt_payload in self.echo_counts:
                 if path not in self.echo_counts[pkt_payload]['paths']:
                     self.echo_counts[pkt_payload]['paths'].add(path)
+                    self._touch_echo(pkt_payload)
                     self._save_echo({
                         'type': 'sent_echo', 'pkt_payload': pkt_payload,
                         'path': path, 'msg_ts': self.echo_counts[pkt_payload]['timestamp'],
@@ -577,6 +619,7 @@ class MeshCLISession:
                         'timestamp': self.pending_echo['timestamp'],
                         'channel_idx': self.pending_echo['channel_idx']
                     }
+                    self._touch_echo(pkt_payload)
                     self._save_echo({
                         'type': 'sent_echo', 'pkt_payload': pkt_payload,
                         'path': path, 'msg_ts': self.pending_echo['timestamp'],
@@ -597,6 +640,7 @@ class MeshCLISession:
                 'path_len': echo_data.get('path_len'),
                 'ts': current_time,
             })
+            self._touch_echo(pkt_payload)
             self._save_echo({
                 'type': 'rx_echo', 'pkt_payload': pkt_payload,
                 'path': path, 'snr': echo_data.get('snr'),
@@ -606,8 +650,7 @@ class MeshCLISession:
 
             # Cleanup old incoming paths (> 7 days, matching .echoes.jsonl retention)
             cutoff = current_time - (7 * 24 * 3600)
-            self.incoming_paths = {k: v for k, v in self.incoming_paths.items()
-                                   if v['first_ts'] > cutoff}
+            self._prune_echo_entries(self.incoming_paths, lambda v: v['first_ts'] <= cutoff)
 
     def register_pending_echo(self, channel_idx, timestamp):
         """Register a sent message for echo tracking."""
@@ -619,8 +662,7 @@ class MeshCLISession:
             }
             # Cleanup old echo counts (> 7 days, matching .echoes.jsonl retention)
             cutoff = time.time() - (7 * 24 * 3600)
-            self.echo_counts = {k: v for k, v in self.echo_counts.items()
-                               if v['timestamp'] > cutoff}
+            self._prune_echo_entries(self.echo_counts, lambda v: v['timestamp'] <= cutoff)
             logger.debug(f"Registered pending echo for channel {channel_idx}")
 
     def get_echo_count(self, timestamp, channel_idx):
@@ -643,7 +685,14 @@ class MeshCLISession:
             logger.error(f"Failed to save echo: {e}")
 
     def _load_echoes(self):
-        """Load echo data from .echoes.jsonl on startup."""
+        """
+        Load echo data from .echoes.jsonl.
+
+        Runs on startup and again when the device name is detected (the log
+        is renamed then). Entries loaded after clients synced are not in the
+        change log, so every load starts a new echo epoch: clients notice the
+        epoch change and fetch a full snapshot instead of a diff.
+        """
         if not self.echo_log_path.exists():
             return
 
@@ -652,65 +701,68 @@ class MeshCLISession:
         loaded_sent = 0
         loaded_incoming = 0
 
-        try:
-            with open(self.echo_log_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        record = json.loads(line)
-                    except json.JSONDecodeError:
-                        continue
-
-                    ts = record.get('ts', 0)
-                    if ts < cutoff:
-                        continue  # Skip old records
+        with self.echo_lock:
+            try:
+                with open(self.echo_log_path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            record = json.loads(line)
+                        except json.JSONDecodeError:
+                            continue
 
-                    kept_lines.append(line)
-                    pkt_payload = record.get('pkt_payload')
-                    if not pkt_payload:
-                        continue
+                        ts = record.get('ts', 0)
+                        if ts < cutoff:
+                            continue  # Skip old records
 
-                    echo_type = record.get('type')
-
-                    if echo_type == 'sent_echo':
-                        if pkt_payload in self.echo_counts:
-                            # Add path to existing entry
-                            path = record.get('path', '')
-                            if path:
-                                self.echo_counts[pkt_payload]['paths'].add(path)
-                        else:
-                            self.echo_counts[pkt_payload] = {
-                                'paths': {record.get('path', '')},
-                                'timestamp': record.get('msg_ts', ts),
-                                'channel_idx': record.get('channel_idx', 0)
-                            }
-                            loaded_sent += 1
-
-                    elif echo_type == 'rx_echo':
-                        if pkt_payload not in self.incoming_paths:
-                            self.incoming_paths[pkt_payload] = {
-                                'paths': [],
-                                'first_ts': ts,
-                            }
-                            loaded_incoming += 1
-                        self.incoming_paths[pkt_payload]['paths'].append({
-                            'path': record.get('path', ''),
-                            'snr': record.get('snr'),
-                            'path_len': record.get('path_len'),
-                            'ts': ts,
-                        })
+                        kept_lines.append(line)
+                        pkt_payload = record.get('pkt_payload')
+                        if not pkt_payload:
+                            continue
 
-            # Rewrite file with only recent records (compact)
-            with open(self.echo_log_path, 'w', encoding='utf-8') as f:
-                for line in kept_lines:
-                    f.write(line + '\n')
+                        echo_type = record.get('type')
+
+                        if echo_type == 'sent_echo':
+                            if pkt_payload in self.echo_counts:
+                                # Add path to existing entry
+                                path = record.get('path', '')
+                                if path:
+                                    self.echo_counts[pkt_payload]['paths'].add(path)
+                            else:
+                                self.echo_counts[pkt_payload] = {
+                                    'paths': {record.get('path', '')},
+                                    'timestamp': record.get('msg_ts', ts),
+                                    'channel_idx': record.get('channel_idx', 0)
+                                }
+                                loaded_sent += 1
+
+                        elif echo_type == 'rx_echo':
+                            if pkt_payload not in self.incoming_paths:
+                                self.incoming_paths[pkt_payload] = {
+                                    'paths': [],
+                                    'first_ts': ts,
+                                }
+                                loaded_incoming += 1
+                            self.incoming_paths[pkt_payload]['paths'].append({
+                                'path': record.get('path', ''),
+                                'snr': record.get('snr'),
+                                'path_len': record.get('path_len'),
+                                'ts': ts,
+                            })
+
+                # Rewrite file with only recent records (compact)
+                with open(self.echo_log_path, 'w', encoding='utf-8') as f:
+                    for line in kept_lines:
+                        f.write(line + '\n')
+
+                logger.info(f"Loaded echoes from disk: {loaded_sent} sent, {loaded_incoming} incoming (kept {len(kept_lines)} records)")
 
-            logger.info(f"Loaded echoes from disk: {loaded_sent} sent, {loaded_incoming} incoming (kept {len(kept_lines)} records)")
+            except Exception as e:
+                logger.error(f"Failed to load echoes: {e}")
 
-        except Exception as e:
-            logger.error(f"Failed to load echoes: {e}")
+            self._new_echo_epoch()
 
     # =========================================================================
     # ACK tracking for DM delivery status
@@ -1395,9 +1447,16 @@ def get_echo_counts():
     Returns sent echo counts (with repeater paths) and incoming message
     path info, allowing the caller to match with displayed messages.
 
+    Query params:
+        since_version: Only return entries changed after this version (optional)
+        epoch: Epoch the version belongs to (required with since_version)
+
     Response JSON:
         {
             "success": true,
+            "epoch": "3f2a9c1b7d4e",
+            "version": 1234,
+            "full": true,
             "echo_counts": [
                 {"timestamp": 1706500000.123, "channel_idx": 0, "count": 3, "paths": ["5e", "d1", "a3"], "pkt_payload": "abcd..."},
                 ...
@@ -1407,36 +1466,77 @@ def get_echo_counts():
                     {"path": "8a40a605", "path_len": 4, "snr": 11.0, "ts": 1706500000.456}, ...
                 ]},
                 ...
-            ]
+            ],
+            "removed": ["ijkl...", ...]
         }
+
+        With full=true the lists are the complete state. With full=false
+        (since_version given and still covered by the change log) they hold
+        only the entries changed since that version, and removed lists the
+        changed pkt_payloads that are missing from either list (to be
+        dropped before applying the entries).
     """
     if not meshcli_session:
         return jsonify({'success': False, 'error': 'Not initialized'}), 503
 
-    with meshcli_session.echo_lock:
-        sent = []
-        for pkt_payload, data in meshcli_session.echo_counts.items():
-            sent.append({
-                'timestamp': data['timestamp'],
-                'channel_idx': data['channel_idx'],
-                'count': len(data['paths']),
-                'paths': list(data['paths']),
-                'pkt_payload': pkt_payload,
-            })
+    since_version = request.args.get('since_version', type=int)
+    epoch = request.args.get('epoch', type=str)
+
+    def sent_entry(pkt_payload, data):
+        return {
+            'timestamp': data['timestamp'],
+            'channel_idx': data['channel_idx'],
+            'count': len(data['paths']),
+            'paths': list(data['paths']),
+            'pkt_payload': pkt_payload,
+        }
 
+    def incoming_entry(pkt_payload, data):
+        return {
+            'pkt_payload': pkt_payload,
+            'timestamp': data['first_ts'],
+            'paths': list(data['paths']),
+        }
+
+    session = meshcli_session
+    with session.echo_lock:
+        full = (since_version is None or epoch != session.echo_epoch or
+                since_version < session.echo_changes_floor or since_version > session.echo_version)
+
+        sent = []
         incoming = []
-        for pkt_payload, data in meshcli_session.incoming_paths.items():
-            incoming.append({
-                'pkt_payload': pkt_payload,
-                'timestamp': data['first_ts'],
-                'paths': data['paths'],
-            })
+        removed = []
+        if full:
+            for pkt_payload, data in session.echo_counts.items():
+                sent.append(sent_entry(pkt_payload, data))
+            for pkt_payload, data in session.incoming_paths.items():
+                incoming.append(incoming_entry(pkt_payload, data))
+        else:
+            # Newest changes are at the end of the change log
+            for pkt_payload in reversed(session.echo_changes):
+                if session.echo_changes[pkt_payload] <= since_version:
+                    break
+                # A payload can be both a sent echo and an incoming path; if
+                # either is gone it is listed as removed, and clients drop it
+                # from both before applying the entries sent along
+                if pkt_payload not in session.echo_counts or pkt_payload not in session.incoming_paths:
+                    removed.append(pkt_payload)
+                if pkt_payload in session.echo_counts:
+                    sent.append(sent_entry(pkt_payload, session.echo_counts[pkt_payload]))
+                if pkt_payload in session.incoming_paths:
+                    incoming.append(incoming_entry(pkt_payload, session.incoming_paths[pkt_payload]))
+
+        response = {
+            'success': True,
+            'epoch': session.echo_epoch,
+            'version': session.echo_version,
+            'full': full,
+            'echo_counts': sent,
+            'incoming_paths': incoming,
+            'removed': removed,
+        }
 
-    return jsonify({
-        'success': True,
-        'echo_counts': sent,
-        'incoming_paths': incoming
-    }), 200
+    return jsonify(response), 200
 
 
 # =============================================================================